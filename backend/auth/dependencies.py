@@ -105,6 +105,19 @@ async def get_current_user(
     return user_dict
 
 
+async def get_current_user_sse(
+    token: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> Dict[str, Any]:
+    """
+    Igual que get_current_user, pero acepta el token como ?token= para
+    EventSource, que no puede enviar el header Authorization.
+    """
+    if not credentials and token:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return await get_current_user(credentials)
+
+
 def require_roles(allowed_roles: List[str]):
     """
     Factory de dependencies para validar roles permitidos
@@ -0,0 +1,143 @@
+"""
+Benchmark del motor de elegibilidad (services/elegibilidad.py).
+
+Arma carreras sintéticas con la forma de scripts_db/populate.py (materias
+por semestre con prerrequisitos en los semestres anteriores), una cohorte
+de estudiantes con historial aleatorio y las secciones de un período, y
+mide:
+- construcción de los grafos de malla
+- la pasada de elegibilidad de toda la cohorte (p50 sobre repeticiones)
+- la misma pasada con motivos de bloqueo (vista de un estudiante)
+- contra una versión ingenua con conjuntos, para verificar resultados
+
+No necesita base de datos: mide la parte en memoria, que es lo que crece
+con la cohorte (las tres consultas son agregadas e indexadas).
+
+Uso (desde backend/):
+    python -m benchmarks.elegibilidad_benchmark
+    python -m benchmarks.elegibilidad_benchmark --estudiantes 20000 --carreras 8
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'postgresql://benchmark@localhost/benchmark')
+os.environ.setdefault('SECRET_KEY_AUTH', 'benchmark')
+
+from services.elegibilidad import Estudiante, Seccion, evaluar  # noqa: E402
+from services.malla_curricular import GrafoMalla, Materia, construir  # noqa: E402
+
+
+def generar(
+    carreras: int, semestres: int, materias_por_semestre: int, estudiantes: int, semilla: int,
+) -> Tuple[Dict[int, GrafoMalla], List[Seccion], List[Estudiante]]:
+    rnd = random.Random(semilla)
+    grafos: Dict[int, GrafoMalla] = {}
+    secciones: List[Seccion] = []
+    siguiente_materia = 1
+    siguiente_seccion = 1
+    for c in range(1, carreras + 1):
+        materias: List[Materia] = []
+        prerequisitos: List[Tuple[int, int]] = []
+        por_semestre: Dict[int, List[int]] = {}
+        for semestre in range(1, semestres + 1):
+            for _ in range(materias_por_semestre):
+                m = Materia(siguiente_materia, f"C{c}M{siguiente_materia}", f"Materia {siguiente_materia}", 4, semestre, None)
+                siguiente_materia += 1
+                materias.append(m)
+                por_semestre.setdefault(semestre, []).append(m.id)
+                if semestre > 1:
+                    anteriores = por_semestre[semestre - 1] + por_semestre.get(semestre - 2, [])
+                    for p in rnd.sample(anteriores, k=min(len(anteriores), rnd.randint(0, 2))):
+                        prerequisitos.append((m.id, p))
+        carrera = {
+            'id': c, 'nombre': f"Carrera {c}", 'creditos_totales': 0, 'precio_credito': 50,
+            'duracion_semestres': semestres, 'descripcion': None,
+        }
+        grafos[c] = construir(carrera, materias, prerequisitos)
+        for m in materias:
+            for _ in range(2):
+                secciones.append(Seccion(
+                    siguiente_seccion, f"S{siguiente_seccion}", m.id, m.nombre, c, rnd.randint(0, 40),
+                ))
+                siguiente_seccion += 1
+
+    cohorte: List[Estudiante] = []
+    for e in range(1, estudiantes + 1):
+        c = rnd.randint(1, carreras)
+        grafo = grafos[c]
+        semestre = rnd.randint(1, semestres)
+        aprobadas = [
+            m.id for m in grafo.materias.values()
+            if m.semestre < semestre and rnd.random() < 0.85
+        ]
+        cursando = [
+            m.id for m in grafo.materias.values()
+            if m.semestre == semestre and rnd.random() < 0.3
+        ]
+        cohorte.append(Estudiante(e, c, tuple(aprobadas), tuple(cursando)))
+    return grafos, secciones, cohorte
+
+
+def ingenuo(estudiantes: List[Estudiante], secciones: List[Seccion], grafos: Dict[int, GrafoMalla]) -> Dict[int, List[int]]:
+    resultado = {}
+    for e in estudiantes:
+        grafo = grafos[e.carrera_id]
+        aprobadas = set(e.aprobadas)
+        cursando = set(e.cursando)
+        resultado[e.id] = [
+            s.id for s in secciones
+            if s.carrera_id == e.carrera_id
+            and s.materia_id not in aprobadas and s.materia_id not in cursando
+            and s.cupo_disponible > 0
+            and grafo.directos[s.materia_id] <= aprobadas
+        ]
+    return resultado
+
+
+def _medir(funcion, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del motor de elegibilidad")
+    parser.add_argument('--carreras', type=int, default=5)
+    parser.add_argument('--semestres', type=int, default=10)
+    parser.add_argument('--materias-por-semestre', type=int, default=6)
+    parser.add_argument('--estudiantes', type=int, default=5000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    grafos, secciones, cohorte = generar(
+        args.carreras, args.semestres, args.materias_por_semestre, args.estudiantes, args.semilla,
+    )
+    print(f"{args.carreras} carreras × {args.semestres * args.materias_por_semestre} materias, "
+          f"{len(secciones)} secciones, {len(cohorte)} estudiantes "
+          f"(datos y grafos en {(time.perf_counter() - inicio) * 1000:.0f} ms)\n")
+
+    resultado = evaluar(cohorte, secciones, grafos)
+    esperado = ingenuo(cohorte, secciones, grafos)
+    diferencias = sum(1 for e in cohorte if resultado.elegibles[e.id] != esperado[e.id])
+    pares = sum(len(v) for v in resultado.elegibles.values())
+    print(f"pares estudiante-sección elegibles: {pares} ({diferencias} diferencias con la versión ingenua)")
+
+    print(f"cohorte, máscaras de bits: {_medir(lambda: evaluar(cohorte, secciones, grafos), args.repeticiones):8.1f} ms (p50)")
+    print(f"cohorte, con motivos:      "
+          f"{_medir(lambda: evaluar(cohorte, secciones, grafos, con_motivos=True), args.repeticiones):8.1f} ms (p50)")
+    print(f"cohorte, conjuntos:        {_medir(lambda: ingenuo(cohorte, secciones, grafos), args.repeticiones):8.1f} ms (p50)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Benchmark de generación de PDFs.
+
+Renderiza cada tipo de documento con datos sintéticos para 1, 10, 100 y
+1000 filas y mide tiempo de pared, pico de RSS y tamaño del PDF. No
+necesita base de datos ni variables de entorno.
+
+Cada caso corre en un proceso nuevo para que el pico de RSS sea el del
+propio caso y no el acumulado de los anteriores.
+
+Uso (desde backend/):
+    python -m benchmarks.pdf_benchmark
+    python -m benchmarks.pdf_benchmark --filas 1000 --documentos tesoreria acta_notas
+    python -m benchmarks.pdf_benchmark --json antes.json
+    python -m benchmarks.pdf_benchmark --comparar antes.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FILAS_POR_DEFECTO = [1, 10, 100, 1000]
+
+MATERIAS = [
+    'Cálculo Diferencial', 'Programación Orientada a Objetos', 'Estructuras de Datos',
+    'Contabilidad General', 'Física I', 'Bases de Datos Avanzadas', 'Ética Profesional',
+]
+METODOS = ['efectivo', 'transferencia', 'tarjeta']
+
+
+def _estudiante(i: int = 0) -> Dict:
+    return {
+        'id': i, 'cedula': f"17{i:08d}", 'first_name': f"Nombre{i}", 'last_name': f"Apellido Largo {i}",
+        'email': f"est{i}@infocampus.edu", 'carrera_nombre': 'Ingeniería de Software',
+        'semestre_actual': 4, 'promedio_acumulado': Decimal('8.35'),
+    }
+
+
+def _caso_estado_cuenta(n: int):
+    from services.pdf_generator import generar_estado_cuenta
+    inscripciones = [{
+        'materia_nombre': MATERIAS[i % len(MATERIAS)], 'periodo_nombre': f"Período 2025-{i % 2 + 1}",
+        'pagado': i % 3 == 0, 'costo': Decimal('150.00'),
+    } for i in range(n)]
+    return lambda: generar_estado_cuenta(
+        _estudiante(), inscripciones, Decimal('1200.00'), Decimal('300.00'),
+        {'nombre': 'Ingeniería de Software', 'codigo': 'ISW'}
+    )
+
+
+def _caso_certificado(n: int):
+    # Documento de tamaño fijo: "filas" = certificados renderizados seguidos
+    from services.pdf_generator import generar_certificado_inscripcion
+    inscripcion = {
+        'materia_nombre': MATERIAS[0], 'seccion_codigo': 'A1', 'periodo_nombre': '2025-1',
+        'aula': 'B-204', 'creditos': 4,
+    }
+
+    def generar():
+        ultimo = None
+        for i in range(n):
+            ultimo = generar_certificado_inscripcion(_estudiante(i), inscripcion, {'nombre': 'Ingeniería de Software'})
+        return ultimo
+    return generar
+
+
+def _caso_tesoreria(n: int):
+    from services.pdf_generator import ReporteTesoreriaPDF
+
+    def generar():
+        fin = datetime.now()
+        reporte = ReporteTesoreriaPDF(
+            30, fin - timedelta(days=30), fin, n, Decimal('150.00') * n,
+            [{'metodo_pago': m, 'cantidad': n // 3, 'total': Decimal('50.00') * n} for m in METODOS],
+            '1700000000',
+        )
+        reporte.agregar_pagos({
+            'fecha': (fin - timedelta(days=i % 30)).strftime('%d/%m/%Y'),
+            'estudiante': f"Nombre{i} Apellido Largo {i}",
+            'materia': MATERIAS[i % len(MATERIAS)],
+            'monto': Decimal('150.00'),
+            'metodo': METODOS[i % 3].capitalize(),
+        } for i in range(n))
+        return reporte.finalizar()
+    return generar
+
+
+def _caso_boletin(n: int):
+    from services.pdf_generator import generar_boletin_calificaciones
+    materias = [{
+        'materia_nombre': MATERIAS[i % len(MATERIAS)], 'materia_codigo': f"M{i}", 'creditos': 4,
+        'semestre': i % 8 + 1, 'seccion': 'A1', 'periodo_nombre': f"Período {2020 + i // 10}",
+        'periodo_codigo': f"{2020 + i // 10}", 'nota_final': 7.5 + (i % 5) / 2, 'estado': 'aprobado',
+        'evaluaciones': [{'tipo': t, 'nota': 8.0, 'peso': 25.0}
+                         for t in ('parcial_1', 'parcial_2', 'talleres', 'examen_final')],
+    } for i in range(n)]
+    return lambda: generar_boletin_calificaciones(_estudiante(), materias)
+
+
+def _caso_acta_notas(n: int):
+    from services.pdf_generator import generar_acta_notas_seccion
+    alumnos = [{'cedula': f"17{i:08d}", 'nombre_completo': f"Apellido Largo {i} Nombre{i}",
+                'nota_final': 5 + (i % 6)} for i in range(n)]
+    return lambda: generar_acta_notas_seccion({'materia_nombre': MATERIAS[0], 'codigo': 'A1'}, alumnos)
+
+
+def _caso_recaudacion(n: int):
+    from services.pdf_generator import generar_reporte_recaudacion
+    pagos = [{'fecha': '2025-03-01T10:00:00', 'estudiante_nombre': f"Nombre{i} Apellido Largo {i}",
+              'metodo': METODOS[i % 3], 'monto': Decimal('150.00')} for i in range(n)]
+    return lambda: generar_reporte_recaudacion(pagos, Decimal('150.00') * n, 'Marzo 2025')
+
+
+CASOS: Dict[str, Callable[[int], Callable]] = {
+    'estado_cuenta': _caso_estado_cuenta,
+    'certificado': _caso_certificado,
+    'tesoreria': _caso_tesoreria,
+    'boletin': _caso_boletin,
+    'acta_notas': _caso_acta_notas,
+    'recaudacion': _caso_recaudacion,
+}
+
+
+def _medir(documento: str, filas: int, repeticiones: int, cola) -> None:
+    """Corre en un proceso hijo: calienta, repite y reporta por la cola."""
+    generar = CASOS[documento](filas)
+    salida = generar()  # calentamiento (imports, fuentes, caché de estilos)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        salida = generar()
+        tiempos.append(time.perf_counter() - inicio)
+    pico_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        pico_kb //= 1024
+    cola.put({
+        'documento': documento,
+        'filas': filas,
+        'tiempo_ms': round(statistics.median(tiempos) * 1000, 2),
+        'tiempo_min_ms': round(min(tiempos) * 1000, 2),
+        'rss_pico_mb': round(pico_kb / 1024, 1),
+        'bytes': len(salida.getvalue()),
+    })
+
+
+def _esperar_resultado(proceso, cola, limite_segundos: float) -> Optional[Dict]:
+    """Resultado del hijo, o None si murió sin reportar (OOM, excepción) o se pasó del límite."""
+    fin = time.monotonic() + limite_segundos
+    while time.monotonic() < fin:
+        try:
+            return cola.get(timeout=1)
+        except queue.Empty:
+            if not proceso.is_alive():
+                # Pudo reportar justo antes de terminar
+                try:
+                    return cola.get(timeout=1)
+                except queue.Empty:
+                    return None
+    proceso.terminate()
+    return None
+
+
+def ejecutar(
+    documentos: List[str], filas: List[int], repeticiones: int, previos: Dict = None, limite_segundos: float = 600,
+) -> List[Dict]:
+    previos = previos or {}
+    ctx = multiprocessing.get_context('spawn')
+    resultados = []
+    for documento in documentos:
+        for n in filas:
+            cola = ctx.Queue()
+            proceso = ctx.Process(target=_medir, args=(documento, n, repeticiones, cola))
+            proceso.start()
+            resultado = _esperar_resultado(proceso, cola, limite_segundos)
+            proceso.join()
+            if resultado is None:
+                motivo = (f"sin resultado en {limite_segundos:.0f} s" if proceso.exitcode == -15
+                          else f"el proceso terminó con código {proceso.exitcode}")
+                print(f"{documento:<14} {n:>6}  FALLÓ: {motivo}", flush=True)
+                continue
+            resultados.append(resultado)
+            _imprimir_fila(resultado, previos.get((documento, n)))
+    return resultados
+
+
+def _imprimir_fila(r: Dict, base: Dict = None) -> None:
+    linea = (f"{r['documento']:<14} {r['filas']:>6} {r['tiempo_ms']:>11.2f} "
+             f"{r['rss_pico_mb']:>10.1f} {r['bytes'] / 1024:>10.1f}")
+    if base:
+        delta = (r['tiempo_ms'] - base['tiempo_ms']) / base['tiempo_ms'] * 100 if base['tiempo_ms'] else 0
+        linea += f" {delta:>+9.1f}%"
+    print(linea, flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de generación de PDFs")
+    parser.add_argument('--documentos', nargs='+', choices=list(CASOS), default=list(CASOS))
+    parser.add_argument('--filas', nargs='+', type=int, default=FILAS_POR_DEFECTO)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--json', help="Guarda los resultados en este archivo")
+    parser.add_argument('--comparar', help="Resultados previos (--json) contra los que comparar el tiempo")
+    parser.add_argument('--limite', type=float, default=600,
+                        help="Segundos máximos por documento y tamaño antes de darlo por fallido")
+    args = parser.parse_args()
+
+    print(f"{'documento':<14} {'filas':>6} {'mediana ms':>11} {'RSS MB':>10} {'PDF KB':>10}"
+          + (f" {'Δ tiempo':>10}" if args.comparar else ""))
+
+    previos = {}
+    if args.comparar:
+        with open(args.comparar) as f:
+            previos = {(r['documento'], r['filas']): r for r in json.load(f)}
+
+    resultados = ejecutar(args.documentos, args.filas, args.repeticiones, previos, args.limite)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    main()
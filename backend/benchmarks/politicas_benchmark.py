@@ -0,0 +1,191 @@
+"""
+Benchmark de las respuestas locales de políticas (services/politicas_ia.py).
+
+Mide, con la configuración de ejemplo de scripts_db/populate.py y un
+conjunto de preguntas etiquetadas:
+- precisión: de las respuestas directas, cuántas eligieron la entrada correcta
+- cobertura: cuántas preguntas de políticas se respondieron sin el modelo
+- falsos positivos: preguntas que debían ir al modelo y se respondieron local
+- latencia de construcción del índice y de cada consulta (p50 / p95)
+
+No necesita base de datos ni red; las variables de entorno por defecto
+solo satisfacen a config.py.
+
+Uso (desde backend/):
+    python -m benchmarks.politicas_benchmark
+    python -m benchmarks.politicas_benchmark --umbral 0.5 0.6 0.7 --margen 0.1 0.15
+    python -m benchmarks.politicas_benchmark --errores
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DATABASE_URL', 'postgresql://benchmark@localhost/benchmark')
+os.environ.setdefault('SECRET_KEY_AUTH', 'benchmark')
+
+from config import settings  # noqa: E402
+from services.politicas_ia import Indice, construir_indice  # noqa: E402
+
+POLITICAS = {
+    'institucion_nombre': 'InfoCampus Centro Universitario',
+    'institucion_rector': 'Dr. Alejandro Martínez Ruiz',
+    'institucion_mision': 'Formar profesionales íntegros, competentes e innovadores comprometidos con el desarrollo sostenible.',
+    'reglas_nota_minima': '7.0',
+    'reglas_asistencia_minima': '75',
+    'financiero_interes_mora': '2.5',
+    'info_fundacion': '2005-09-01',
+    'info_telefono': '+34 91 234 56 78',
+    'info_email_contacto': 'info@infocampus.edu.es',
+    'info_direccion': 'Calle Universidad 45, 28040 Madrid, España',
+}
+DESCRIPCIONES = {
+    'institucion_nombre': 'Nombre institucional',
+    'institucion_rector': 'Rector actual',
+    'institucion_mision': 'Misión institucional',
+    'reglas_nota_minima': 'Nota mínima de aprobación',
+    'reglas_asistencia_minima': '% mínimo de asistencia',
+    'financiero_interes_mora': 'Interés mensual por mora (%)',
+    'info_fundacion': 'Fecha de fundación',
+    'info_telefono': 'Teléfono',
+    'info_email_contacto': 'Email de contacto',
+    'info_direccion': 'Dirección',
+}
+DIAS_GRACIA = [
+    ('Ingeniería de Sistemas', 15), ('Administración de Empresas', 10), ('Contabilidad', None),
+]
+
+# (pregunta, entrada esperada | None si debe ir al modelo)
+PREGUNTAS: List[Tuple[str, Optional[str]]] = [
+    ("¿Con cuánto se aprueba?", 'nota_minima'),
+    ("¿Cuál es la nota mínima de aprobación?", 'nota_minima'),
+    ("Qué nota necesito para aprobar una materia", 'nota_minima'),
+    ("¿Qué porcentaje de asistencia piden?", 'asistencia_minima'),
+    ("¿Cuántas faltas se permiten en una materia?", 'asistencia_minima'),
+    ("asistencia mínima requerida", 'asistencia_minima'),
+    ("¿Cuánto es el interés de mora?", 'interes_mora'),
+    ("¿Cobran recargo por pagar tarde?", 'interes_mora'),
+    ("¿Cuántos días de gracia hay para pagar?", 'dias_gracia'),
+    ("¿Qué plazo hay para pagar la matrícula?", 'dias_gracia'),
+    ("¿Cuándo entro en mora?", 'dias_gracia'),
+    ("¿Qué formas de pago aceptan?", 'metodos_pago'),
+    ("¿Puedo pagar con tarjeta?", 'metodos_pago'),
+    ("¿Aceptan transferencia bancaria?", 'metodos_pago'),
+    ("¿Cómo funcionan las becas?", 'becas'),
+    ("¿Cuánto descuento da la beca?", 'becas'),
+    ("¿Cuál es el teléfono de la universidad?", 'contacto'),
+    ("Necesito el correo de contacto", 'contacto'),
+    ("¿Dónde queda la universidad?", 'contacto'),
+    ("¿Quién es el rector?", 'rector'),
+    ("¿Cuál es la misión institucional?", 'mision'),
+    ("¿En qué año se fundó InfoCampus?", 'fundacion'),
+    # Deben ir al modelo (datos personales o fuera de políticas)
+    ("¿Cuál es mi deuda?", None),
+    ("¿Cuándo es mi próxima clase?", None),
+    ("¿Cuánto saqué en el parcial de cálculo?", None),
+    ("¿Estoy en mora?", None),
+    ("Dame un resumen de mi semestre", None),
+    ("¿Cuántos estudiantes hay en mi sección?", None),
+    ("¿Quiénes están en mora este mes?", None),
+    ("¿Cuál es mi promedio acumulado?", None),
+    ("¿Qué materias tengo sin pagar?", None),
+    ("Compara la recaudación de este período con el anterior", None),
+    ("¿Cuántas faltas tengo en física?", None),
+    ("Hola", None),
+    # Primera persona: piden datos del estudiante aunque mencionen una política
+    ("¿Cuáles son mis notas?", None),
+    ("¿Cuál es mi porcentaje de asistencia?", None),
+    ("¿cuál es mi asistencia?", None),
+    ("¿Cuánto me descuenta mi beca?", None),
+    ("¿cuánto debo pagar?", None),
+    ("¿Cuál es el teléfono de mi profesor?", None),
+    ("¿Cuántas faltas me permiten en una materia?", None),
+    ("¿Me cobran recargo si pago tarde?", None),
+    ("¿Cuántos días de gracia tengo para pagar?", None),
+    # Sin primera persona pero sobre una persona o materia concreta
+    ("¿Cuál es el teléfono del profesor de cálculo?", None),
+    # Límite conocido: coincide con la plantilla de becas como la pregunta
+    # general (0.61); ningún umbral las separa
+    ("¿Cuánto descuenta la beca de Ana Torres?", None),
+    ("notas del parcial de física", None),
+    ("¿Cuál es la asistencia del grupo de contabilidad?", None),
+]
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def evaluar(indice: Indice, umbral: float, margen: float, errores: bool = False) -> Dict:
+    aciertos = respondidas = falsos_positivos = 0
+    positivos = sum(1 for _, esperada in PREGUNTAS if esperada)
+    negativos = len(PREGUNTAS) - positivos
+    for pregunta, esperada in PREGUNTAS:
+        resultado = indice.responder(pregunta, umbral, margen)
+        if resultado is None:
+            if errores and esperada:
+                busqueda = indice.buscar(pregunta)
+                detalle = f"{busqueda.nombre} {busqueda.puntaje:.2f}/{busqueda.margen:.2f}" if busqueda else "-"
+                print(f"  sin respuesta: {pregunta!r} (esperada {esperada}; mejor {detalle})")
+            continue
+        if esperada is None:
+            falsos_positivos += 1
+            if errores:
+                print(f"  falso positivo: {pregunta!r} → {resultado.nombre} ({resultado.puntaje:.2f})")
+            continue
+        respondidas += 1
+        if resultado.nombre == esperada:
+            aciertos += 1
+        elif errores:
+            print(f"  incorrecta: {pregunta!r} → {resultado.nombre} (esperada {esperada})")
+    return {
+        'precision': aciertos / respondidas * 100 if respondidas else 0.0,
+        'cobertura': aciertos / positivos * 100 if positivos else 0.0,
+        'falsos_positivos': falsos_positivos / negativos * 100 if negativos else 0.0,
+    }
+
+
+def medir_latencia(repeticiones: int) -> Tuple[float, float, float]:
+    construccion = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        indice = construir_indice(POLITICAS, DESCRIPCIONES, DIAS_GRACIA)
+        construccion.append((time.perf_counter() - inicio) * 1000)
+    consultas = []
+    for _ in range(repeticiones):
+        for pregunta, _ in PREGUNTAS:
+            inicio = time.perf_counter()
+            indice.buscar(pregunta)
+            consultas.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(construccion), _percentil(consultas, 50), _percentil(consultas, 95)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de respuestas locales de políticas")
+    parser.add_argument('--umbral', nargs='+', type=float, default=[settings.IA_POLITICAS_UMBRAL])
+    parser.add_argument('--margen', nargs='+', type=float, default=[settings.IA_POLITICAS_MARGEN])
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--errores', action='store_true', help="Lista cada pregunta mal resuelta")
+    args = parser.parse_args()
+
+    indice = construir_indice(POLITICAS, DESCRIPCIONES, DIAS_GRACIA)
+    print(f"{len(indice)} entradas, {len(PREGUNTAS)} preguntas "
+          f"({sum(1 for _, e in PREGUNTAS if e)} de políticas)\n")
+    print(f"{'umbral':>7} {'margen':>7} {'precisión %':>12} {'cobertura %':>12} {'falsos pos. %':>14}")
+    for umbral in args.umbral:
+        for margen in args.margen:
+            r = evaluar(indice, umbral, margen, args.errores)
+            print(f"{umbral:>7.2f} {margen:>7.2f} {r['precision']:>12.1f} "
+                  f"{r['cobertura']:>12.1f} {r['falsos_positivos']:>14.1f}", flush=True)
+
+    construccion, p50, p95 = medir_latencia(args.repeticiones)
+    print(f"\nconstrucción del índice: {construccion:.2f} ms (mediana)")
+    print(f"consulta: p50 {p50 * 1000:.0f} µs, p95 {p95 * 1000:.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
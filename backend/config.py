@@ -11,6 +11,9 @@ class Settings(BaseSettings):
     """
     # Database - PostgreSQL
     DATABASE_URL: str
+    # Conexión para LISTEN/NOTIFY (services/eventos.py). Vacío = DATABASE_URL;
+    # debe ser directa o pgbouncer en modo sesión
+    DATABASE_LISTEN_URL: str = ""
     
     # JWT Configuration
     SECRET_KEY_AUTH: str
@@ -22,6 +25,65 @@ class Settings(BaseSettings):
 
     # AI / Groq
     GROQ_API_KEY: str = ""
+    # Proveedor del chat (services/llm.py): "groq" o "falso" (local, sin red)
+    IA_PROVEEDOR: str = "groq"
+    IA_FALSO_DEMORA_SEGUNDOS: float = 0.02
+    # Límite de llamadas simultáneas al proveedor por worker, requests que
+    # pueden esperar turno y cuánto esperan antes de responder 503
+    IA_MAX_CONCURRENTES: int = 8
+    IA_MAX_EN_ESPERA: int = 16
+    IA_ESPERA_SEGUNDOS: float = 10.0
+    IA_TIMEOUT_SEGUNDOS: float = 60.0
+
+    # Caché de PDFs (vacío → directorio temporal del sistema)
+    PDF_CACHE_DIR: str = ""
+    PDF_CACHE_MAX_MB: int = 256
+
+    # Procesos para renderizado masivo de PDFs (/reportes/lote)
+    PDF_LOTE_WORKERS: int = 2
+
+    # Refresco de vistas materializadas del dashboard institucional
+    KPI_REFRESH_SEGUNDOS: int = 300
+    # Verificación de los contadores de KPIs contra un recuento completo
+    KPI_VERIFICACION_SEGUNDOS: int = 86400
+
+    # Consultas en paralelo (services/paralelo.py): conexiones por request
+    # (incluida la del propio request), conexiones libres que se dejan al
+    # resto de requests y espera máxima por una conexión extra
+    PARALELO_MAX_CONEXIONES: int = 4
+    PARALELO_RESERVA_POOL: int = 4
+    PARALELO_ESPERA_SEGUNDOS: float = 0.05
+
+    # Suscriptores SSE simultáneos por worker (/api/stream/dashboard)
+    SSE_MAX_SUSCRIPTORES: int = 200
+
+    # Vida del contexto de IA cacheado por usuario (services/cache_contexto_ia.py)
+    IA_CONTEXTO_TTL_SEGUNDOS: int = 120
+    # Tope de tokens (estimados) del contexto en el system prompt
+    # (services/contexto_compacto.py)
+    IA_CONTEXTO_MAX_TOKENS: int = 3000
+
+    # Memoria de conversaciones (services/memoria_ia.py): tokens de turnos
+    # guardados antes de resumir, mensajes recientes que se conservan
+    # literales y días sin actividad antes de borrar
+    IA_MEMORIA_MAX_TOKENS: int = 1500
+    IA_MEMORIA_MENSAJES_RECIENTES: int = 6
+    IA_MEMORIA_DIAS: int = 30
+
+    # Respuesta local a preguntas de políticas (services/politicas_ia.py):
+    # similitud mínima y ventaja sobre la segunda entrada para no llamar al
+    # modelo. Calibrar con benchmarks/politicas_benchmark.py
+    IA_POLITICAS_UMBRAL: float = 0.45
+    IA_POLITICAS_MARGEN: float = 0.15
+
+    # Vida máxima del grafo de malla curricular en memoria
+    # (services/malla_curricular.py); normalmente lo descarta el evento 'malla'
+    MALLA_TTL_SEGUNDOS: int = 3600
+
+    # Vida máxima de la grilla de horarios de un período en memoria
+    # (services/grilla_horarios.py); los eventos 'seccion' e 'inscripcion'
+    # la actualizan por sección y 'malla' la descarta
+    HORARIOS_TTL_SEGUNDOS: int = 3600
     
     # App Info
     APP_NAME: str = "Info Campus ERP API"
@@ -2,12 +2,15 @@
 Database access layer.
 
 - Async pool (asyncpg) for FastAPI API. Use `async with get_db() as conn` and
-  conn.fetch/fetchrow/execute with $1, $2 placeholders. Do NOT use cursor().
+  conn.fetch/fetchrow/execute with $1, $2 placeholders. Do NOT use the
+  psycopg-style cursor(); asyncpg's `async for row in conn.cursor(...)` is
+  fine for streaming (see get_db_readonly()).
 - Sync connection (psycopg2) via get_db_direct() for scripts_db/ only.
 """
 import logging
 from contextlib import contextmanager, asynccontextmanager
 from urllib.parse import urlparse
+from typing import Optional
 
 import asyncpg
 import psycopg2
@@ -32,15 +35,19 @@ def parse_database_url(url: str) -> dict:
     }
 
 
-async def init_connection_pool(min_conn: int = 1, max_conn: int = 20):
+async def init_connection_pool(min_conn: Optional[int] = None, max_conn: int = 20):
     """
     Inicializa el pool asíncrono de conexiones con asyncpg.
 
     Se usa para la API FastAPI. Los scripts síncronos usan `get_db_direct()`.
+    Por defecto abre PARALELO_MAX_CONEXIONES conexiones al arrancar, así
+    services/paralelo.py encuentra conexiones ociosas sin esperar handshakes.
     """
     global _async_pool
     if _async_pool is not None:
         return
+    if min_conn is None:
+        min_conn = min(settings.PARALELO_MAX_CONEXIONES, max_conn)
 
     try:
         # statement_cache_size=0: Supabase/Render usa pgbouncer en modo transaction,
@@ -90,6 +97,51 @@ async def get_db():
                 pass
 
 
+@asynccontextmanager
+async def get_db_readonly(timeout: float | None = None):
+    """
+    Igual que get_db() pero dentro de una transacción READ ONLY / REPEATABLE READ.
+
+    Pensado para lecturas largas con conn.cursor() (exportaciones): todas las
+    filas salen de una misma foto consistente y Postgres rechaza cualquier
+    escritura accidental.
+
+    Con `timeout`, si el pool no entrega conexión a tiempo se lanza
+    asyncio.TimeoutError (sin registrarlo como error).
+    """
+    global _async_pool
+
+    if _async_pool is None:
+        await init_connection_pool()
+
+    conn: asyncpg.Connection = await _async_pool.acquire(timeout=timeout)
+    try:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            yield conn
+    except Exception as e:
+        logger.error("❌ Error en transacción de solo lectura: %s", e)
+        raise
+    finally:
+        try:
+            await _async_pool.release(conn)
+        except Exception:
+            pass
+
+
+def conexiones_ociosas() -> int:
+    """Conexiones ya abiertas y sin usar: se entregan sin handshake."""
+    if _async_pool is None:
+        return 0
+    return _async_pool.get_idle_size()
+
+
+def conexiones_libres() -> int:
+    """Conexiones que el pool puede entregar sin esperar (ociosas + por abrir)."""
+    if _async_pool is None:
+        return 0
+    return _async_pool.get_idle_size() + _async_pool.get_max_size() - _async_pool.get_size()
+
+
 def get_db_direct():
     """Conexión directa sin pool (para scripts externos)."""
     db_params = parse_database_url(settings.DATABASE_URL)
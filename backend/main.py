@@ -30,7 +30,10 @@ from slowapi.middleware import SlowAPIMiddleware
 
 from config import settings
 from database import init_connection_pool, get_db
-from routers import auth, dashboards, inscripciones, estudiantes, periodos, reportes
+from services import eventos, llm, pdf_lote, tareas
+from services.kpis import refrescar_vistas_kpi, verificar_contadores
+from services.memoria_ia import purgar_conversaciones
+from routers import auth, dashboards, inscripciones, estudiantes, periodos, reportes, stream
 import routers.estudiante_dashboard as estudiante_dashboard
 from routers.tesorero import router as tesorero_router
 from routers.profesor_routes import router as profesor_router
@@ -57,25 +60,35 @@ async def lifespan(app: FastAPI):
         logger.error(f"Error inicializando base de datos: {e}")
         raise
 
-    # Aplica migraciones SQL idempotentes al arrancar.
+    # Aplica migraciones SQL idempotentes al arrancar, en orden de nombre.
     # Usa advisory lock para evitar deadlock cuando varios workers (gunicorn) arrancan a la vez.
     MIGRATION_LOCK_ID = 0x494346455250  # "ICERP" en hex
-    migration_file = os.path.join(os.path.dirname(__file__), "migrations", "001_revoked_tokens.sql")
-    if os.path.exists(migration_file):
-        with open(migration_file, "r") as f:
+    migrations_dir = os.path.join(os.path.dirname(__file__), "migrations")
+    migration_files = sorted(f for f in os.listdir(migrations_dir) if f.endswith(".sql")) if os.path.isdir(migrations_dir) else []
+    for migration_name in migration_files:
+        with open(os.path.join(migrations_dir, migration_name), "r") as f:
             sql = f.read()
         try:
             async with get_db() as conn:
-                await conn.execute(f"SELECT pg_advisory_lock({MIGRATION_LOCK_ID})")
-                try:
-                    await conn.execute(sql)
-                    logger.info("✅ Migración 001_revoked_tokens aplicada")
-                finally:
-                    await conn.execute(f"SELECT pg_advisory_unlock({MIGRATION_LOCK_ID})")
+                # Lock de transacción: se libera solo al terminar, incluso si la migración falla
+                await conn.execute(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_ID})")
+                await conn.execute(sql)
+                logger.info(f"✅ Migración {migration_name[:-4]} aplicada")
         except Exception as e:
-            logger.error(f"❌ Error en migración: {e}")
+            logger.error(f"❌ Error en migración {migration_name}: {e}")
+
+    tareas.registrar("kpi_institucional", settings.KPI_REFRESH_SEGUNDOS, refrescar_vistas_kpi)
+    # La primera vuelta (primer arranque) siembra los contadores si la tabla está vacía
+    tareas.registrar("kpi_contadores", settings.KPI_VERIFICACION_SEGUNDOS, verificar_contadores)
+    tareas.registrar("ia_conversaciones", 86400, purgar_conversaciones)
+    tareas.iniciar()
+    eventos.iniciar()
 
     yield
+    await eventos.detener()
+    await tareas.detener()
+    await llm.cerrar()
+    pdf_lote.cerrar_pool()
     logger.info("Cerrando Info Campus ERP API")
 
 
@@ -127,7 +140,7 @@ app.add_middleware(
     allow_credentials=not use_wildcard,   # False con wildcard (restricción de spec CORS)
     allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type", "X-Requested-With", "Accept"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "ETag"],
     max_age=86400,  # 24 h de preflight cache → reduce OPTIONS latency
 )
 
@@ -178,6 +191,7 @@ app.include_router(academico_router, prefix="/api")
 app.include_router(administrativo_router, prefix="/api")
 app.include_router(ia_router, prefix="/api")
 app.include_router(director_router, prefix="/api")
+app.include_router(stream.router, prefix="/api")
 
 
 # ---------------------------------------------------------------------------
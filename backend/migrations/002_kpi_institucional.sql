@@ -0,0 +1,52 @@
+-- Migración idempotente: vistas materializadas del dashboard institucional.
+-- Se refrescan con REFRESH MATERIALIZED VIEW CONCURRENTLY desde el scheduler
+-- en proceso (services/tareas.py); CONCURRENTLY exige un índice UNIQUE.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_kpi_institucional AS
+SELECT
+    1 AS id,
+    (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'estudiante') AS total_estudiantes,
+    (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'profesor')   AS total_profesores,
+    (SELECT COUNT(*) FROM public.materias)                          AS materias_totales,
+    (SELECT COUNT(*) FROM public.secciones)                         AS total_secciones,
+    (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'estudiante' AND es_becado = true) AS estudiantes_becados,
+    (SELECT COUNT(DISTINCT i.estudiante_id) FROM public.inscripciones i WHERE i.pago_id IS NULL) AS estudiantes_mora,
+    (SELECT COALESCE(AVG(nota_final), 0) FROM public.inscripciones WHERE nota_final IS NOT NULL) AS promedio_institucional,
+    (SELECT COALESCE(SUM(monto), 0) FROM public.pagos) AS ingresos_totales,
+    NOW() AS generated_at;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_kpi_institucional_id
+    ON public.mv_kpi_institucional (id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_estudiantes_por_carrera AS
+SELECT c.id AS carrera_id, c.nombre, COUNT(u.id) AS num_alumnos
+FROM public.carreras c
+LEFT JOIN public.usuarios u ON u.carrera_id = c.id AND u.rol = 'estudiante'
+GROUP BY c.id, c.nombre;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_estudiantes_por_carrera_id
+    ON public.mv_estudiantes_por_carrera (carrera_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_alumnos_mora AS
+SELECT
+    u.id,
+    u.first_name || ' ' || u.last_name AS nombre_completo,
+    u.cedula,
+    COALESCE(SUM(
+        m.creditos
+        * c.precio_credito
+        * (1.0 - COALESCE(u.porcentaje_beca, 0) / 100.0)
+    ), 0) AS deuda_total
+FROM public.usuarios u
+JOIN public.inscripciones i ON i.estudiante_id = u.id AND i.pago_id IS NULL
+JOIN public.secciones     s ON i.seccion_id = s.id
+JOIN public.materias      m ON s.materia_id = m.id
+JOIN public.carreras      c ON u.carrera_id = c.id
+WHERE u.rol = 'estudiante'
+GROUP BY u.id, u.first_name, u.last_name, u.cedula;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_alumnos_mora_id
+    ON public.mv_alumnos_mora (id);
+
+CREATE INDEX IF NOT EXISTS idx_mv_alumnos_mora_deuda
+    ON public.mv_alumnos_mora (deuda_total DESC);
@@ -0,0 +1,17 @@
+-- Migración idempotente: contadores de KPIs mantenidos en cada escritura.
+-- Una fila por (ámbito, id del ámbito, métrica); los endpoints de escritura
+-- aplican deltas en la misma transacción (services/kpis.py) y una tarea
+-- diaria los verifica contra un recuento completo. La tabla nace vacía: la
+-- primera verificación al arrancar la siembra.
+
+CREATE TABLE IF NOT EXISTS public.kpi_counters (
+    ambito         VARCHAR(16)   NOT NULL,            -- 'global' | 'carrera' | 'periodo'
+    ambito_id      INTEGER       NOT NULL DEFAULT 0,  -- 0 para 'global'
+    metrica        VARCHAR(32)   NOT NULL,
+    valor          NUMERIC(14,2) NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMPTZ   NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (ambito, ambito_id, metrica)
+);
+
+COMMENT ON TABLE public.kpi_counters IS
+    'Contadores incrementales de KPIs. Verificados a diario contra un recuento (services/kpis.py).';
@@ -0,0 +1,21 @@
+-- Migración idempotente: memoria de conversaciones del chat de IA.
+-- Una fila por (usuario, sesión): los turnos recientes en JSONB y un resumen
+-- acumulado de los anteriores (services/memoria_ia.py). `version` sube en
+-- cada resumen para que dos resúmenes concurrentes no plieguen lo mismo.
+
+CREATE TABLE IF NOT EXISTS public.ia_conversaciones (
+    usuario_id     INTEGER      NOT NULL REFERENCES public.usuarios(id) ON DELETE CASCADE,
+    sesion_id      VARCHAR(64)  NOT NULL,
+    resumen        TEXT         NOT NULL DEFAULT '',
+    turnos         JSONB        NOT NULL DEFAULT '[]'::jsonb,
+    tokens_turnos  INTEGER      NOT NULL DEFAULT 0,
+    version        INTEGER      NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMPTZ  NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (usuario_id, sesion_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_ia_conversaciones_actualizado_en
+    ON public.ia_conversaciones (actualizado_en);
+
+COMMENT ON TABLE public.ia_conversaciones IS
+    'Memoria del chat de IA: resumen + turnos recientes por usuario y sesión (services/memoria_ia.py).';
@@ -0,0 +1,30 @@
+-- Migración idempotente: búsqueda indexada de estudiantes por nombre o cédula.
+-- `usuarios.busqueda` guarda "nombres apellidos cédula" en minúsculas y sin
+-- tildes; un índice GIN de trigramas sobre ella atiende LIKE '%texto%' y la
+-- similitud por palabras (<%) de services/busqueda_estudiantes.py sin
+-- recorrer la tabla.
+--
+-- Si las extensiones ya existen en otro esquema (p. ej. `extensions` en
+-- Supabase), CREATE EXTENSION no hace nada y se resuelven por search_path.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() es STABLE (depende del diccionario); una columna generada
+-- exige una expresión IMMUTABLE, de ahí el envoltorio con diccionario fijo
+CREATE OR REPLACE FUNCTION public.normalizar_busqueda(texto TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+SET search_path = public, extensions, pg_catalog
+AS $$ SELECT lower(unaccent('unaccent'::regdictionary, texto)) $$;
+
+ALTER TABLE public.usuarios
+    ADD COLUMN IF NOT EXISTS busqueda TEXT GENERATED ALWAYS AS (
+        public.normalizar_busqueda(
+            COALESCE(first_name, '') || ' ' || COALESCE(last_name, '') || ' ' || COALESCE(cedula, '')
+        )
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_usuarios_busqueda_trgm
+    ON public.usuarios USING gin (busqueda gin_trgm_ops)
+    WHERE rol = 'estudiante';
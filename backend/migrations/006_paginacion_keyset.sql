@@ -0,0 +1,29 @@
+-- Migración idempotente: índices para la paginación por cursor
+-- (services/paginacion.py). Cada uno cubre la clave de orden completa de su
+-- listado, de modo que "filas posteriores al cursor" es un rango del índice:
+-- - /academico/estudiantes (rol = 'estudiante') y /administrativo/usuarios:
+--   rol, last_name, first_name, id
+-- - /tesorero/pagos: fecha_pago DESC, id DESC (recorrido hacia atrás)
+-- - /director/historial-notas: fecha_modificacion DESC, id DESC
+
+CREATE INDEX IF NOT EXISTS idx_usuarios_rol_nombre_id
+    ON public.usuarios (rol, last_name, first_name, id);
+
+CREATE INDEX IF NOT EXISTS idx_pagos_fecha_pago_id
+    ON public.pagos (fecha_pago, id);
+
+-- La clave de un cursor no admite NULL (bajo DESC irían primero y la
+-- comparación de filas con NULL no avanza): se completan las filas sin
+-- fecha con la última modificación de su inscripción y la columna pasa a
+-- NOT NULL. Los INSERT existentes no la envían, así que usan el DEFAULT.
+UPDATE public.historial_notas hn
+SET fecha_modificacion = COALESCE(
+    (SELECT COALESCE(i.updated_at, i.created_at) FROM public.inscripciones i WHERE i.id = hn.inscripcion_id),
+    '-infinity'
+)
+WHERE hn.fecha_modificacion IS NULL;
+
+ALTER TABLE public.historial_notas ALTER COLUMN fecha_modificacion SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_historial_notas_fecha_id
+    ON public.historial_notas (fecha_modificacion, id);
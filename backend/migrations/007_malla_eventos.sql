@@ -0,0 +1,34 @@
+-- Migración idempotente: aviso de cambios en la malla curricular.
+-- services/malla_curricular.py guarda en memoria el grafo de prerrequisitos
+-- de cada carrera. Estas tablas no se editan desde la API (se cargan con
+-- scripts o SQL), así que un trigger por sentencia emite el evento interno
+-- 'malla' en el mismo canal que services/eventos.py y cada worker descarta
+-- sus grafos al confirmarse la transacción.
+
+CREATE OR REPLACE FUNCTION public.notificar_cambio_malla()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    PERFORM pg_notify(
+        'infocampus_eventos',
+        json_build_object('tipo', 'malla', 'datos', json_build_object('tabla', TG_TABLE_NAME))::text
+    );
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_materias_malla ON public.materias;
+CREATE TRIGGER trg_materias_malla
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.materias
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notificar_cambio_malla();
+
+DROP TRIGGER IF EXISTS trg_prerequisitos_malla ON public.prerequisitos;
+CREATE TRIGGER trg_prerequisitos_malla
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.prerequisitos
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notificar_cambio_malla();
+
+DROP TRIGGER IF EXISTS trg_carreras_malla ON public.carreras;
+CREATE TRIGGER trg_carreras_malla
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.carreras
+    FOR EACH STATEMENT EXECUTE FUNCTION public.notificar_cambio_malla();
@@ -0,0 +1,10 @@
+-- Migración idempotente: última ejecución de cada tarea periódica.
+-- services/tareas.py la consulta con el advisory lock de la tarea tomado:
+-- si otro worker ya la corrió dentro del intervalo, esa vuelta se salta.
+-- Así cada tarea corre una vez por intervalo entre todos los workers, y un
+-- reinicio no repite lo que ya se hizo.
+
+CREATE TABLE IF NOT EXISTS public.tareas_programadas (
+    nombre           VARCHAR(64)  PRIMARY KEY,
+    ultima_ejecucion TIMESTAMPTZ  NOT NULL
+);
@@ -1,25 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 import json
-import unicodedata
 from datetime import date
 
 from auth.dependencies import require_roles, get_current_user
-from database import get_db
+from database import get_db, get_db_readonly
+from services import cache_respuestas, elegibilidad, eventos, grilla_horarios, horarios, malla_curricular
+from services.busqueda_estudiantes import cedula_exacta, condicion_busqueda
+from services.exportador import respuesta_exportacion
+from services.paginacion import (
+    ModoTotal, Orden, campos_paginacion, condicion_cursor, contar, modo_total, recortar,
+)
 
 logger = logging.getLogger(__name__)
 
-
-def normalize_text(text: str) -> str:
-    """Normaliza texto quitando tildes y acentos"""
-    if not text:
-        return ''
-    # Normalizar unicode y quitar tildes
-    normalized = unicodedata.normalize('NFD', text)
-    return ''.join(c for c in normalized if unicodedata.category(c) != 'Mn')
-
 router = APIRouter(
     prefix="/academico",
     tags=["Academico"],
@@ -35,6 +31,8 @@ class SeccionCreateRequest(BaseModel):
     cupo_maximo: int
     aula: str
     horario: Dict[str, Any]
+    # False permite guardar pese a cruces de aula o docente (aulas virtuales)
+    validar_horario: bool = True
 
 
 class SeccionUpdateRequest(BaseModel):
@@ -43,6 +41,7 @@ class SeccionUpdateRequest(BaseModel):
     cupo_maximo: Optional[int] = None
     aula: Optional[str] = None
     horario: Optional[Dict[str, Any]] = None
+    validar_horario: bool = True
 
 
 class CarreraUpdateRequest(BaseModel):
@@ -69,6 +68,25 @@ class NotaCorreccionRequest(BaseModel):
     motivo: str
 
 
+async def _validar_horario_seccion(conn, periodo_id: int, horario, aula, docente_id, seccion_id=None, cruces=True) -> None:
+    """400 si el horario es inválido o (con `cruces`) choca en aula, docente o estudiantes."""
+    try:
+        if not cruces:
+            horarios.intervalos(horario, estricto=True)
+            return
+        conflictos = await horarios.conflictos_seccion(conn, periodo_id, horario, aula, docente_id, seccion_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Horario inválido: {e}")
+    if conflictos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": conflictos[0].mensaje(),
+                "conflictos": [c.a_dict() for c in conflictos],
+            },
+        )
+
+
 def _parse_horario(horario_raw) -> dict:
     horario_data = horario_raw or {}
     if isinstance(horario_data, str):
@@ -97,6 +115,9 @@ async def crear_seccion(
                 if not docente or docente['rol'] != 'profesor':
                     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Docente inválido")
 
+            await _validar_horario_seccion(
+                conn, data.periodo_id, data.horario, data.aula, data.docente_id, cruces=data.validar_horario
+            )
             horario_json = json.dumps(data.horario)
 
             row = await conn.fetchrow("""
@@ -108,7 +129,11 @@ async def crear_seccion(
                 data.codigo, data.cupo_maximo, data.aula, horario_json)
 
             seccion_id = row['id']
+            await eventos.publicar(
+                conn, 'seccion', seccion_id=seccion_id, periodo_id=data.periodo_id, docente_id=data.docente_id,
+            )
 
+        grilla_horarios.marcar(seccion_id)
         return {
             "message": "Sección creada exitosamente",
             "seccion_id": seccion_id
@@ -129,7 +154,11 @@ async def actualizar_seccion(
 ) -> Dict[str, Any]:
     try:
         async with get_db() as conn:
-            if not await conn.fetchrow("SELECT id FROM public.secciones WHERE id = $1", seccion_id):
+            actual = await conn.fetchrow(
+                "SELECT id, periodo_id, docente_id, aula, horario FROM public.secciones WHERE id = $1 FOR UPDATE",
+                seccion_id,
+            )
+            if not actual:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sección no encontrada")
 
             updates = []
@@ -167,13 +196,28 @@ async def actualizar_seccion(
             if not updates:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No hay campos para actualizar")
 
+            if data.horario or data.aula or data.docente_id:
+                await _validar_horario_seccion(
+                    conn, actual['periodo_id'],
+                    data.horario or actual['horario'],
+                    data.aula or actual['aula'],
+                    data.docente_id or actual['docente_id'],
+                    seccion_id,
+                    cruces=data.validar_horario,
+                )
+
             params.append(seccion_id)
             await conn.execute(f"""
                 UPDATE public.secciones 
                 SET {', '.join(updates)}
                 WHERE id = ${idx}
             """, *params)
+            await eventos.publicar(
+                conn, 'seccion', seccion_id=seccion_id, periodo_id=actual['periodo_id'],
+                docente_id=data.docente_id or actual['docente_id'],
+            )
 
+        grilla_horarios.marcar(seccion_id)
         return {"message": "Sección actualizada exitosamente"}
 
     except HTTPException:
@@ -279,9 +323,10 @@ async def corregir_nota(
     try:
         async with get_db() as conn:
             inscripcion = await conn.fetchrow("""
-                SELECT i.*, u.first_name, u.last_name
+                SELECT i.*, u.first_name, u.last_name, s.docente_id
                 FROM public.inscripciones i
                 JOIN public.usuarios u ON i.estudiante_id = u.id
+                JOIN public.secciones s ON i.seccion_id = s.id
                 WHERE i.id = $1
             """, inscripcion_id)
 
@@ -309,7 +354,13 @@ async def corregir_nota(
                 SET nota_final = $1, estado = $2
                 WHERE id = $3
             """, data.nota_final, nuevo_estado, inscripcion_id)
+            await eventos.publicar(
+                conn, 'nota', inscripcion_id=inscripcion_id, estudiante_id=insc['estudiante_id'],
+                seccion_id=insc['seccion_id'], docente_id=insc['docente_id'],
+                nota_final=data.nota_final, estado=nuevo_estado,
+            )
 
+        cache_respuestas.invalidar('notas')
         return {
             "message": "Nota corregida y registrada en historial",
             "nota_anterior": float(nota_anterior) if nota_anterior else None,
@@ -382,14 +433,17 @@ async def actualizar_carrera(
             )
             if not row:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carrera no encontrada")
-            return {
-                "data": {
-                    "id": row["id"],
-                    "nombre": row["nombre"],
-                    "precio_credito": float(row["precio_credito"])
-                },
-                "message": "Carrera actualizada"
-            }
+
+        # El precio por crédito entra en el cálculo de deudas
+        cache_respuestas.invalidar('pagos')
+        return {
+            "data": {
+                "id": row["id"],
+                "nombre": row["nombre"],
+                "precio_credito": float(row["precio_credito"])
+            },
+            "message": "Carrera actualizada"
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -496,77 +550,13 @@ async def obtener_malla_curricular(
     carrera_id: int,
     current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'tesorero', 'administrativo']))
 ) -> Dict[str, Any]:
+    """Malla por semestre con prerrequisitos directos, transitivos y lo que desbloquea cada materia."""
     try:
         async with get_db() as conn:
-            carrera = await conn.fetchrow("""
-                SELECT id, nombre, creditos_totales, precio_credito, duracion_semestres, descripcion
-                FROM public.carreras WHERE id = $1
-            """, carrera_id)
-            if not carrera:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carrera no encontrada")
-            
-            prereq_rows = await conn.fetch("""
-                SELECT p.materia_id, pr.id, pr.codigo, pr.nombre
-                FROM public.prerequisitos p
-                JOIN public.materias pr ON p.prerequisito_id = pr.id
-                JOIN public.materias m  ON p.materia_id = m.id
-                WHERE m.carrera_id = $1
-            """, carrera_id)
-            prereqs_by_materia = {}
-            for row in prereq_rows:
-                r = dict(row)
-                mid = r["materia_id"]
-                if mid not in prereqs_by_materia:
-                    prereqs_by_materia[mid] = []
-                prereqs_by_materia[mid].append({
-                    "id": r["id"], "codigo": r["codigo"], "nombre": r["nombre"]
-                })
-
-            materia_rows = await conn.fetch("""
-                SELECT id, nombre, codigo, creditos, semestre, descripcion
-                FROM public.materias
-                WHERE carrera_id = $1
-                ORDER BY semestre, nombre
-            """, carrera_id)
-
-            semestres = {}
-            seen_ids = set()
-            for row in materia_rows:
-                r = dict(row)
-                if r['id'] in seen_ids:
-                    continue
-                seen_ids.add(r['id'])
-                semestre = r['semestre']
-                if semestre not in semestres:
-                    semestres[semestre] = {
-                        "numero": semestre,
-                        "materias": [],
-                        "creditos": 0
-                    }
-                semestres[semestre]["materias"].append({
-                    "id": r['id'],
-                    "codigo": r['codigo'],
-                    "nombre": r['nombre'],
-                    "creditos": r['creditos'],
-                    "descripcion": r['descripcion'],
-                    "prerrequisitos": prereqs_by_materia.get(r['id'], [])
-                })
-                semestres[semestre]["creditos"] += r['creditos']
-            
-            return {
-                "data": {
-                    "carrera": {
-                        "id": carrera['id'],
-                        "nombre": carrera['nombre'],
-                        "creditos_totales": carrera['creditos_totales'],
-                        "precio_credito": float(carrera['precio_credito']) if carrera['precio_credito'] else 0,
-                        "duracion_semestres": carrera['duracion_semestres'],
-                        "descripcion": carrera['descripcion']
-                    },
-                    "semestres": list(semestres.values()),
-                    "total_creditos": sum(s['creditos'] for s in semestres.values())
-                }
-            }
+            grafo = await malla_curricular.obtener(conn, carrera_id)
+        if grafo is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Carrera no encontrada")
+        return {"data": grafo.respuesta}
     except HTTPException:
         raise
     except Exception as e:
@@ -676,6 +666,101 @@ async def listar_periodos(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+def _filtros_estudiantes(
+    q: Optional[str],
+    carrera_id: Optional[int],
+    semestre: Optional[int],
+    es_becado: Optional[bool],
+    cedula: Optional[str] = None,
+) -> Tuple[List[str], list, Optional[str]]:
+    """
+    Filtros de /estudiantes (alias u = usuarios) compartidos con la exportación.
+
+    `cedula` es el resultado de busqueda_estudiantes.cedula_exacta(q).
+    Devuelve también la expresión de relevancia de la búsqueda (o None).
+    """
+    filtros = ["u.rol = 'estudiante'", "u.activo = true"]
+    params = []
+    idx = 1
+    relevancia = None
+
+    if q:
+        condicion, params_q, relevancia = condicion_busqueda(q, idx, cedula=cedula)
+        filtros.append(condicion)
+        params.extend(params_q)
+        idx += len(params_q)
+
+    if carrera_id:
+        filtros.append(f"u.carrera_id = ${idx}")
+        params.append(carrera_id)
+        idx += 1
+    if semestre:
+        filtros.append(f"u.semestre_actual = ${idx}")
+        params.append(semestre)
+        idx += 1
+    if es_becado is not None:
+        filtros.append(f"u.es_becado = ${idx}")
+        params.append(es_becado)
+        idx += 1
+
+    return filtros, params, relevancia
+
+
+COLUMNAS_EXPORTACION_ESTUDIANTES = [
+    ("id", lambda r: r['id']),
+    ("cedula", lambda r: r['cedula']),
+    ("apellidos", lambda r: r['last_name']),
+    ("nombres", lambda r: r['first_name']),
+    ("email", lambda r: r['email']),
+    ("carrera", lambda r: r['carrera_nombre']),
+    ("semestre_actual", lambda r: r['semestre_actual']),
+    ("promedio_acumulado", lambda r: r['promedio_acumulado']),
+    ("creditos_aprobados", lambda r: r['creditos_aprobados']),
+    ("es_becado", lambda r: r['es_becado']),
+    ("porcentaje_beca", lambda r: r['porcentaje_beca']),
+    ("tipo_beca", lambda r: r['tipo_beca']),
+    ("convenio_activo", lambda r: r['convenio_activo']),
+]
+
+
+@router.get("/elegibilidad", summary="Secciones a las que puede inscribirse cada estudiante")
+async def elegibilidad_inscripcion(
+    estudiante_id: Optional[int] = None,
+    carrera_id: Optional[int] = None,
+    semestre: Optional[int] = None,
+    periodo_id: Optional[int] = None,
+    current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'administrativo', 'admin', 'estudiante']))
+) -> Dict[str, Any]:
+    """
+    Con `estudiante_id`: secciones elegibles y bloqueadas con su motivo.
+    Sin él: la cohorte filtrada por carrera/semestre, solo ids elegibles.
+    Por defecto usa el período activo. Un estudiante solo ve lo suyo.
+    """
+    try:
+        if current_user['rol'] == 'estudiante':
+            estudiante_id = current_user['id']
+        async with get_db() as conn:
+            if periodo_id is None:
+                periodo_id = await conn.fetchval(
+                    "SELECT id FROM public.periodos_lectivos WHERE activo = true ORDER BY fecha_inicio DESC LIMIT 1"
+                )
+                if periodo_id is None:
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No hay período activo")
+            estudiantes, secciones, resultado = await elegibilidad.calcular(
+                conn, periodo_id, estudiante_id, carrera_id, semestre
+            )
+        if estudiante_id is not None and not estudiantes:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
+        return {"data": elegibilidad.respuesta(
+            estudiantes, secciones, resultado, periodo_id, individual=estudiante_id is not None
+        )}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error calculando elegibilidad: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.get("/estudiantes", summary="Listar estudiantes")
 async def listar_estudiantes(
     q: Optional[str] = None,
@@ -684,62 +769,45 @@ async def listar_estudiantes(
     es_becado: Optional[bool] = None,
     page: int = 1,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    total: Optional[ModoTotal] = None,
     current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'tesorero', 'administrativo']))
 ) -> Dict[str, Any]:
+    """
+    Con `q` se ordena por relevancia; sin `q`, por apellidos, nombres e id.
+    Paginación por `cursor` (ver services/paginacion.py) o `page` heredado.
+    """
     try:
         async with get_db() as conn:
-            filtros = ["u.rol = 'estudiante'", "u.activo = true"]
-            params = []
-            idx = 1
-            
-            if q:
-                search_term = f"%{q}%"
-                search_normalized = f"%{normalize_text(q)}%"
-                filtros.append(f"""
-                    (LOWER(u.first_name) LIKE LOWER(${idx}) 
-                    OR LOWER(u.last_name) LIKE LOWER(${idx+1})
-                    OR LOWER(u.first_name || ' ' || u.last_name) LIKE LOWER(${idx+2})
-                    OR u.cedula LIKE ${idx+3}
-                    OR LOWER(u.first_name) LIKE LOWER(${idx+4})
-                    OR LOWER(u.last_name) LIKE LOWER(${idx+5})
-                    OR LOWER(u.first_name || ' ' || u.last_name) LIKE LOWER(${idx+6}))
-                """)
-                params.extend([search_term, search_term, search_term, search_term, 
-                              search_normalized, search_normalized, search_normalized])
-                idx += 7
-            
-            if carrera_id:
-                filtros.append(f"u.carrera_id = ${idx}")
-                params.append(carrera_id)
-                idx += 1
-            if semestre:
-                filtros.append(f"u.semestre_actual = ${idx}")
-                params.append(semestre)
-                idx += 1
-            if es_becado is not None:
-                filtros.append(f"u.es_becado = ${idx}")
-                params.append(es_becado)
-                idx += 1
-            
-            where_clause = " AND ".join(filtros)
-            
-            total_row = await conn.fetchrow(f"SELECT COUNT(*) as total FROM public.usuarios u WHERE {where_clause}", *params)
-            total = total_row['total']
-            
-            param_count = len(params)
-            data_params = params + [limit, (page - 1) * limit]
+            cedula = await cedula_exacta(conn, q) if q else None
+            filtros, params, relevancia = _filtros_estudiantes(q, carrera_id, semestre, es_becado, cedula)
+            columnas = (("u.last_name", "last_name", False), ("u.first_name", "first_name", False), ("u.id", "id", False))
+            if relevancia:
+                orden = Orden("estudiantes:relevancia", ((relevancia, "relevancia", True),) + columnas)
+            else:
+                orden = Orden("estudiantes", columnas)
+
+            modo = modo_total(total, cursor)
+            cantidad = await contar(conn, modo, "public.usuarios u", " AND ".join(filtros), params, "public.usuarios")
+
+            condicion, params_cursor = condicion_cursor(orden, cursor, len(params) + 1)
+            if condicion:
+                filtros.append(condicion)
+            param_count = len(params) + len(params_cursor)
+            data_params = params + params_cursor + [limit + 1, 0 if cursor else (page - 1) * limit]
             rows = await conn.fetch(f"""
                 SELECT
                     u.id, u.first_name, u.last_name, u.cedula, u.email,
                     u.semestre_actual, u.promedio_acumulado, u.creditos_aprobados,
                     u.es_becado, u.porcentaje_beca, u.tipo_beca, u.convenio_activo,
-                    c.nombre as carrera_nombre
+                    c.nombre as carrera_nombre{f', {relevancia} AS relevancia' if relevancia else ''}
                 FROM public.usuarios u
                 LEFT JOIN public.carreras c ON u.carrera_id = c.id
-                WHERE {where_clause}
-                ORDER BY u.last_name, u.first_name
+                WHERE {" AND ".join(filtros)}
+                ORDER BY {orden.sql()}
                 LIMIT ${param_count + 1} OFFSET ${param_count + 2}
             """, *data_params)
+            rows, siguiente = recortar(orden, rows, limit)
             estudiantes = []
             for row in rows:
                 r = dict(row)
@@ -757,12 +825,52 @@ async def listar_estudiantes(
                     "tipo_beca": r['tipo_beca'],
                     "convenio_activo": r['convenio_activo']
                 })
-            return {"data": {"estudiantes": estudiantes, "total": total, "page": page, "total_pages": (total + limit - 1) // limit}}
+            return {"data": {
+                "estudiantes": estudiantes,
+                **campos_paginacion(cantidad, None if cursor else page, limit, siguiente, modo),
+            }}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listando estudiantes: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/estudiantes/exportar", summary="Exportar estudiantes (CSV/XLSX)")
+async def exportar_estudiantes(
+    q: Optional[str] = None,
+    carrera_id: Optional[int] = None,
+    semestre: Optional[int] = None,
+    es_becado: Optional[bool] = None,
+    formato: str = "csv",
+    current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'tesorero', 'administrativo']))
+):
+    """Mismos filtros que /estudiantes, sin paginar; se transmite directo desde un cursor."""
+    logger.info(f"Exportación de estudiantes ({formato}) solicitada por {current_user['cedula']}")
+    cedula = None
+    if q:
+        async with get_db_readonly() as conn:
+            cedula = await cedula_exacta(conn, q)
+    filtros, params, _ = _filtros_estudiantes(q, carrera_id, semestre, es_becado, cedula)
+    return respuesta_exportacion(
+        f"""
+        SELECT
+            u.id, u.first_name, u.last_name, u.cedula, u.email,
+            u.semestre_actual, u.promedio_acumulado, u.creditos_aprobados,
+            u.es_becado, u.porcentaje_beca, u.tipo_beca, u.convenio_activo,
+            c.nombre as carrera_nombre
+        FROM public.usuarios u
+        LEFT JOIN public.carreras c ON u.carrera_id = c.id
+        WHERE {" AND ".join(filtros)}
+        ORDER BY u.last_name, u.first_name, u.id
+        """,
+        params,
+        COLUMNAS_EXPORTACION_ESTUDIANTES,
+        formato,
+        "estudiantes",
+    )
+
+
 @router.get("/profesores", summary="Listar profesores")
 async def listar_profesores(
     current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'administrativo']))
@@ -964,27 +1072,130 @@ async def obtener_rendimiento_profesor(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+async def _periodo_o_activo(conn, periodo_id: Optional[int]) -> int:
+    """`periodo_id` o, si no viene, el período activo (404 si no hay)."""
+    if periodo_id is not None:
+        return periodo_id
+    periodo_id = await conn.fetchval(
+        "SELECT id FROM public.periodos_lectivos WHERE activo = true ORDER BY fecha_inicio DESC LIMIT 1"
+    )
+    if periodo_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No hay período activo")
+    return periodo_id
+
+
+@router.get("/horarios/conflictos", summary="Auditoría de cruces de horario del período")
+async def auditar_horarios(
+    periodo_id: Optional[int] = None,
+    current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'admin']))
+) -> Dict[str, Any]:
+    """Cruces de aula, docente y estudiante de todo el período (por defecto el activo)."""
+    try:
+        async with get_db_readonly() as conn:
+            periodo_id = await _periodo_o_activo(conn, periodo_id)
+            secciones = await conn.fetch("""
+                SELECT id, codigo, aula, docente_id, horario
+                FROM public.secciones
+                WHERE periodo_id = $1
+            """, periodo_id)
+            inscripciones = await conn.fetch("""
+                SELECT i.estudiante_id, i.seccion_id
+                FROM public.inscripciones i
+                JOIN public.secciones s ON s.id = i.seccion_id
+                WHERE s.periodo_id = $1 AND i.estado <> 'retirado'
+            """, periodo_id)
+        auditoria = horarios.auditar(
+            [dict(r) for r in secciones],
+            ((r['estudiante_id'], r['seccion_id']) for r in inscripciones),
+        )
+        return {"data": {"periodo_id": periodo_id, "secciones": len(secciones), **auditoria}}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error auditando horarios: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/horarios/grilla", summary="Grilla semanal del período por franjas")
+async def grilla_horarios_periodo(
+    request: Request,
+    periodo_id: Optional[int] = None,
+    carrera_id: Optional[int] = None,
+    aula: Optional[str] = None,
+    docente_id: Optional[int] = None,
+    current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'admin', 'administrativo', 'profesor']))
+):
+    """
+    Bloques por día y franja del período (por defecto el activo), filtrables
+    por carrera, aula y docente. Responde 304 si el ETag no cambió.
+    """
+    try:
+        async with get_db() as conn:
+            periodo_id = await _periodo_o_activo(conn, periodo_id)
+            grilla = await grilla_horarios.obtener(conn, periodo_id)
+        if grilla is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Período no encontrado")
+        entrada, estado = grilla.vista(
+            ('grilla', carrera_id, horarios.clave_aula(aula), docente_id),
+            lambda: {"data": grilla.grilla(carrera_id, aula, docente_id)},
+        )
+        return cache_respuestas.responder(request, entrada, estado)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error obteniendo grilla de horarios: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.get("/horarios/ocupacion", summary="Ocupación de aulas del período")
+async def ocupacion_aulas(
+    request: Request,
+    periodo_id: Optional[int] = None,
+    current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'admin', 'administrativo']))
+):
+    """Porcentaje de uso de cada aula, mapa de aulas en uso por franja y franjas pico."""
+    try:
+        async with get_db() as conn:
+            periodo_id = await _periodo_o_activo(conn, periodo_id)
+            grilla = await grilla_horarios.obtener(conn, periodo_id)
+        if grilla is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Período no encontrado")
+        entrada, estado = grilla.vista(('ocupacion',), lambda: {"data": grilla.ocupacion()})
+        return cache_respuestas.responder(request, entrada, estado)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error obteniendo ocupación de aulas: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
 @router.get("/horarios", summary="Obtener horarios de todas las secciones")
 async def obtener_horarios(
+    request: Request,
     periodo_id: Optional[int] = None,
     carrera_id: Optional[int] = None,
     current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'admin', 'administrativo', 'profesor']))
-) -> Dict[str, Any]:
+):
+    """
+    Con `periodo_id` se sirve desde la grilla del período en memoria
+    (services/grilla_horarios.py); sin él se listan todos los períodos.
+    """
     try:
         async with get_db() as conn:
-            params = []
-            conditions = []
-            idx = 1
             if periodo_id:
-                conditions.append(f"s.periodo_id = ${idx}")
-                params.append(periodo_id)
-                idx += 1
+                grilla = await grilla_horarios.obtener(conn, periodo_id)
+                if grilla is None:
+                    return cache_respuestas.responder(request, cache_respuestas.preparar({"data": {"secciones": []}}))
+                entrada, estado = grilla.vista(
+                    ('listado', carrera_id), lambda: {"data": {"secciones": grilla.listado(carrera_id)}},
+                )
+                return cache_respuestas.responder(request, entrada, estado)
+
+            params = []
+            where_clause = ""
             if carrera_id:
-                conditions.append(f"m.carrera_id = ${idx}")
+                where_clause = "WHERE m.carrera_id = $1"
                 params.append(carrera_id)
-                idx += 1
-
-            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
             rows = await conn.fetch(f"""
                 SELECT 
@@ -1030,7 +1241,7 @@ async def obtener_horarios(
                     "cupo_actual": r['cupo_actual']
                 })
 
-            return {"data": {"secciones": secciones}}
+            return cache_respuestas.responder(request, cache_respuestas.preparar({"data": {"secciones": secciones}}))
     except Exception as e:
         logger.error(f"Error obteniendo horarios: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -7,6 +7,10 @@ from passlib.context import CryptContext
 
 from auth.dependencies import require_roles
 from database import get_db
+from services import cache_respuestas, elegibilidad, eventos, horarios, kpis
+from services.paginacion import (
+    ModoTotal, Orden, campos_paginacion, condicion_cursor, contar, modo_total, recortar,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +27,9 @@ class InscripcionRequest(BaseModel):
     estudiante_id: int
     seccion_id: int
     generar_pago: bool = True
+    # False solo para excepciones autorizadas (equivalencias, homologaciones)
+    validar_prerrequisitos: bool = True
+    validar_horario: bool = True
 
 
 class PrimeraMatriculaRequest(BaseModel):
@@ -74,11 +81,15 @@ async def inscribir_estudiante(
 ) -> Dict[str, Any]:
     try:
         async with get_db() as conn:
-            estudiante = await conn.fetchrow("SELECT id, rol FROM public.usuarios WHERE id = $1", data.estudiante_id)
+            estudiante = await conn.fetchrow(
+                "SELECT id, rol, carrera_id, es_becado FROM public.usuarios WHERE id = $1", data.estudiante_id
+            )
             if not estudiante or estudiante['rol'] != 'estudiante':
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Estudiante no encontrado")
 
-            seccion = await conn.fetchrow("SELECT id, cupo_maximo, cupo_actual FROM public.secciones WHERE id = $1", data.seccion_id)
+            seccion = await conn.fetchrow(
+                "SELECT id, cupo_maximo, cupo_actual, docente_id FROM public.secciones WHERE id = $1", data.seccion_id
+            )
             if not seccion:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sección no encontrada")
 
@@ -89,8 +100,23 @@ async def inscribir_estudiante(
                        data.estudiante_id, data.seccion_id):
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Estudiante ya inscrito en esta sección")
 
+            if data.validar_prerrequisitos:
+                await elegibilidad.validar_inscripcion(conn, data.estudiante_id, data.seccion_id)
+
+            if data.validar_horario:
+                cruces = await horarios.conflictos_inscripcion(conn, data.estudiante_id, data.seccion_id)
+                if cruces:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail={
+                            "error": cruces[0].mensaje(),
+                            "conflictos": [c.a_dict() for c in cruces],
+                        },
+                    )
+
             pago_id = None
             monto = Decimal('0.00')
+            mora_antes = await kpis.estudiante_en_mora(conn, data.estudiante_id)
             if data.generar_pago:
                 est = dict(await conn.fetchrow("""
                     SELECT u.es_becado, u.porcentaje_beca, u.carrera_id, c.precio_credito
@@ -117,9 +143,10 @@ async def inscribir_estudiante(
                 pago_row = await conn.fetchrow("""
                     INSERT INTO public.pagos (estudiante_id, monto, metodo_pago, fecha_pago, estado, periodo_id, concepto)
                     VALUES ($1, $2, 'pendiente', NOW(), 'pendiente', $3, 'Inscripción')
-                    RETURNING id
+                    RETURNING id, estado, monto, periodo_id
                 """, data.estudiante_id, monto, materia_info['periodo_id'])
                 pago_id = pago_row['id']
+                await kpis.registrar_cambio_pagos(conn, nuevos=[pago_row])
 
             insc_row = await conn.fetchrow("""
                 INSERT INTO public.inscripciones (estudiante_id, seccion_id, pago_id, estado)
@@ -130,6 +157,15 @@ async def inscribir_estudiante(
 
             await conn.execute("UPDATE public.secciones SET cupo_actual = cupo_actual + 1 WHERE id = $1", data.seccion_id)
 
+            # Sin pago generado la inscripción queda adeudada (pago_id NULL)
+            mora_despues = mora_antes or pago_id is None
+            await kpis.registrar_cambio_usuario(conn, estudiante, estudiante, mora_antes, mora_despues)
+            await eventos.publicar(
+                conn, 'inscripcion', inscripcion_id=inscripcion_id, estudiante_id=data.estudiante_id,
+                seccion_id=data.seccion_id, docente_id=seccion['docente_id'], pago_id=pago_id, monto=float(monto),
+            )
+
+        cache_respuestas.invalidar('inscripciones', 'pagos')
         return {
             "message": "Estudiante inscrito exitosamente",
             "inscripcion_id": inscripcion_id,
@@ -144,14 +180,25 @@ async def inscribir_estudiante(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+ORDEN_USUARIOS = Orden("usuarios", (
+    ("u.rol", "rol", False),
+    ("u.last_name", "last_name", False),
+    ("u.first_name", "first_name", False),
+    ("u.id", "id", False),
+))
+
+
 @router.get("/usuarios", summary="Listar usuarios del sistema")
 async def listar_usuarios(
     rol: Optional[str] = None,
     activo: Optional[bool] = None,
     page: int = 1,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    total: Optional[ModoTotal] = None,
     current_user: Dict[str, Any] = Depends(require_roles(['administrativo', 'director', 'admin', 'coordinador']))
 ) -> Dict[str, Any]:
+    """Ordenados por rol, apellidos, nombres e id; paginación por `cursor` o `page`."""
     try:
         async with get_db() as conn:
             filtros = []
@@ -166,22 +213,26 @@ async def listar_usuarios(
                 params.append(activo)
                 idx += 1
 
-            where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
+            modo = modo_total(total, cursor)
+            cantidad = await contar(conn, modo, "public.usuarios u", " AND ".join(filtros), params, "public.usuarios")
 
-            total_row = await conn.fetchrow(f"SELECT COUNT(*) as total FROM public.usuarios u {where}", *params)
-            total = total_row['total']
+            condicion, params_cursor = condicion_cursor(ORDEN_USUARIOS, cursor, idx)
+            if condicion:
+                filtros.append(condicion)
+            where = f"WHERE {' AND '.join(filtros)}" if filtros else ""
 
-            param_count = len(params)
-            data_params = params + [limit, (page - 1) * limit]
+            param_count = len(params) + len(params_cursor)
+            data_params = params + params_cursor + [limit + 1, 0 if cursor else (page - 1) * limit]
             rows = await conn.fetch(f"""
                 SELECT u.id, u.cedula, u.email, u.first_name, u.last_name,
                     u.rol, u.activo, u.carrera_id, c.nombre as carrera_nombre
                 FROM public.usuarios u
                 LEFT JOIN public.carreras c ON u.carrera_id = c.id
                 {where}
-                ORDER BY u.rol, u.last_name
+                ORDER BY {ORDEN_USUARIOS.sql()}
                 LIMIT ${param_count + 1} OFFSET ${param_count + 2}
             """, *data_params)
+            rows, siguiente = recortar(ORDEN_USUARIOS, rows, limit)
 
             usuarios = []
             for row in rows:
@@ -198,13 +249,13 @@ async def listar_usuarios(
 
         return {
             "data": {
-                "usuarios":    usuarios,
-                "total":       total,
-                "page":        page,
-                "total_pages": (total + limit - 1) // limit
+                "usuarios": usuarios,
+                **campos_paginacion(cantidad, None if cursor else page, limit, siguiente, modo),
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listando usuarios: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -217,10 +268,7 @@ async def crear_usuario(
 ) -> Dict[str, Any]:
     try:
         async with get_db() as conn:
-            cur = conn.cursor()
-
-            cur.execute("SELECT id FROM public.usuarios WHERE cedula = %s OR email = %s", (data.cedula, data.email))
-            if cur.fetchone():
+            if await conn.fetchrow("SELECT id FROM public.usuarios WHERE cedula = $1 OR email = $2", data.cedula, data.email):
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario ya existe (cédula o email duplicado)")
 
             password_hash = pwd_context.hash(data.password)
@@ -231,13 +279,15 @@ async def crear_usuario(
                 (username, cedula, email, first_name, last_name, password_hash, rol, carrera_id,
                  es_becado, porcentaje_beca, titulo_academico, especialidad, activo, semestre_actual)
                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, true, 1)
-                RETURNING id
+                RETURNING id, rol, carrera_id, es_becado
             """, username, data.cedula, data.email, data.first_name, data.last_name,
                 password_hash, data.rol, data.carrera_id, data.es_becado,
                 data.porcentaje_beca, data.titulo_academico, data.especialidad)
 
             usuario_id = row['id']
+            await kpis.registrar_cambio_usuario(conn, None, row)
 
+        cache_respuestas.invalidar('usuarios')
         return {"message": "Usuario creado exitosamente", "id": usuario_id, "usuario_id": usuario_id, "cedula": data.cedula}
 
     except HTTPException:
@@ -255,7 +305,10 @@ async def actualizar_usuario(
 ) -> Dict[str, Any]:
     try:
         async with get_db() as conn:
-            if not await conn.fetchrow("SELECT id FROM public.usuarios WHERE id = $1", usuario_id):
+            antes = await conn.fetchrow(
+                "SELECT id, rol, carrera_id, es_becado FROM public.usuarios WHERE id = $1 FOR UPDATE", usuario_id
+            )
+            if not antes:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
 
             updates = []
@@ -292,8 +345,18 @@ async def actualizar_usuario(
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No hay campos para actualizar")
 
             params.append(usuario_id)
-            await conn.execute(f"UPDATE public.usuarios SET {', '.join(updates)} WHERE id = ${idx}", *params)
-
+            despues = await conn.fetchrow(
+                f"UPDATE public.usuarios SET {', '.join(updates)} WHERE id = ${idx} RETURNING rol, carrera_id, es_becado",
+                *params
+            )
+            if antes['rol'] == 'estudiante':
+                en_mora = await kpis.estudiante_en_mora(conn, usuario_id)
+                await kpis.registrar_cambio_usuario(conn, antes, despues, en_mora, en_mora)
+                await eventos.publicar(conn, 'usuario', estudiante_id=usuario_id)
+            else:
+                await kpis.registrar_cambio_usuario(conn, antes, despues)
+
+        cache_respuestas.invalidar('usuarios', 'pagos')
         return {"message": "Usuario actualizado exitosamente"}
 
     except HTTPException:
@@ -327,10 +390,11 @@ async def registrar_primera_matricula(
                 (username, cedula, email, first_name, last_name, password_hash, rol, carrera_id,
                  es_becado, porcentaje_beca, activo, semestre_actual)
                 VALUES ($1, $2, $3, $4, $5, $6, 'estudiante', $7, $8, $9, true, 1)
-                RETURNING id
+                RETURNING id, rol, carrera_id, es_becado
             """, username, data.cedula, data.email, data.first_name, data.last_name,
                 password_hash, data.carrera_id, data.es_becado, data.porcentaje_beca)
             estudiante_id = est_row['id']
+            await kpis.registrar_cambio_usuario(conn, None, est_row)
 
             monto_creditos = Decimal(str(data.creditos)) * Decimal(str(data.precio_credito))
             monto_total = Decimal(str(data.valor_inscripcion)) + monto_creditos
@@ -346,12 +410,18 @@ async def registrar_primera_matricula(
                 INSERT INTO public.pagos
                 (estudiante_id, monto, metodo_pago, fecha_pago, estado, referencia, concepto, periodo_id)
                 VALUES ($1, $2, $3, NOW(), 'completado', $4, $5, $6)
-                RETURNING id
+                RETURNING id, estado, monto, periodo_id
             """, estudiante_id, monto_total, data.metodo_pago, data.referencia,
                 f'Primera Matrícula - {data.creditos} créditos - {carrera["nombre"]}',
                 periodo_id)
             pago_id = pago_row['id']
+            await kpis.registrar_cambio_pagos(conn, nuevos=[pago_row])
+            await eventos.publicar(
+                conn, 'pago', estudiante_id=estudiante_id, pagos=1,
+                monto=float(monto_total), estado='completado',
+            )
 
+        cache_respuestas.invalidar('usuarios', 'pagos')
         return {
             "message": "Primera matrícula registrada exitosamente",
             "estudiante": {
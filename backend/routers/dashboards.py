@@ -3,14 +3,19 @@ dashboards.py — N+1 ELIMINADO
 Antes: loop sobre ~492 estudiantes × 3-5 queries c/u = ~2000 queries → 50 segundos
 Ahora: 1 JOIN por endpoint → <1 segundo
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from typing import Dict, Any, Optional
 from decimal import Decimal
 import logging
 import json
 
+import asyncpg
+
 from auth.dependencies import require_roles, get_current_user
 from database import get_db
+from services import kpis
+from services.paralelo import en_paralelo, fetch, fetchrow
+from services.cache_respuestas import cache_respuesta
 
 logger = logging.getLogger(__name__)
 
@@ -32,62 +37,121 @@ def _parse_horario(horario_raw) -> str:
     return f"{', '.join(dias)} {horario_data.get('hora_inicio', '')}-{horario_data.get('hora_fin', '')}".strip()
 
 
+async def _kpis_en_vivo(conn) -> Dict[str, Any]:
+    """Cálculo directo sobre las tablas (lo que hacen las vistas materializadas)."""
+    stats_row, carreras_rows, alumnos_mora_rows = await en_paralelo(
+        conn,
+        fetchrow("""
+            SELECT
+                (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'estudiante') as total_estudiantes,
+                (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'profesor')   as total_profesores,
+                (SELECT COUNT(*) FROM public.materias)                          as materias_totales,
+                (SELECT COUNT(*) FROM public.secciones)                         as total_secciones,
+                (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'estudiante' AND es_becado = true) as estudiantes_becados,
+                (SELECT COUNT(DISTINCT i.estudiante_id) FROM public.inscripciones i WHERE i.pago_id IS NULL) as estudiantes_mora,
+                (SELECT COALESCE(AVG(nota_final), 0) FROM public.inscripciones WHERE nota_final IS NOT NULL) as promedio_institucional,
+                (SELECT COALESCE(SUM(monto), 0) FROM public.pagos) as ingresos_totales,
+                NOW() as generated_at
+        """),
+        fetch("""
+            SELECT c.id as carrera_id, c.nombre, COUNT(u.id) as num_alumnos
+            FROM public.carreras c
+            LEFT JOIN public.usuarios u ON u.carrera_id = c.id AND u.rol = 'estudiante'
+            GROUP BY c.id, c.nombre
+            ORDER BY num_alumnos DESC
+        """),
+        fetch("""
+            SELECT
+                u.id,
+                u.first_name || ' ' || u.last_name  AS nombre_completo,
+                u.cedula,
+                COALESCE(SUM(
+                    m.creditos
+                    * c.precio_credito
+                    * (1.0 - COALESCE(u.porcentaje_beca, 0) / 100.0)
+                ), 0) AS deuda_total
+            FROM public.usuarios u
+            JOIN public.inscripciones i ON i.estudiante_id = u.id AND i.pago_id IS NULL
+            JOIN public.secciones     s ON i.seccion_id = s.id
+            JOIN public.materias      m ON s.materia_id = m.id
+            JOIN public.carreras      c ON u.carrera_id = c.id
+            WHERE u.rol = 'estudiante'
+            GROUP BY u.id, u.first_name, u.last_name, u.cedula
+            ORDER BY deuda_total DESC
+            LIMIT 50
+        """),
+    )
+    return {
+        "stats": dict(stats_row),
+        "estudiantes_por_carrera": [dict(r) for r in carreras_rows],
+        "alumnos_mora": alumnos_mora_rows,
+    }
+
+
+async def _kpis_materializados(conn) -> Optional[Dict[str, Any]]:
+    """Lee las vistas materializadas; None si aún no existen (migración pendiente)."""
+    try:
+        # Savepoint: si la vista no existe, la transacción sigue usable para el cálculo en vivo
+        async with conn.transaction():
+            stats_row = await conn.fetchrow("SELECT * FROM public.mv_kpi_institucional WHERE id = 1")
+    except asyncpg.UndefinedTableError:
+        return None
+    if not stats_row:
+        return None
+
+    carreras_rows, alumnos_mora_rows = await en_paralelo(
+        conn,
+        fetch("""
+            SELECT carrera_id, nombre, num_alumnos
+            FROM public.mv_estudiantes_por_carrera
+            ORDER BY num_alumnos DESC
+        """),
+        fetch("""
+            SELECT id, nombre_completo, cedula, deuda_total
+            FROM public.mv_alumnos_mora
+            ORDER BY deuda_total DESC
+            LIMIT 50
+        """),
+    )
+    estudiantes_por_carrera = [dict(r) for r in carreras_rows]
+    return {"stats": dict(stats_row), "estudiantes_por_carrera": estudiantes_por_carrera, "alumnos_mora": alumnos_mora_rows}
+
+
 @router.get("/institucional", summary="Dashboard Institucional")
+@cache_respuesta(
+    ttl=60,
+    etiquetas=('usuarios', 'pagos', 'inscripciones', 'notas'),
+    omitir=lambda kw: kw['fresh'] and kw['current_user']['rol'] == 'director',
+)
 async def dashboard_institucional(
+    request: Request,
+    fresh: bool = False,
     current_user: Dict[str, Any] = Depends(require_roles(['director', 'admin', 'coordinador', 'administrativo']))
 ) -> Dict[str, Any]:
+    """
+    KPIs institucionales desde vistas materializadas (refrescadas por el
+    scheduler). `generated_at` indica cuándo se calcularon. Un director puede
+    pedir `?fresh=true` para calcularlos en vivo.
+    """
     try:
         async with get_db() as conn:
-            stats = dict(await conn.fetchrow("""
-                SELECT
-                    (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'estudiante') as total_estudiantes,
-                    (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'profesor')   as total_profesores,
-                    (SELECT COUNT(*) FROM public.materias)                          as materias_totales,
-                    (SELECT COUNT(*) FROM public.secciones)                         as total_secciones,
-                    (SELECT COUNT(*) FROM public.usuarios WHERE rol = 'estudiante' AND es_becado = true) as estudiantes_becados,
-                    (SELECT COUNT(DISTINCT i.estudiante_id) FROM public.inscripciones i WHERE i.pago_id IS NULL) as estudiantes_mora,
-                    (SELECT COALESCE(AVG(nota_final), 0) FROM public.inscripciones WHERE nota_final IS NOT NULL) as promedio_institucional,
-                    (SELECT COALESCE(SUM(monto), 0) FROM public.pagos) as ingresos_totales
-            """))
-
-            estudiantes_por_carrera = [dict(r) for r in await conn.fetch("""
-                SELECT c.id as carrera_id, c.nombre, COUNT(u.id) as num_alumnos
-                FROM public.carreras c
-                LEFT JOIN public.usuarios u ON u.carrera_id = c.id AND u.rol = 'estudiante'
-                GROUP BY c.id, c.nombre
-                ORDER BY num_alumnos DESC
-            """)]
-
-            alumnos_mora_rows = await conn.fetch("""
-                SELECT
-                    u.id,
-                    u.first_name || ' ' || u.last_name  AS nombre_completo,
-                    u.cedula,
-                    COALESCE(SUM(
-                        m.creditos
-                        * c.precio_credito
-                        * (1.0 - COALESCE(u.porcentaje_beca, 0) / 100.0)
-                    ), 0) AS deuda_total
-                FROM public.usuarios u
-                JOIN public.inscripciones i ON i.estudiante_id = u.id AND i.pago_id IS NULL
-                JOIN public.secciones     s ON i.seccion_id = s.id
-                JOIN public.materias      m ON s.materia_id = m.id
-                JOIN public.carreras      c ON u.carrera_id = c.id
-                WHERE u.rol = 'estudiante'
-                GROUP BY u.id, u.first_name, u.last_name, u.cedula
-                ORDER BY deuda_total DESC
-                LIMIT 50
-            """)
-            alumnos_mora = []
-            for row in alumnos_mora_rows:
-                r = dict(row)
-                alumnos_mora.append({
-                    'id':              r['id'],
-                    'nombre_completo': r['nombre_completo'],
-                    'cedula':          r['cedula'],
-                    'deuda_total':     str(round(float(r['deuda_total']), 2)),
-                    'en_mora':         True,
-                })
+            datos = None
+            if not (fresh and current_user['rol'] == 'director'):
+                datos = await _kpis_materializados(conn)
+            if datos is None:
+                datos = await _kpis_en_vivo(conn)
+
+        stats = datos["stats"]
+        alumnos_mora = []
+        for row in datos["alumnos_mora"]:
+            r = dict(row)
+            alumnos_mora.append({
+                'id':              r['id'],
+                'nombre_completo': r['nombre_completo'],
+                'cedula':          r['cedula'],
+                'deuda_total':     str(round(float(r['deuda_total']), 2)),
+                'en_mora':         True,
+            })
 
         return {
             "total_estudiantes":       int(stats['total_estudiantes']),
@@ -99,8 +163,9 @@ async def dashboard_institucional(
             "estudiantes_mora":        int(stats['estudiantes_mora']),
             "promedio_institucional":  round(float(stats['promedio_institucional']), 2),
             "ingresos_totales":        float(stats['ingresos_totales']),
-            "estudiantes_por_carrera": estudiantes_por_carrera,
+            "estudiantes_por_carrera": datos["estudiantes_por_carrera"],
             "alumnos_mora":            alumnos_mora,
+            "generated_at":            stats['generated_at'].isoformat() if stats.get('generated_at') else None,
         }
 
     except Exception as e:
@@ -109,17 +174,26 @@ async def dashboard_institucional(
 
 
 @router.get("/finanzas", summary="Dashboard de Tesorería")
+@cache_respuesta(ttl=60, etiquetas=('pagos', 'inscripciones', 'usuarios'))
 async def dashboard_finanzas(
+    request: Request,
     current_user: Dict[str, Any] = Depends(require_roles(['tesorero', 'director', 'admin']))
 ) -> Dict[str, Any]:
     try:
         async with get_db() as conn:
-            montos = dict(await conn.fetchrow("""
-                SELECT
-                    COALESCE(SUM(monto), 0) as total_proyectado,
-                    COALESCE(SUM(CASE WHEN estado = 'completado' THEN monto ELSE 0 END), 0) as ingreso_real
-                FROM public.pagos
-            """))
+            contadores = await kpis.leer_contadores(conn)
+            if contadores is not None:
+                montos = {
+                    'total_proyectado': contadores['ingresos_totales'],
+                    'ingreso_real':     contadores['monto_completado'],
+                }
+            else:
+                montos = dict(await conn.fetchrow("""
+                    SELECT
+                        COALESCE(SUM(monto), 0) as total_proyectado,
+                        COALESCE(SUM(CASE WHEN estado = 'completado' THEN monto ELSE 0 END), 0) as ingreso_real
+                    FROM public.pagos
+                """))
             total_proyectado = Decimal(str(montos['total_proyectado']))
             ingreso_real     = Decimal(str(montos['ingreso_real']))
             tasa_cobranza    = (ingreso_real / total_proyectado * 100) if total_proyectado > 0 else Decimal('0.00')
@@ -230,7 +304,9 @@ async def dashboard_profesor(
 
 
 @router.get("/resumen", summary="Resumen rápido del sistema")
+@cache_respuesta(ttl=30, etiquetas=('pagos', 'inscripciones', 'usuarios'), por_usuario=True)
 async def resumen_sistema(
+    request: Request,
     current_user: Dict[str, Any] = Depends(get_current_user)
 ) -> Dict[str, Any]:
     try:
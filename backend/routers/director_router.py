@@ -11,6 +11,10 @@ import logging
 
 from auth.dependencies import require_roles
 from database import get_db
+from services import eventos, politicas_ia
+from services.paginacion import (
+    ModoTotal, Orden, campos_paginacion, condicion_cursor, contar, modo_total, recortar,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -30,18 +34,29 @@ class ConfiguracionUpdateRequest(BaseModel):
 # HISTORIAL DE CORRECCIONES DE NOTAS
 # ─────────────────────────────────────────────────────────────────
 
+ORDEN_HISTORIAL = Orden("historial_notas", (
+    ("hn.fecha_modificacion", "fecha_modificacion", True),
+    ("hn.id", "id", True),
+))
+
+
 @router.get("/historial-notas", summary="Historial de correcciones de notas")
 async def historial_notas(
     page: int = 1,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    total: Optional[ModoTotal] = None,
     current_user: Dict[str, Any] = Depends(require_roles(["director", "admin"]))
 ) -> Dict[str, Any]:
+    """Más recientes primero; paginación por `cursor` o `page`."""
     try:
         async with get_db() as conn:
-            total_row = await conn.fetchrow("SELECT COUNT(*) as total FROM public.historial_notas")
-            total = total_row["total"]
+            modo = modo_total(total, cursor)
+            cantidad = await contar(conn, modo, "public.historial_notas hn", "", [], "public.historial_notas")
 
-            rows = await conn.fetch("""
+            condicion, params_cursor = condicion_cursor(ORDEN_HISTORIAL, cursor, 1)
+            n = len(params_cursor)
+            rows = await conn.fetch(f"""
                 SELECT
                     hn.id,
                     hn.inscripcion_id,
@@ -54,9 +69,11 @@ async def historial_notas(
                     hn.modificado_por
                 FROM public.historial_notas hn
                 LEFT JOIN public.usuarios u ON hn.modificado_por = u.id::TEXT
-                ORDER BY hn.fecha_modificacion DESC
-                LIMIT $1 OFFSET $2
-            """, limit, (page - 1) * limit)
+                {f'WHERE {condicion}' if condicion else ''}
+                ORDER BY {ORDEN_HISTORIAL.sql()}
+                LIMIT ${n + 1} OFFSET ${n + 2}
+            """, *params_cursor, limit + 1, 0 if cursor else (page - 1) * limit)
+            rows, siguiente = recortar(ORDEN_HISTORIAL, rows, limit)
 
             registros = []
             for row in rows:
@@ -75,13 +92,13 @@ async def historial_notas(
 
         return {
             "data": {
-                "registros":   registros,
-                "total":       total,
-                "page":        page,
-                "total_pages": max(1, -(-total // limit)),  # ceil division
+                "registros": registros,
+                **campos_paginacion(cantidad, None if cursor else page, limit, siguiente, modo),
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error obteniendo historial notas: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -121,6 +138,10 @@ async def actualizar_configuracion(
                 ON CONFLICT (clave) DO UPDATE
                 SET valor = EXCLUDED.valor, actualizado_en = NOW()
             """, clave, data.valor)
+            await eventos.publicar(conn, 'configuracion', clave=clave)
+
+        # El evento llega a todos los workers; este no espera al LISTEN
+        politicas_ia.invalidar()
 
         logger.info(f"Director {current_user['cedula']} actualizó config: {clave} = {data.valor}")
 
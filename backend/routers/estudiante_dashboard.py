@@ -14,6 +14,7 @@ import logging
 
 from auth.dependencies import require_roles, get_current_user
 from database import get_db
+from services.paralelo import en_paralelo, fetch, fetchrow
 
 logger = logging.getLogger(__name__)
 
@@ -290,12 +291,38 @@ async def pagos_estudiante(
 
             est_dict = dict(estudiante)
 
-            pagos_rows = await conn.fetch("""
-                SELECT id, fecha_pago, monto, metodo_pago, estado, referencia, concepto
-                FROM public.pagos
-                WHERE estudiante_id = $1
-                ORDER BY fecha_pago DESC
-            """, user_id)
+            pagos_rows, total_row, deuda_row, periodo_actual = await en_paralelo(
+                conn,
+                fetch("""
+                    SELECT id, fecha_pago, monto, metodo_pago, estado, referencia, concepto
+                    FROM public.pagos
+                    WHERE estudiante_id = $1
+                    ORDER BY fecha_pago DESC
+                """, user_id),
+                fetchrow("""
+                    SELECT COALESCE(SUM(monto), 0) as total
+                    FROM public.pagos
+                    WHERE estudiante_id = $1 AND estado = 'completado'
+                """, user_id),
+                fetchrow("""
+                    SELECT COALESCE(SUM(
+                        m.creditos
+                        * c.precio_credito
+                        * (1.0 - COALESCE($1::numeric, 0) / 100.0)
+                    ), 0) AS deuda_total
+                    FROM public.inscripciones i
+                    JOIN public.secciones s ON i.seccion_id = s.id
+                    JOIN public.materias  m ON s.materia_id = m.id
+                    JOIN public.carreras  c ON c.id = $2
+                    WHERE i.estudiante_id = $3 AND i.pago_id IS NULL
+                """, est_dict.get('porcentaje_beca', 0), est_dict.get('carrera_id'), user_id),
+                fetchrow("""
+                    SELECT fecha_fin FROM public.periodos_lectivos
+                    WHERE activo = true
+                    ORDER BY fecha_inicio DESC
+                    LIMIT 1
+                """),
+            )
 
             pagos = [
                 {
@@ -310,33 +337,9 @@ async def pagos_estudiante(
                 for r in (dict(row) for row in pagos_rows)
             ]
 
-            total_row = await conn.fetchrow("""
-                SELECT COALESCE(SUM(monto), 0) as total
-                FROM public.pagos
-                WHERE estudiante_id = $1 AND estado = 'completado'
-            """, user_id)
             total_pagado = float(total_row['total'])
-
-            deuda_row = await conn.fetchrow("""
-                SELECT COALESCE(SUM(
-                    m.creditos
-                    * c.precio_credito
-                    * (1.0 - COALESCE($1::numeric, 0) / 100.0)
-                ), 0) AS deuda_total
-                FROM public.inscripciones i
-                JOIN public.secciones s ON i.seccion_id = s.id
-                JOIN public.materias  m ON s.materia_id = m.id
-                JOIN public.carreras  c ON c.id = $2
-                WHERE i.estudiante_id = $3 AND i.pago_id IS NULL
-            """, est_dict.get('porcentaje_beca', 0), est_dict.get('carrera_id'), user_id)
             deuda_pendiente = float(deuda_row['deuda_total'] or 0)
 
-            periodo_actual = await conn.fetchrow("""
-                SELECT fecha_fin FROM public.periodos_lectivos
-                WHERE activo = true
-                ORDER BY fecha_inicio DESC
-                LIMIT 1
-            """)
             proximo_vencimiento = None
             if periodo_actual and periodo_actual['fecha_fin']:
                 proximo_vencimiento = periodo_actual['fecha_fin'].isoformat()
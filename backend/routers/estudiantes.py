@@ -16,6 +16,7 @@ import logging
 
 from auth.dependencies import require_roles
 from database import get_db
+from services import cache_respuestas, eventos, kpis
 
 logger = logging.getLogger(__name__)
 
@@ -49,8 +50,10 @@ async def registrar_pago(
 
     try:
         async with get_db() as conn:
+            # FOR UPDATE: dos pagos simultáneos del mismo estudiante se
+            # serializan; el segundo ve las inscripciones ya pagadas
             estudiante = await conn.fetchrow(
-                "SELECT id, cedula, first_name, last_name, rol, carrera_id, es_becado, porcentaje_beca FROM public.usuarios WHERE id = $1 AND rol = 'estudiante'",
+                "SELECT id, cedula, first_name, last_name, rol, carrera_id, es_becado, porcentaje_beca FROM public.usuarios WHERE id = $1 AND rol = 'estudiante' FOR UPDATE",
                 estudiante_id
             )
 
@@ -76,6 +79,7 @@ async def registrar_pago(
             pagos_creados = 0
             monto_total = Decimal('0.00')
             inscripciones_pagadas = []
+            pagos_nuevos = []
 
             for insc in inscripciones_pendientes:
                 insc_dict = dict(insc)
@@ -96,11 +100,12 @@ async def registrar_pago(
                         INSERT INTO public.pagos (estudiante_id, monto, metodo_pago, fecha_pago, referencia, estado, periodo_id)
                         SELECT $1, $2, $3, NOW(), $4, 'completado',
                                (SELECT periodo_id FROM public.secciones WHERE id = $5)
-                        RETURNING id
+                        RETURNING id, estado, monto, periodo_id
                         """,
                         estudiante_id, costo, pago_data.metodo_pago, pago_data.comprobante or f"PAGO-{datetime.now().timestamp()}", insc_dict['seccion_id']
                     )
                     pago_id = pago['id']
+                    pagos_nuevos.append(pago)
 
                     await conn.execute("UPDATE public.inscripciones SET pago_id = $1 WHERE id = $2", pago_id, insc_dict['id'])
 
@@ -112,12 +117,24 @@ async def registrar_pago(
                     logger.error(f"Error procesando inscripción {insc_dict['id']}: {e_pago}")
                     continue
 
-            return {
-                "message": f"Pago registrado exitosamente. Total: ${float(monto_total):.2f}",
-                "pagos_registrados": pagos_creados,
-                "monto_total": float(monto_total),
-                "inscripciones_pagadas": inscripciones_pagadas
-            }
+            await kpis.registrar_cambio_pagos(conn, nuevos=pagos_nuevos)
+            if pagos_creados:
+                await eventos.publicar(
+                    conn, 'pago', estudiante_id=estudiante_id, pagos=pagos_creados,
+                    monto=float(monto_total), estado='completado',
+                )
+            # Tenía inscripciones pendientes, así que estaba en mora antes del pago
+            await kpis.registrar_cambio_usuario(
+                conn, estudiante, estudiante, True, await kpis.estudiante_en_mora(conn, estudiante_id)
+            )
+
+        cache_respuestas.invalidar('pagos')
+        return {
+            "message": f"Pago registrado exitosamente. Total: ${float(monto_total):.2f}",
+            "pagos_registrados": pagos_creados,
+            "monto_total": float(monto_total),
+            "inscripciones_pagadas": inscripciones_pagadas
+        }
 
     except HTTPException:
         raise
@@ -336,7 +353,9 @@ async def actualizar_convenio(
                 SET convenio_activo = $1, fecha_limite_convenio = $2
                 WHERE id = $3
             """, data.get('convenio_activo', False), data.get('fecha_limite_convenio'), estudiante_id)
+            await eventos.publicar(conn, 'usuario', estudiante_id=estudiante_id)
 
+        cache_respuestas.invalidar('pagos')
         return {"message": "Convenio actualizado correctamente"}
 
     except HTTPException:
@@ -1,22 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, Any, List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Literal, Optional
 from decimal import Decimal
 from datetime import date, datetime, timedelta
 import asyncio
 import json
 import logging
-import os
 
-from groq import AsyncGroq
-from pydantic import BaseModel
+import anyio
+from pydantic import BaseModel, Field
 
 from auth.dependencies import get_current_user
-from config import settings
 from database import get_db
+from services import (
+    cache_contexto_ia,
+    contexto_compacto,
+    herramientas_ia,
+    llm,
+    memoria_ia,
+    politicas_ia,
+)
+from services.herramientas_ia import formatear_horario
+from services.paralelo import en_paralelo, fetch, fetchrow
 from services.calculos_financieros import (
     calcular_deuda_total,
     calcular_en_mora,
     calcular_deuda_vencida,
+    consultar_deudores,
 )
 
 
@@ -28,6 +38,13 @@ class _ChatMensaje(BaseModel):
 class _ChatRequest(BaseModel):
     message: str
     history: Optional[List[_ChatMensaje]] = []
+    # "contexto": se precarga todo el contexto del rol en el prompt.
+    # "herramientas": el modelo pide solo los datos que necesita
+    # (services/herramientas_ia.py)
+    modo: Literal["contexto", "herramientas"] = "contexto"
+    # Con sesión, el historial vive en el servidor (services/memoria_ia.py)
+    # y `history` se ignora
+    sesion_id: Optional[str] = Field(None, min_length=1, max_length=64)
 
 logger = logging.getLogger(__name__)
 
@@ -46,19 +63,6 @@ def _iso(v):
     return str(v)
 
 
-def _horario(raw) -> str:
-    data = raw or {}
-    if isinstance(data, str):
-        try:
-            data = json.loads(data)
-        except Exception:
-            return ""
-    dias = data.get("dias", [])
-    hi = data.get("hora_inicio", "")
-    hf = data.get("hora_fin", "")
-    return f"{', '.join(dias)} {hi}-{hf}".strip()
-
-
 @router.get("/contexto")
 async def obtener_contexto(
     current_user: Dict[str, Any] = Depends(get_current_user),
@@ -220,7 +224,7 @@ async def obtener_contexto(
                         "materia": i["materia"],
                         "creditos": i["creditos"],
                         "aula": i.get("aula"),
-                        "horario": _horario(i.get("horario")),
+                        "horario": formatear_horario(i.get("horario")),
                         "profesor": i.get("profesor"),
                         "nota_final": _f(i["nota_final"])
                         if i.get("nota_final") is not None
@@ -318,7 +322,7 @@ async def obtener_contexto(
                         "materia": r["materia"],
                         "seccion": r["codigo"],
                         "aula": r.get("aula"),
-                        "horario": _horario(r.get("horario")),
+                        "horario": formatear_horario(r.get("horario")),
                         "periodo": r["periodo_codigo"],
                         "activo": r.get("activo", False),
                         "inscritos": r["inscritos"],
@@ -354,38 +358,6 @@ async def obtener_contexto(
                 )
                 kpis_row = dict(kpis_row or {})
 
-                con_deuda_rows = await conn.fetch(
-                    """
-                    SELECT
-                        u.id,
-                        u.first_name || ' ' || u.last_name AS nombre,
-                        u.cedula,
-                        u.es_becado,
-                        u.porcentaje_beca,
-                        u.carrera_id,
-                        u.convenio_activo,
-                        u.fecha_limite_convenio,
-                        c.nombre AS carrera,
-                        c.precio_credito,
-                        c.dias_gracia_pago,
-                        COUNT(i.id) AS insc_pendientes,
-                        SUM(
-                            m.creditos * c.precio_credito *
-                            (1 - COALESCE(u.porcentaje_beca, 0) / 100.0)
-                        ) AS deuda_calculada,
-                        MAX(i.fecha_inscripcion) AS ultima_inscripcion
-                    FROM public.usuarios u
-                    JOIN public.inscripciones i ON i.estudiante_id = u.id AND i.pago_id IS NULL
-                    JOIN public.secciones s ON i.seccion_id = s.id
-                    JOIN public.materias m ON s.materia_id = m.id
-                    JOIN public.carreras c ON u.carrera_id = c.id
-                    WHERE u.rol = 'estudiante'
-                    GROUP BY u.id, c.nombre, c.precio_credito, c.dias_gracia_pago
-                    ORDER BY deuda_calculada DESC
-                    """
-                )
-                con_deuda = [dict(r) for r in con_deuda_rows]
-
                 if periodo:
                     periodo_id = periodo["id"]
                     try:
@@ -396,63 +368,23 @@ async def obtener_contexto(
                     periodo_id = None
                     fecha_inicio_actual = date.today()
 
+                con_deuda_rows = await consultar_deudores(conn, periodo_id, fecha_inicio_actual)
+
                 mora_lista = []
                 deuda_total_inst = Decimal("0")
 
-                for est in con_deuda:
-                    deuda_calc = Decimal(str(est.get("deuda_calculada") or 0))
+                for est in con_deuda_rows:
+                    deuda_calc = Decimal(str(est["deuda_calculada"] or 0))
                     deuda_total_inst += deuda_calc
-
-                    en_mora = False
-                    if est.get("convenio_activo"):
-                        flc = est.get("fecha_limite_convenio")
-                        if flc:
-                            flc_date = (
-                                date.fromisoformat(str(flc)[:10])
-                                if isinstance(flc, (str, datetime))
-                                else flc
-                            )
-                            en_mora = flc_date < date.today()
-                        else:
-                            en_mora = False
-                    else:
-                        insc_rows = await conn.fetch(
-                            """
-                            SELECT s.periodo_id, i.fecha_inscripcion, pl.fecha_fin
-                            FROM public.inscripciones i
-                            JOIN public.secciones s ON i.seccion_id = s.id
-                            JOIN public.periodos_lectivos pl ON s.periodo_id = pl.id
-                            WHERE i.estudiante_id = $1 AND i.pago_id IS NULL
-                            """,
-                            est["id"],
-                        )
-                        dias_gracia = est.get("dias_gracia_pago") or 10
-                        for ir in insc_rows:
-                            fecha_fin_p = ir["fecha_fin"]
-                            if isinstance(fecha_fin_p, (str,)):
-                                fecha_fin_p = date.fromisoformat(str(fecha_fin_p)[:10])
-                            if fecha_fin_p < fecha_inicio_actual:
-                                en_mora = True
-                                break
-                            if periodo_id and ir["periodo_id"] == periodo_id:
-                                fi = ir["fecha_inscripcion"]
-                                if fi:
-                                    if isinstance(fi, str):
-                                        fi = datetime.fromisoformat(fi)
-                                    limite = datetime.now() - timedelta(days=dias_gracia)
-                                    if fi < limite:
-                                        en_mora = True
-                                        break
-
-                    if en_mora:
+                    if est["en_mora"]:
                         mora_lista.append(
                             {
                                 "nombre": est["nombre"],
-                                "cedula": est.get("cedula"),
-                                "carrera": est.get("carrera"),
+                                "cedula": est["cedula"],
+                                "carrera": est["carrera"],
                                 "deuda_usd": round(_f(deuda_calc), 2),
                                 "materias_pendientes": est["insc_pendientes"],
-                                "convenio": bool(est.get("convenio_activo")),
+                                "convenio": bool(est["convenio_activo"]),
                             }
                         )
 
@@ -507,55 +439,44 @@ async def obtener_contexto(
                 )
 
             elif rol in ("director", "coordinador", "administrativo"):
-                # Run 3 independent queries in parallel using separate DB connections
-                async def _fetch_stats():
-                    async with get_db() as c:
-                        row = await c.fetchrow(
-                            """
-                            SELECT
-                                (SELECT COUNT(*) FROM public.usuarios WHERE rol='estudiante') as estudiantes,
-                                (SELECT COUNT(*) FROM public.usuarios WHERE rol='profesor') as profesores,
-                                (SELECT COUNT(*) FROM public.materias) as materias,
-                                (SELECT COUNT(*) FROM public.secciones) as secciones,
-                                (SELECT ROUND(COALESCE(AVG(nota_final),0)::numeric,2)
-                                 FROM public.inscripciones WHERE nota_final IS NOT NULL) as promedio_inst,
-                                (SELECT COALESCE(SUM(monto),0) FROM public.pagos
-                                 WHERE estado='completado') as recaudado_total,
-                                (SELECT COUNT(*) FROM public.inscripciones
-                                 WHERE estado='activo') as inscripciones_activas
-                            """
-                        )
-                        return dict(row or {})
-
-                async def _fetch_por_carrera():
-                    async with get_db() as c:
-                        rows = await c.fetch(
-                            """
-                            SELECT c.nombre, COUNT(u.id) as alumnos
-                            FROM public.carreras c
-                            LEFT JOIN public.usuarios u ON u.carrera_id = c.id AND u.rol='estudiante'
-                            GROUP BY c.id, c.nombre ORDER BY alumnos DESC
-                            """
-                        )
-                        return [{"carrera": r["nombre"], "alumnos": r["alumnos"]} for r in rows]
-
-                async def _fetch_con_deuda():
-                    async with get_db() as c:
-                        rows = await c.fetch(
-                            """
-                            SELECT COUNT(*) as con_deuda
-                            FROM public.usuarios u
-                            JOIN public.inscripciones i ON i.estudiante_id = u.id
-                                AND i.pago_id IS NULL
-                            WHERE u.rol = 'estudiante'
-                            GROUP BY u.id
-                            """
-                        )
-                        return len(rows)
-
-                stats, por_carrera, con_deuda_count = await asyncio.gather(
-                    _fetch_stats(), _fetch_por_carrera(), _fetch_con_deuda()
+                stats_row, carreras_rows, deudores_row = await en_paralelo(
+                    conn,
+                    fetchrow(
+                        """
+                        SELECT
+                            (SELECT COUNT(*) FROM public.usuarios WHERE rol='estudiante') as estudiantes,
+                            (SELECT COUNT(*) FROM public.usuarios WHERE rol='profesor') as profesores,
+                            (SELECT COUNT(*) FROM public.materias) as materias,
+                            (SELECT COUNT(*) FROM public.secciones) as secciones,
+                            (SELECT ROUND(COALESCE(AVG(nota_final),0)::numeric,2)
+                             FROM public.inscripciones WHERE nota_final IS NOT NULL) as promedio_inst,
+                            (SELECT COALESCE(SUM(monto),0) FROM public.pagos
+                             WHERE estado='completado') as recaudado_total,
+                            (SELECT COUNT(*) FROM public.inscripciones
+                             WHERE estado='activo') as inscripciones_activas
+                        """
+                    ),
+                    fetch(
+                        """
+                        SELECT c.nombre, COUNT(u.id) as alumnos
+                        FROM public.carreras c
+                        LEFT JOIN public.usuarios u ON u.carrera_id = c.id AND u.rol='estudiante'
+                        GROUP BY c.id, c.nombre ORDER BY alumnos DESC
+                        """
+                    ),
+                    fetchrow(
+                        """
+                        SELECT COUNT(DISTINCT u.id) as con_deuda
+                        FROM public.usuarios u
+                        JOIN public.inscripciones i ON i.estudiante_id = u.id
+                            AND i.pago_id IS NULL
+                        WHERE u.rol = 'estudiante'
+                        """
+                    ),
                 )
+                stats = dict(stats_row or {})
+                por_carrera = [{"carrera": r["nombre"], "alumnos": r["alumnos"]} for r in carreras_rows]
+                con_deuda_count = deudores_row["con_deuda"]
 
                 ctx.update(
                     {
@@ -582,7 +503,7 @@ async def obtener_contexto(
 
 # ─── System prompt ────────────────────────────────────────────────────────────
 
-def _build_system_prompt(nombre: str, rol: str, contexto: dict) -> str:
+def _build_system_prompt(nombre: str, rol: str, contexto: dict, herramientas: bool = False) -> str:
     hoy = date.today().isoformat()
 
     rol_instrucciones: dict = {
@@ -628,7 +549,12 @@ ERES EL ASISTENTE ADMINISTRATIVO. Responde sobre estadísticas generales de la i
     }
 
     instruccion = rol_instrucciones.get(rol, "Responde consultas generales sobre InfoCampus.")
-    ctx_str = json.dumps(contexto, ensure_ascii=False, default=str, indent=2)
+    if herramientas:
+        instruccion += """
+
+DATOS BAJO DEMANDA:
+Abajo solo tienes la fecha y el período activo. Para cualquier otro dato usa las herramientas disponibles: llama únicamente las que la pregunta necesita, con los argumentos justos. Si ninguna herramienta cubre la pregunta, dilo."""
+    ctx_str = contexto_compacto.compactar(contexto)
 
     return f"""Eres Eva, asistente académica inteligente de InfoCampus ERP. Hoy es {hoy}.
 Atiendes a: {nombre} ({rol.upper()}).
@@ -640,6 +566,7 @@ REGLAS ABSOLUTAS:
 - Responde SIEMPRE en español, de forma natural y directa.
 - NUNCA inventes datos. Solo usa los datos del contexto que recibes abajo.
 - Si un dato no está en el contexto, di: "No tengo ese dato disponible en este momento."
+- Algunas listas vienen recortadas ("recientes" + "omitidos"/"resumen"): usa el resumen para totales y aclara que detallas solo lo más reciente.
 - No uses términos técnicos como "null", "undefined", "array". Usa lenguaje natural.
 - Para listas usa saltos de línea simples, sin markdown complejo.
 - Notas: formato → Materia: X.X (Estado)
@@ -668,26 +595,83 @@ DATOS EN TIEMPO REAL ({hoy}):
 
 # ─── Chat endpoint ────────────────────────────────────────────────────────────
 
-@router.post("/chat")
-async def chat_ia(
-    body: _ChatRequest,
-    current_user: Dict[str, Any] = Depends(get_current_user),
-) -> Dict[str, Any]:
+def _error_ia(e: Exception) -> HTTPException:
+    err = str(e)
+    logger.error(f"Error en Groq API: {err}")
+    if "401" in err or "invalid_api_key" in err or "authentication" in err.lower():
+        return HTTPException(status_code=503, detail="Clave de IA inválida. Verifica GROQ_API_KEY en backend/.env y reinicia el backend.")
+    if "429" in err or "rate_limit" in err or "quota" in err.lower():
+        return HTTPException(status_code=503, detail="Límite de uso de IA alcanzado. Espera unos minutos o genera una nueva clave en console.groq.com")
+    if "model" in err.lower() and ("not found" in err.lower() or "does not exist" in err.lower()):
+        return HTTPException(status_code=503, detail="Modelo de IA no disponible. Contacta al administrador.")
+    return HTTPException(status_code=503, detail=f"Error al contactar el servicio de IA: {err[:120]}")
+
+
+async def _contexto_minimo() -> Dict[str, Any]:
+    try:
+        async with get_db() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT nombre, codigo, fecha_inicio, fecha_fin
+                FROM public.periodos_lectivos
+                WHERE activo = true
+                ORDER BY fecha_inicio DESC LIMIT 1
+                """
+            )
+        return {"fecha_hoy": date.today().isoformat(), "periodo_activo": dict(row) if row else None}
+    except Exception:
+        return {"fecha_hoy": date.today().isoformat()}
+
+
+async def _responder(body: _ChatRequest, mensajes: List[Dict[str, Any]], current_user: Dict[str, Any]) -> str:
+    if body.modo == "herramientas":
+        return await herramientas_ia.responder(mensajes, current_user)
+    return await llm.completar(mensajes)
+
+
+async def _respuesta_local(body: _ChatRequest) -> Optional[str]:
+    """Preguntas de políticas institucionales que no necesitan al modelo."""
+    if not body.message.strip():
+        raise HTTPException(status_code=400, detail="Mensaje vacío.")
+    return await politicas_ia.responder(body.message)
+
+
+async def _recordar(body: _ChatRequest, current_user: Dict[str, Any], respuesta: str) -> None:
+    if not body.sesion_id or not respuesta:
+        return
+    try:
+        await memoria_ia.guardar_turno(
+            current_user["id"], body.sesion_id, body.message.strip(), respuesta
+        )
+    except Exception as e:
+        # La memoria no debe tumbar el chat
+        logger.warning(f"⚠️ No se pudo guardar el turno de {body.sesion_id}: {e}")
+
+
+async def _preparar_mensajes(body: _ChatRequest, current_user: Dict[str, Any]) -> List[Dict[str, Any]]:
     if not body.message.strip():
         raise HTTPException(status_code=400, detail="Mensaje vacío.")
 
-    groq_key = settings.GROQ_API_KEY or os.getenv("GROQ_API_KEY", "")
-    if not groq_key:
+    if not llm.configurado():
         raise HTTPException(
             status_code=503,
             detail="API de IA no configurada. Contacta al administrador.",
         )
 
-    # Reutilizar la lógica de contexto ya existente — fallback a contexto vacío si falla
-    try:
-        contexto = await obtener_contexto(current_user=current_user)
-    except Exception:
-        contexto = {}
+    # Reutilizar la lógica de contexto ya existente — cacheada por usuario y versión
+    # de datos; fallback a contexto vacío si falla (sin cachear el fallo).
+    # En modo herramientas solo va el período activo: el resto se pide bajo demanda
+    if body.modo == "herramientas":
+        contexto = await _contexto_minimo()
+    else:
+        version_contexto = cache_contexto_ia.version(current_user)
+        contexto = cache_contexto_ia.obtener(current_user, version_contexto)
+        if contexto is None:
+            try:
+                contexto = await obtener_contexto(current_user=current_user)
+                cache_contexto_ia.guardar(current_user, version_contexto, contexto)
+            except Exception:
+                contexto = {}
 
     # Obtener nombre del usuario para el system prompt
     rol = current_user.get("rol", "")
@@ -706,33 +690,138 @@ async def chat_ia(
         except Exception:
             nombre = "Usuario"
 
-    system_prompt = _build_system_prompt(nombre, rol, contexto)
+    system_prompt = _build_system_prompt(nombre, rol, contexto, herramientas=body.modo == "herramientas")
 
     mensajes: list = [{"role": "system", "content": system_prompt}]
-    for m in (body.history or [])[-20:]:
-        if isinstance(m, dict):
-            mensajes.append({"role": m.get("role"), "content": m.get("content")})
-        else:
-            mensajes.append({"role": m.role, "content": m.content})
+    if body.sesion_id:
+        try:
+            async with get_db() as conn:
+                resumen, turnos = await memoria_ia.cargar(conn, current_user["id"], body.sesion_id)
+            mensajes.extend(memoria_ia.mensajes_previos(resumen, turnos))
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo cargar la conversación {body.sesion_id}: {e}")
+    else:
+        for m in (body.history or [])[-20:]:
+            if isinstance(m, dict):
+                mensajes.append({"role": m.get("role"), "content": m.get("content")})
+            else:
+                mensajes.append({"role": m.role, "content": m.content})
     mensajes.append({"role": "user", "content": body.message.strip()})
+    contexto_compacto.medir_prompt(
+        rol, mensajes, contexto_compacto.estimar_tokens(contexto_compacto.serializar(contexto))
+    )
+    return mensajes
+
 
+@router.post("/chat")
+async def chat_ia(
+    body: _ChatRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+) -> Dict[str, Any]:
+    local = await _respuesta_local(body)
+    if local is not None:
+        await _recordar(body, current_user, local)
+        return {"response": local, "fuente": "politicas"}
+
+    mensajes = await _preparar_mensajes(body, current_user)
     try:
-        client = AsyncGroq(api_key=groq_key)
-        completion = await client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=mensajes,
-            temperature=0.2,
-            max_tokens=4000,
-        )
-        respuesta = completion.choices[0].message.content or "No pude generar una respuesta."
-        return {"response": respuesta}
+        respuesta = await _responder(body, mensajes, current_user)
+        await _recordar(body, current_user, respuesta)
+        return {"response": respuesta or "No pude generar una respuesta."}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise _error_ia(e)
+
+
+async def _un_fragmento(respuesta):
+    yield await respuesta
+
+
+async def _texto_fijo(texto: str):
+    yield texto
+
+
+def _evento_sse(tipo: str, datos: Dict[str, Any]) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream", summary="Chat con respuesta en streaming (SSE)")
+async def chat_ia_stream(
+    body: _ChatRequest,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+) -> StreamingResponse:
+    """
+    Igual que /ia/chat pero reenvía los fragmentos según llegan del modelo.
+
+    Eventos: 'token' {texto}, 'fin' {} y 'error' {detail} si el proveedor
+    falla a mitad de respuesta. Los errores antes del primer fragmento
+    (clave inválida, límite de uso...) responden 503 como /ia/chat.
+    Si el cliente se desconecta, la generación se cancela en el proveedor.
+    En modo herramientas, o si responde el índice de políticas, la
+    respuesta llega en un solo 'token'.
+    """
+    local = await _respuesta_local(body)
+    if local is not None:
+        fragmentos = _texto_fijo(local)
+    else:
+        mensajes = await _preparar_mensajes(body, current_user)
+        if body.modo == "herramientas":
+            fragmentos = _un_fragmento(_responder(body, mensajes, current_user))
+        else:
+            fragmentos = llm.generar(mensajes)
+    try:
+        primero = await anext(fragmentos, None)
+    except HTTPException:
+        raise
+    except Exception as e:
+        await fragmentos.aclose()
+        raise _error_ia(e)
+
+    async def _emitir():
+        completa = []
+        try:
+            if primero is None:
+                yield _evento_sse("token", {"texto": "No pude generar una respuesta."})
+            else:
+                completa.append(primero)
+                yield _evento_sse("token", {"texto": primero})
+                async for texto in fragmentos:
+                    completa.append(texto)
+                    yield _evento_sse("token", {"texto": texto})
+            yield _evento_sse("fin", {})
+            # Solo se recuerdan respuestas completas
+            await _recordar(body, current_user, "".join(completa))
+        except asyncio.CancelledError:
+            logger.info(f"Chat IA cancelado: cliente desconectado (usuario {current_user['id']})")
+            raise
+        except Exception as e:
+            yield _evento_sse("error", {"detail": _error_ia(e).detail})
+        finally:
+            # Protegido de la cancelación para que llegue a cerrar el stream del proveedor
+            with anyio.CancelScope(shield=True):
+                await fragmentos.aclose()
+
+    return StreamingResponse(
+        _emitir(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.delete("/conversaciones/{sesion_id}", summary="Borrar la memoria de una conversación")
+async def borrar_conversacion(
+    sesion_id: str,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+) -> Dict[str, Any]:
+    try:
+        async with get_db() as conn:
+            borrada = await memoria_ia.borrar(conn, current_user["id"], sesion_id)
+        if not borrada:
+            raise HTTPException(status_code=404, detail="Conversación no encontrada")
+        return {"message": "Conversación borrada"}
+    except HTTPException:
+        raise
     except Exception as e:
-        err = str(e)
-        logger.error(f"Error en Groq API: {err}")
-        if "401" in err or "invalid_api_key" in err or "authentication" in err.lower():
-            raise HTTPException(status_code=503, detail="Clave de IA inválida. Verifica GROQ_API_KEY en backend/.env y reinicia el backend.")
-        if "429" in err or "rate_limit" in err or "quota" in err.lower():
-            raise HTTPException(status_code=503, detail="Límite de uso de IA alcanzado. Espera unos minutos o genera una nueva clave en console.groq.com")
-        if "model" in err.lower() and ("not found" in err.lower() or "does not exist" in err.lower()):
-            raise HTTPException(status_code=503, detail="Modelo de IA no disponible. Contacta al administrador.")
-        raise HTTPException(status_code=503, detail=f"Error al contactar el servicio de IA: {err[:120]}")
\ No newline at end of file
+        logger.error(f"❌ Error borrando conversación: {e}")
+        raise HTTPException(status_code=500, detail=f"Error borrando conversación: {str(e)}")
@@ -7,6 +7,8 @@ import logging
 
 from auth.dependencies import require_roles, get_current_user
 from database import get_db
+from services import cache_respuestas, eventos
+from services.exportador import respuesta_exportacion
 from services.calculos_financieros import calcular_en_mora, calcular_deuda_total
 
 logger = logging.getLogger(__name__)
@@ -39,6 +41,35 @@ class InscripcionResponse(BaseModel):
     pago_id: Optional[int] = None
 
 
+COLUMNAS_EXPORTACION_INSCRIPCIONES = [
+    ("id", lambda r: r['id']),
+    ("fecha_inscripcion", lambda r: r['fecha_inscripcion']),
+    ("cedula", lambda r: r['cedula']),
+    ("estudiante", lambda r: r['estudiante_nombre']),
+    ("carrera", lambda r: r['carrera_nombre']),
+    ("periodo", lambda r: r['periodo_codigo']),
+    ("materia_codigo", lambda r: r['materia_codigo']),
+    ("materia", lambda r: r['materia_nombre']),
+    ("seccion", lambda r: r['seccion_codigo']),
+    ("creditos", lambda r: r['creditos']),
+    ("estado", lambda r: r['estado']),
+    ("nota_final", lambda r: r['nota_final']),
+    ("pagado", lambda r: r['pago_id'] is not None),
+]
+
+COLUMNAS_EXPORTACION_NOTAS = [
+    ("cedula", lambda r: r['cedula']),
+    ("estudiante", lambda r: r['estudiante_nombre']),
+    ("parcial_1", lambda r: r['parcial_1']),
+    ("parcial_2", lambda r: r['parcial_2']),
+    ("talleres", lambda r: r['talleres']),
+    ("examen_final", lambda r: r['examen_final']),
+    ("nota_final", lambda r: r['nota_final']),
+    ("estado", lambda r: r['estado']),
+    ("pagado", lambda r: r['pago_id'] is not None),
+]
+
+
 @router.put("/{inscripcion_id}/nota", summary="Actualizar nota de inscripción")
 async def actualizar_nota(
     inscripcion_id: int,
@@ -87,6 +118,11 @@ async def actualizar_nota(
                 """,
                 nota_data.nota_final, nuevo_estado, inscripcion_id,
             )
+            await eventos.publicar(
+                conn, 'nota', inscripcion_id=inscripcion_id, estudiante_id=insc_dict['estudiante_id'],
+                seccion_id=insc_dict['seccion_id'], docente_id=insc_dict['docente_id'],
+                nota_final=nota_data.nota_final, estado=nuevo_estado,
+            )
 
             estudiante_id = insc_dict['estudiante_id']
             en_mora = None
@@ -143,7 +179,8 @@ async def actualizar_nota(
                     "deuda_total": float(deuda_total)
                 }
 
-            return respuesta
+        cache_respuestas.invalidar('notas')
+        return respuesta
 
     except HTTPException:
         raise
@@ -225,6 +262,102 @@ async def obtener_notas_seccion(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error obteniendo notas: {str(e)}")
 
 
+@router.get("/seccion/{seccion_id}/notas/exportar", summary="Exportar libro de notas de una sección (CSV/XLSX)")
+async def exportar_notas_seccion(
+    seccion_id: int,
+    formato: str = "csv",
+    current_user: Dict[str, Any] = Depends(require_roles(['profesor', 'coordinador', 'director', 'admin', 'administrativo']))
+):
+    """Libro de notas con parciales, talleres y examen final por alumno."""
+    try:
+        async with get_db() as conn:
+            seccion = await conn.fetchrow(
+                "SELECT id, codigo, docente_id FROM public.secciones WHERE id = $1",
+                seccion_id,
+            )
+    except Exception as e:
+        logger.error(f"Error exportando notas: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error exportando notas: {str(e)}")
+
+    if not seccion:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sección no encontrada")
+    if current_user['rol'] == 'profesor' and seccion['docente_id'] != current_user['id']:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene permiso para ver las notas de esta sección")
+
+    return respuesta_exportacion(
+        """
+        SELECT
+            u.cedula,
+            u.last_name || ' ' || u.first_name AS estudiante_nombre,
+            MAX(ev.nota) FILTER (WHERE ev.tipo_evaluacion = 'parcial_1')    AS parcial_1,
+            MAX(ev.nota) FILTER (WHERE ev.tipo_evaluacion = 'parcial_2')    AS parcial_2,
+            MAX(ev.nota) FILTER (WHERE ev.tipo_evaluacion = 'talleres')     AS talleres,
+            MAX(ev.nota) FILTER (WHERE ev.tipo_evaluacion = 'examen_final') AS examen_final,
+            i.nota_final, i.estado, i.pago_id
+        FROM public.inscripciones i
+        JOIN public.usuarios u ON i.estudiante_id = u.id
+        LEFT JOIN public.evaluaciones_parciales ev ON ev.inscripcion_id = i.id
+        WHERE i.seccion_id = $1
+        GROUP BY i.id, u.id
+        ORDER BY u.last_name, u.first_name
+        """,
+        [seccion_id],
+        COLUMNAS_EXPORTACION_NOTAS,
+        formato,
+        f"notas_{seccion['codigo']}",
+    )
+
+
+@router.get("/exportar", summary="Exportar inscripciones (CSV/XLSX)")
+async def exportar_inscripciones(
+    seccion_id: Optional[int] = None,
+    periodo_id: Optional[int] = None,
+    carrera_id: Optional[int] = None,
+    estudiante_id: Optional[int] = None,
+    estado: Optional[str] = None,
+    formato: str = "csv",
+    current_user: Dict[str, Any] = Depends(require_roles(['coordinador', 'director', 'admin', 'administrativo']))
+):
+    logger.info(f"Exportación de inscripciones ({formato}) solicitada por {current_user['cedula']}")
+    filtros = []
+    params: list = []
+    for condicion, valor in (
+        ("i.seccion_id", seccion_id),
+        ("s.periodo_id", periodo_id),
+        ("u.carrera_id", carrera_id),
+        ("i.estudiante_id", estudiante_id),
+        ("i.estado", estado),
+    ):
+        if valor:
+            params.append(valor)
+            filtros.append(f"{condicion} = ${len(params)}")
+    where = " AND ".join(filtros) if filtros else "1=1"
+
+    return respuesta_exportacion(
+        f"""
+        SELECT
+            i.id, i.fecha_inscripcion, i.estado, i.nota_final, i.pago_id,
+            u.cedula, u.first_name || ' ' || u.last_name AS estudiante_nombre,
+            c.nombre AS carrera_nombre,
+            p.codigo AS periodo_codigo,
+            m.codigo AS materia_codigo, m.nombre AS materia_nombre, m.creditos,
+            s.codigo AS seccion_codigo
+        FROM public.inscripciones i
+        JOIN public.usuarios u ON i.estudiante_id = u.id
+        JOIN public.secciones s ON i.seccion_id = s.id
+        JOIN public.materias m ON s.materia_id = m.id
+        JOIN public.periodos_lectivos p ON s.periodo_id = p.id
+        LEFT JOIN public.carreras c ON u.carrera_id = c.id
+        WHERE {where}
+        ORDER BY i.id
+        """,
+        params,
+        COLUMNAS_EXPORTACION_INSCRIPCIONES,
+        formato,
+        "inscripciones",
+    )
+
+
 @router.get("/estudiante/mis-inscripciones", summary="Mis inscripciones (estudiante)")
 async def mis_inscripciones(
     current_user: Dict[str, Any] = Depends(require_roles(['estudiante']))
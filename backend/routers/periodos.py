@@ -3,16 +3,21 @@ Router de Periodos Lectivos
 Gestión de ciclos académicos
 REFERENCIA DJANGO: views.py - cerrar_ciclo_lectivo (líneas 529-602)
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from typing import Dict, Any
 from decimal import Decimal
 import logging
 
 from auth.dependencies import require_roles
 from database import get_db
+from services import cache_respuestas, eventos
+from services.cache_respuestas import cache_respuesta
+from services.paralelo import en_paralelo, fetchrow
 
 logger = logging.getLogger(__name__)
 
+NOTA_APROBACION = Decimal('7.0')
+
 router = APIRouter(
     prefix="/periodos",
     tags=["Periodos Lectivos"],
@@ -33,8 +38,11 @@ router = APIRouter(
     **Proceso:**
     1. Busca el período con activo=True
     2. Verifica que TODAS las inscripciones tengan nota
-    3. Marca cada inscripción como 'aprobado' o 'reprobado' según nota >= 7.0
-    4. Desactiva el período (activo=False)
+    3. Marca las inscripciones como 'aprobado' o 'reprobado' según nota >= 7.0
+       (una sola sentencia UPDATE)
+    4. Recalcula promedio acumulado, créditos aprobados y semestre actual de
+       los estudiantes del período
+    5. Desactiva el período (activo=False)
     
     **Validaciones:**
     - Solo el Director puede ejecutar esta operación
@@ -57,12 +65,14 @@ async def cerrar_ciclo_lectivo(
     
     try:
         async with get_db() as conn:
+            # FOR UPDATE: dos cierres simultáneos no procesan el mismo período
             periodo_activo = await conn.fetchrow(
                 """
                 SELECT * FROM public.periodos_lectivos 
                 WHERE activo = true 
                 ORDER BY fecha_inicio DESC 
                 LIMIT 1
+                FOR UPDATE
                 """
             )
             
@@ -99,45 +109,72 @@ async def cerrar_ciclo_lectivo(
                     }
                 )
             
-            inscripciones = await conn.fetch(
+            # 4. APROBADO / REPROBADO EN UNA SOLA SENTENCIA
+            cierre = await conn.fetchrow(
                 """
-                SELECT i.id, i.nota_final, i.estado
-                FROM public.inscripciones i
-                JOIN public.secciones s ON i.seccion_id = s.id
-                WHERE s.periodo_id = $1
-                AND i.estado = 'activo'
+                WITH cerradas AS (
+                    UPDATE public.inscripciones i
+                    SET estado = CASE WHEN i.nota_final >= $2 THEN 'aprobado' ELSE 'reprobado' END
+                    FROM public.secciones s
+                    WHERE s.id = i.seccion_id
+                    AND s.periodo_id = $1
+                    AND i.estado = 'activo'
+                    AND i.nota_final IS NOT NULL
+                    RETURNING i.estudiante_id, i.estado
+                )
+                SELECT
+                    COUNT(*) FILTER (WHERE estado = 'aprobado')  AS aprobados,
+                    COUNT(*) FILTER (WHERE estado = 'reprobado') AS reprobados,
+                    COALESCE(array_agg(DISTINCT estudiante_id), '{}') AS estudiantes
+                FROM cerradas
                 """,
-                periodo_dict['id'],
+                periodo_dict['id'], NOTA_APROBACION,
+            )
+            aprobados = cierre['aprobados']
+            reprobados = cierre['reprobados']
+
+            # 5. HISTORIAL DE LOS ESTUDIANTES DEL PERÍODO: promedio de las
+            # materias calificadas, créditos de las aprobadas (una vez por
+            # materia) y un semestre más, sin pasar la duración de la carrera
+            estudiantes_actualizados = await conn.fetchval(
+                """
+                WITH promedios AS (
+                    SELECT i.estudiante_id, ROUND(AVG(i.nota_final)::numeric, 2) AS promedio
+                    FROM public.inscripciones i
+                    WHERE i.estudiante_id = ANY($1::int[])
+                    AND i.estado IN ('aprobado', 'reprobado')
+                    AND i.nota_final IS NOT NULL
+                    GROUP BY i.estudiante_id
+                ),
+                creditos AS (
+                    SELECT a.estudiante_id, SUM(m.creditos) AS creditos
+                    FROM (
+                        SELECT DISTINCT i.estudiante_id, s.materia_id
+                        FROM public.inscripciones i
+                        JOIN public.secciones s ON s.id = i.seccion_id
+                        WHERE i.estudiante_id = ANY($1::int[])
+                        AND i.estado = 'aprobado'
+                    ) a
+                    JOIN public.materias m ON m.id = a.materia_id
+                    GROUP BY a.estudiante_id
+                ),
+                actualizados AS (
+                    UPDATE public.usuarios u
+                    SET promedio_acumulado = p.promedio,
+                        creditos_aprobados = COALESCE(c.creditos, 0),
+                        semestre_actual = LEAST(
+                            COALESCE(u.semestre_actual, 0) + 1,
+                            (SELECT ca.duracion_semestres FROM public.carreras ca WHERE ca.id = u.carrera_id)
+                        )
+                    FROM promedios p
+                    LEFT JOIN creditos c ON c.estudiante_id = p.estudiante_id
+                    WHERE u.id = p.estudiante_id
+                    RETURNING u.id
+                )
+                SELECT COUNT(*) FROM actualizados
+                """,
+                cierre['estudiantes'],
             )
-            
-            # 4. PROCESAR CADA INSCRIPCIÓN
-            NOTA_APROBACION = Decimal('7.0')
-            aprobados = 0
-            reprobados = 0
-            
-            for insc in inscripciones:
-                insc_dict = dict(insc)
-                
-                if insc_dict['nota_final'] is not None:
-                    nota = Decimal(str(insc_dict['nota_final']))
-                    
-                    if nota >= NOTA_APROBACION:
-                        nuevo_estado = 'aprobado'
-                        aprobados += 1
-                    else:
-                        nuevo_estado = 'reprobado'
-                        reprobados += 1
-                    
-                    await conn.execute(
-                        """
-                        UPDATE public.inscripciones 
-                        SET estado = $1 
-                        WHERE id = $2
-                        """,
-                        nuevo_estado, insc_dict['id'],
-                    )
-                    
-                    logger.debug(f"✓ Inscripción {insc_dict['id']}: {nuevo_estado} (nota: {nota})")
             
             await conn.execute(
                 """
@@ -149,6 +186,10 @@ async def cerrar_ciclo_lectivo(
             )
             
             total_procesados = aprobados + reprobados
+            await eventos.publicar(
+                conn, 'ciclo_cerrado', periodo_id=periodo_dict['id'],
+                aprobados=aprobados, reprobados=reprobados,
+            )
             
             respuesta = {
                 "message": f"Ciclo '{periodo_dict['nombre']}' cerrado exitosamente.",
@@ -161,6 +202,7 @@ async def cerrar_ciclo_lectivo(
                     "aprobados": aprobados,
                     "reprobados": reprobados,
                     "total_procesados": total_procesados,
+                    "estudiantes_actualizados": estudiantes_actualizados,
                     "tasa_aprobacion": round((aprobados / total_procesados * 100), 2) if total_procesados > 0 else 0
                 },
                 "cerrado_por": current_user['cedula'],
@@ -171,9 +213,10 @@ async def cerrar_ciclo_lectivo(
                 f"✅ Ciclo cerrado: {aprobados} aprobados, {reprobados} reprobados, "
                 f"{total_procesados} total"
             )
-            
-            return respuesta
-            
+
+        cache_respuestas.invalidar('inscripciones', 'notas', 'usuarios')
+        return respuesta
+
     except HTTPException:
         raise
     except Exception as e:
@@ -238,7 +281,9 @@ async def obtener_periodo_activo(
     summary="Estadísticas del período",
     description="Retorna estadísticas del período especificado"
 )
+@cache_respuesta(ttl=120, etiquetas=('inscripciones', 'notas'))
 async def estadisticas_periodo(
+    request: Request,
     periodo_id: int,
     current_user: Dict[str, Any] = Depends(require_roles(['director', 'coordinador', 'administrativo', 'tesorero', 'profesor', 'estudiante']))
 ) -> Dict[str, Any]:
@@ -247,9 +292,40 @@ async def estadisticas_periodo(
     """
     try:
         async with get_db() as conn:
-            periodo = await conn.fetchrow(
-                "SELECT * FROM public.periodos_lectivos WHERE id = $1",
-                periodo_id,
+            periodo, stats, estudiantes, secciones = await en_paralelo(
+                conn,
+                fetchrow("SELECT * FROM public.periodos_lectivos WHERE id = $1", periodo_id),
+                fetchrow(
+                    """
+                    SELECT 
+                        COUNT(*) as total_inscripciones,
+                        COUNT(CASE WHEN estado = 'aprobado' THEN 1 END) as aprobados,
+                        COUNT(CASE WHEN estado = 'reprobado' THEN 1 END) as reprobados,
+                        COUNT(CASE WHEN estado = 'activo' THEN 1 END) as inscritos,
+                        AVG(nota_final) as promedio_general
+                    FROM public.inscripciones i
+                    JOIN public.secciones s ON i.seccion_id = s.id
+                    WHERE s.periodo_id = $1
+                    """,
+                    periodo_id,
+                ),
+                fetchrow(
+                    """
+                    SELECT COUNT(DISTINCT i.estudiante_id) as total_estudiantes
+                    FROM public.inscripciones i
+                    JOIN public.secciones s ON i.seccion_id = s.id
+                    WHERE s.periodo_id = $1
+                    """,
+                    periodo_id,
+                ),
+                fetchrow(
+                    """
+                    SELECT COUNT(*) as total_secciones
+                    FROM public.secciones
+                    WHERE periodo_id = $1
+                    """,
+                    periodo_id,
+                ),
             )
 
             if not periodo:
@@ -260,40 +336,6 @@ async def estadisticas_periodo(
             
             periodo_dict = dict(periodo)
             
-            stats = await conn.fetchrow(
-                """
-                SELECT 
-                    COUNT(*) as total_inscripciones,
-                    COUNT(CASE WHEN estado = 'aprobado' THEN 1 END) as aprobados,
-                    COUNT(CASE WHEN estado = 'reprobado' THEN 1 END) as reprobados,
-                    COUNT(CASE WHEN estado = 'activo' THEN 1 END) as inscritos,
-                    AVG(nota_final) as promedio_general
-                FROM public.inscripciones i
-                JOIN public.secciones s ON i.seccion_id = s.id
-                WHERE s.periodo_id = $1
-                """,
-                periodo_id,
-            )
-
-            estudiantes = await conn.fetchrow(
-                """
-                SELECT COUNT(DISTINCT i.estudiante_id) as total_estudiantes
-                FROM public.inscripciones i
-                JOIN public.secciones s ON i.seccion_id = s.id
-                WHERE s.periodo_id = $1
-                """,
-                periodo_id,
-            )
-
-            secciones = await conn.fetchrow(
-                """
-                SELECT COUNT(*) as total_secciones
-                FROM public.secciones
-                WHERE periodo_id = $1
-                """,
-                periodo_id,
-            )
-            
             total_insc = stats['total_inscripciones'] or 0
             aprobados = stats['aprobados'] or 0
             
@@ -7,6 +7,7 @@ import json
 
 from auth.dependencies import require_roles
 from database import get_db
+from services import cache_respuestas, eventos
 
 logger = logging.getLogger(__name__)
 
@@ -271,7 +272,7 @@ async def registrar_evaluacion(
     try:
         async with get_db() as conn:
             result = await conn.fetchrow("""
-                SELECT s.docente_id FROM public.inscripciones i
+                SELECT s.docente_id, i.estudiante_id, i.seccion_id FROM public.inscripciones i
                 JOIN public.secciones s ON i.seccion_id = s.id
                 WHERE i.id = $1
             """, data.inscripcion_id)
@@ -287,8 +288,13 @@ async def registrar_evaluacion(
                 DO UPDATE SET nota = EXCLUDED.nota, fecha_evaluacion = EXCLUDED.fecha_evaluacion
                 RETURNING id
             """, data.inscripcion_id, data.tipo_evaluacion, data.nota, data.peso_porcentual)
+            await eventos.publicar(
+                conn, 'nota', inscripcion_id=data.inscripcion_id, estudiante_id=result['estudiante_id'],
+                seccion_id=result['seccion_id'], docente_id=current_user['id'],
+            )
 
-            return {"data": {"evaluacion_id": ev['id'], "mensaje": "Evaluación guardada"}}
+        cache_respuestas.invalidar('notas')
+        return {"data": {"evaluacion_id": ev['id'], "mensaje": "Evaluación guardada"}}
 
     except HTTPException:
         raise
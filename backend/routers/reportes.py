@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Header, status
+from fastapi.responses import Response, StreamingResponse
+from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
+import asyncio
 import logging
 
 from auth.dependencies import require_roles, get_current_user
 from database import get_db
 from services.pdf_generator import (
     generar_estado_cuenta,
-    generar_certificado_inscripcion
+    generar_certificado_inscripcion,
+    generar_boletin_calificaciones,
+    ReporteTesoreriaPDF
 )
+from services import pdf_cache
+from services.pdf_lote import TIPOS_LOTE, agrupar_materias_boletin, contar_documentos, generar_zip
 from services.calculos_financieros import calcular_deuda_total, calcular_deuda_vencida
 
 logger = logging.getLogger(__name__)
 
+# Filas del detalle de tesorería leídas y dibujadas por tanda
+TANDA_TESORERIA = 1000
+
 router = APIRouter(
     prefix="/reportes",
     tags=["Reportes PDF"],
@@ -120,6 +128,7 @@ async def certificado_inscripcion(
 @router.get("/estado-cuenta/{estudiante_id}", summary="Descargar estado de cuenta en PDF")
 async def estado_cuenta_pdf(
     estudiante_id: int,
+    if_none_match: Optional[str] = Header(None),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     logger.info(f"Estado de cuenta solicitado para estudiante {estudiante_id} por {current_user['cedula']}")
@@ -219,25 +228,32 @@ async def estado_cuenta_pdf(
                 conn
             )
 
-        pdf_buffer = generar_estado_cuenta(
-            est_dict,
-            inscripciones,
-            deuda_total,
-            deuda_vencida,
-            {
-                'nombre': est_dict.get('carrera_nombre'),
-                'codigo': est_dict.get('carrera_codigo'),
-                'dias_gracia_pago': est_dict.get('dias_gracia_pago', 15)
-            }
+        carrera = {
+            'nombre': est_dict.get('carrera_nombre'),
+            'codigo': est_dict.get('carrera_codigo'),
+            'dias_gracia_pago': est_dict.get('dias_gracia_pago', 15)
+        }
+
+        clave = pdf_cache.calcular_clave('estado_cuenta', est_dict, inscripciones, deuda_total, deuda_vencida, carrera)
+        if pdf_cache.etag_coincide(if_none_match, clave):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": pdf_cache.etag(clave)})
+
+        contenido = pdf_cache.obtener_o_generar(
+            clave,
+            lambda: generar_estado_cuenta(est_dict, inscripciones, deuda_total, deuda_vencida, carrera)
         )
 
         nombre_estudiante = f"{est_dict.get('first_name', '')}_{est_dict.get('last_name', '')}".strip() or est_dict['cedula']
         nombre_archivo = f"estado_cuenta_{nombre_estudiante}_{datetime.now().strftime('%Y%m%d')}.pdf"
 
-        return StreamingResponse(
-            pdf_buffer,
+        return Response(
+            content=contenido,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={nombre_archivo}"}
+            headers={
+                "Content-Disposition": f"attachment; filename={nombre_archivo}",
+                "ETag": pdf_cache.etag(clave),
+                "Cache-Control": "private, no-cache",
+            }
         )
 
     except HTTPException:
@@ -255,11 +271,36 @@ async def reporte_tesoreria(
     logger.info(f"Reporte de tesorería solicitado por {current_user['cedula']} (últimos {dias} días)")
 
     try:
+        fecha_fin = datetime.now()
+        fecha_inicio = fecha_fin - timedelta(days=dias)
+
         async with get_db() as conn:
-            fecha_fin = datetime.now()
-            fecha_inicio = fecha_fin - timedelta(days=dias)
+            metodos = [dict(r) for r in await conn.fetch(
+                """
+                SELECT
+                    metodo_pago,
+                    COUNT(*) as cantidad,
+                    SUM(monto) as total
+                FROM public.pagos
+                WHERE fecha_pago >= $1 AND fecha_pago <= $2
+                GROUP BY metodo_pago
+                """,
+                fecha_inicio, fecha_fin
+            )]
+
+            reporte = ReporteTesoreriaPDF(
+                dias,
+                fecha_inicio,
+                fecha_fin,
+                sum(int(m['cantidad']) for m in metodos),
+                sum((Decimal(str(m['total'] or 0)) for m in metodos), Decimal('0.00')),
+                metodos,
+                current_user['cedula'],
+            )
 
-            pagos_raw = await conn.fetch(
+            # Detalle completo: se lee con cursor y se dibuja por tandas fuera del event loop
+            tanda = []
+            async for row in conn.cursor(
                 """
                 SELECT
                     p.id,
@@ -279,164 +320,23 @@ async def reporte_tesoreria(
                 WHERE p.fecha_pago >= $1 AND p.fecha_pago <= $2
                 ORDER BY p.fecha_pago DESC
                 """,
-                fecha_inicio, fecha_fin
-            )
-
-            total_recaudado = Decimal('0.00')
-            pagos = []
-
-            for row in pagos_raw:
-                row_dict = dict(row)
-                monto = Decimal(str(row_dict['monto']))
-                total_recaudado += monto
-
-                pagos.append({
-                    'fecha': row_dict['fecha_pago'].strftime('%d/%m/%Y %H:%M') if row_dict['fecha_pago'] else 'N/A',
-                    'estudiante': row_dict['estudiante_nombre'] or row_dict['estudiante_cedula'],
-                    'materia': row_dict['materia_nombre'] or 'N/A',
-                    'monto': monto,
-                    'metodo': row_dict['metodo_pago'].capitalize() if row_dict['metodo_pago'] else 'N/A'
+                fecha_inicio, fecha_fin,
+                prefetch=TANDA_TESORERIA,
+            ):
+                tanda.append({
+                    'fecha': row['fecha_pago'].strftime('%d/%m/%Y') if row['fecha_pago'] else 'N/A',
+                    'estudiante': row['estudiante_nombre'] or row['estudiante_cedula'],
+                    'materia': row['materia_nombre'] or 'N/A',
+                    'monto': Decimal(str(row['monto'])),
+                    'metodo': row['metodo_pago'].capitalize() if row['metodo_pago'] else 'N/A'
                 })
+                if len(tanda) >= TANDA_TESORERIA:
+                    await asyncio.to_thread(reporte.agregar_pagos, tanda)
+                    tanda = []
+            if tanda:
+                await asyncio.to_thread(reporte.agregar_pagos, tanda)
 
-            metodos = await conn.fetch(
-                """
-                SELECT
-                    metodo_pago,
-                    COUNT(*) as cantidad,
-                    SUM(monto) as total
-                FROM public.pagos
-                WHERE fecha_pago >= $1 AND fecha_pago <= $2
-                GROUP BY metodo_pago
-                """,
-                fecha_inicio, fecha_fin
-            )
-
-        from io import BytesIO
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib import colors
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        styles = getSampleStyleSheet()
-
-        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=20,
-                                     textColor=colors.HexColor('#1e40af'), spaceAfter=20, alignment=TA_CENTER)
-        header_style = ParagraphStyle('CustomHeader', parent=styles['Heading2'], fontSize=12,
-                                      textColor=colors.HexColor('#1e40af'), spaceAfter=10)
-        normal_style = ParagraphStyle('CustomNormal', parent=styles['Normal'], fontSize=10,
-                                      spaceAfter=12, alignment=TA_LEFT)
-
-        elements = []
-        elements.append(Paragraph("INFO CAMPUS", title_style))
-        elements.append(Paragraph(f"Reporte de Tesorería - {dias} días", styles['Heading2']))
-        elements.append(Spacer(1, 12))
-        elements.append(Paragraph(
-            f"<b>Período:</b> {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}",
-            normal_style
-        ))
-        elements.append(Spacer(1, 12))
-
-        elements.append(Paragraph("<b>RESUMEN</b>", header_style))
-        resumen_data = [
-            ['Concepto', 'Valor'],
-            ['Total de Pagos', str(len(pagos))],
-            ['Total Recaudado', f"${float(total_recaudado):.2f}"],
-        ]
-        resumen_table = Table(resumen_data, colWidths=[3*inch, 3.5*inch])
-        resumen_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f3f4f6')),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('TOPPADDING', (0, 1), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-            ('ALIGN', (1, 1), (1, -1), 'RIGHT'),
-        ]))
-        elements.append(resumen_table)
-        elements.append(Spacer(1, 20))
-
-        if metodos:
-            elements.append(Paragraph("<b>DESGLOSE POR MÉTODO DE PAGO</b>", header_style))
-            metodos_data = [['Método', 'Cantidad', 'Total']]
-            for metodo in metodos:
-                m = dict(metodo)
-                metodos_data.append([
-                    m['metodo_pago'].capitalize() if m['metodo_pago'] else 'N/A',
-                    str(m['cantidad']),
-                    f"${float(m['total']):.2f}"
-                ])
-            metodos_table = Table(metodos_data, colWidths=[3*inch, 1.5*inch, 2*inch])
-            metodos_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f3f4f6')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-                ('FONTSIZE', (0, 1), (-1, -1), 9),
-                ('TOPPADDING', (0, 1), (-1, -1), 6),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-                ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-                ('ALIGN', (-1, 1), (-1, -1), 'RIGHT'),
-            ]))
-            elements.append(metodos_table)
-            elements.append(Spacer(1, 20))
-
-        if pagos:
-            elements.append(Paragraph("<b>DETALLE DE PAGOS</b>", header_style))
-            elements.append(Spacer(1, 6))
-            pagos_mostrar = pagos[:50]
-            pagos_data = [['Fecha', 'Estudiante', 'Materia', 'Monto', 'Método']]
-            for pago in pagos_mostrar:
-                pagos_data.append([
-                    pago['fecha'],
-                    pago['estudiante'][:25],
-                    pago['materia'][:20],
-                    f"${pago['monto']:.2f}",
-                    pago['metodo']
-                ])
-            if len(pagos) > 50:
-                pagos_data.append(['...', f'Y {len(pagos) - 50} pagos más', '', '', ''])
-
-            pagos_table = Table(pagos_data, colWidths=[1.2*inch, 1.8*inch, 1.8*inch, 1*inch, 1.2*inch])
-            pagos_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f3f4f6')),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-                ('FONTSIZE', (0, 1), (-1, -1), 7),
-                ('TOPPADDING', (0, 1), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 3),
-                ('ALIGN', (0, 1), (1, -1), 'LEFT'),
-                ('ALIGN', (-2, 1), (-2, -1), 'RIGHT'),
-            ]))
-            elements.append(pagos_table)
-
-        elements.append(Spacer(1, 30))
-        elements.append(Paragraph("_" * 60, normal_style))
-        elements.append(Paragraph(
-            f"<para alignment='center' fontSize='8'>Documento generado el {datetime.now().strftime('%d/%m/%Y %H:%M')} por {current_user['cedula']}</para>",
-            normal_style
-        ))
-
-        doc.build(elements)
-        buffer.seek(0)
+        buffer = await asyncio.to_thread(reporte.finalizar)
 
         nombre_archivo = f"reporte_tesoreria_{dias}dias_{datetime.now().strftime('%Y%m%d')}.pdf"
 
@@ -456,6 +356,7 @@ async def reporte_tesoreria(
 @router.get("/notas/{estudiante_id}", summary="Boletín de notas del estudiante")
 async def boletin_notas(
     estudiante_id: int,
+    if_none_match: Optional[str] = Header(None),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     logger.info(f"Boletín de notas solicitado para estudiante {estudiante_id} por {current_user['cedula']}")
@@ -516,160 +417,27 @@ async def boletin_notas(
                 estudiante_id,
             )
 
-        materias_dict = {}
-        for row in rows:
-            r = dict(row)
-            iid = r['inscripcion_id']
-            if iid not in materias_dict:
-                materias_dict[iid] = {
-                    'materia_nombre': r['materia_nombre'],
-                    'materia_codigo': r['materia_codigo'],
-                    'creditos': r['creditos'],
-                    'semestre': r['semestre'],
-                    'seccion': r['seccion_codigo'],
-                    'periodo_nombre': r['periodo_nombre'],
-                    'periodo_codigo': r['periodo_codigo'],
-                    'nota_final': float(r['nota_final']) if r['nota_final'] else None,
-                    'estado': r['estado'],
-                    'evaluaciones': []
-                }
-            if r['tipo_evaluacion']:
-                materias_dict[iid]['evaluaciones'].append({
-                    'tipo': r['tipo_evaluacion'],
-                    'nota': float(r['nota_parcial']) if r['nota_parcial'] else None,
-                    'peso': float(r['peso_porcentual']) if r['peso_porcentual'] else None
-                })
+        materias = list(agrupar_materias_boletin(rows).values())
 
-        materias = list(materias_dict.values())
-
-        from io import BytesIO
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib import colors
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-        styles = getSampleStyleSheet()
-
-        title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=22,
-                                     textColor=colors.HexColor('#1e40af'), spaceAfter=6, alignment=TA_CENTER)
-        subtitle_style = ParagraphStyle('Subtitle', parent=styles['Heading2'], fontSize=13,
-                                        textColor=colors.HexColor('#374151'), spaceAfter=20, alignment=TA_CENTER)
-        header_style = ParagraphStyle('Header', parent=styles['Heading3'], fontSize=11,
-                                      textColor=colors.HexColor('#1e40af'), spaceAfter=6)
-        normal_style = ParagraphStyle('Normal2', parent=styles['Normal'], fontSize=10, spaceAfter=4)
-
-        elements = []
-        elements.append(Paragraph("INFO CAMPUS", title_style))
-        elements.append(Paragraph("Boletín de Notas", subtitle_style))
-
-        nombre_completo = f"{est_dict.get('first_name', '')} {est_dict.get('last_name', '')}".strip()
-
-        info_data = [
-            ['Campo', 'Valor'],
-            ['Estudiante', nombre_completo],
-            ['Cédula', est_dict.get('cedula', 'N/A')],
-            ['Carrera', est_dict.get('carrera_nombre', 'N/A')],
-            ['Semestre Actual', str(est_dict.get('semestre_actual', 'N/A'))],
-            ['Promedio Acumulado', f"{float(est_dict['promedio_acumulado']):.2f}" if est_dict.get('promedio_acumulado') else 'N/A'],
-            ['Fecha de Emisión', datetime.now().strftime('%d/%m/%Y %H:%M')],
-        ]
-
-        info_table = Table(info_data, colWidths=[2.5*inch, 4*inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f3f4f6')),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('TOPPADDING', (0, 1), (-1, -1), 5),
-            ('BOTTOMPADDING', (0, 1), (-1, -1), 5),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ]))
-        elements.append(info_table)
-        elements.append(Spacer(1, 20))
-
-        periodos_vistos = []
-        for m in materias:
-            if m['periodo_codigo'] not in periodos_vistos:
-                periodos_vistos.append(m['periodo_codigo'])
-
-        for periodo_codigo in periodos_vistos:
-            materias_periodo = [m for m in materias if m['periodo_codigo'] == periodo_codigo]
-            if not materias_periodo:
-                continue
-
-            periodo_nombre = materias_periodo[0]['periodo_nombre']
-            elements.append(Paragraph(f"<b>{periodo_nombre}</b>", header_style))
-
-            tabla_data = [['Materia', 'Sec.', 'P1\n(25%)', 'P2\n(25%)', 'Tall.\n(20%)', 'Final\n(30%)', 'Nota\nFinal', 'Estado']]
-
-            for m in materias_periodo:
-                eval_map = {ev['tipo']: ev['nota'] for ev in m['evaluaciones'] if ev['nota'] is not None}
-                p1 = f"{eval_map['parcial_1']:.1f}" if eval_map.get('parcial_1') is not None else '-'
-                p2 = f"{eval_map['parcial_2']:.1f}" if eval_map.get('parcial_2') is not None else '-'
-                talleres = f"{eval_map['talleres']:.1f}" if eval_map.get('talleres') is not None else '-'
-                examen = f"{eval_map['examen_final']:.1f}" if eval_map.get('examen_final') is not None else '-'
-                nota_final = f"{m['nota_final']:.2f}" if m['nota_final'] is not None else '-'
-
-                estado_display = {
-                    'aprobado': 'Aprobado',
-                    'reprobado': 'Reprobado',
-                    'activo': 'En Curso',
-                    'inscrito': 'Inscrito',
-                    'retirado': 'Retirado'
-                }.get(m['estado'], m['estado'])
-
-                tabla_data.append([
-                    m['materia_nombre'][:28],
-                    m['seccion'],
-                    p1, p2, talleres, examen,
-                    nota_final,
-                    estado_display
-                ])
-
-            notas_table = Table(tabla_data, colWidths=[2.1*inch, 0.4*inch, 0.55*inch, 0.55*inch, 0.55*inch, 0.55*inch, 0.6*inch, 0.7*inch])
-            notas_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 8),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('ALIGN', (0, 1), (0, -1), 'LEFT'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('TOPPADDING', (0, 0), (-1, 0), 8),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#f9fafb'), colors.white]),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ('TOPPADDING', (0, 1), (-1, -1), 5),
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 5),
-            ]))
-            elements.append(notas_table)
-            elements.append(Spacer(1, 16))
-
-        elements.append(Spacer(1, 20))
-        elements.append(Paragraph("_" * 60, normal_style))
-        elements.append(Paragraph(
-            f"<para alignment='center' fontSize='8'>Documento oficial generado el {datetime.now().strftime('%d/%m/%Y %H:%M')} · Info Campus ERP</para>",
-            normal_style
-        ))
-
-        doc.build(elements)
-        buffer.seek(0)
+        clave = pdf_cache.calcular_clave('boletin_notas', est_dict, materias)
+        if pdf_cache.etag_coincide(if_none_match, clave):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": pdf_cache.etag(clave)})
+
+        contenido = pdf_cache.obtener_o_generar(
+            clave,
+            lambda: generar_boletin_calificaciones(est_dict, materias)
+        )
 
         nombre_archivo = f"boletin_notas_{est_dict.get('cedula', estudiante_id)}_{datetime.now().strftime('%Y%m%d')}.pdf"
 
-        return StreamingResponse(
-            buffer,
+        return Response(
+            content=contenido,
             media_type="application/pdf",
-            headers={"Content-Disposition": f"inline; filename={nombre_archivo}"}
+            headers={
+                "Content-Disposition": f"inline; filename={nombre_archivo}",
+                "ETag": pdf_cache.etag(clave),
+                "Cache-Control": "private, no-cache",
+            }
         )
 
     except HTTPException:
@@ -677,3 +445,53 @@ async def boletin_notas(
     except Exception as e:
         logger.error(f"Error generando boletín de notas: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error generando boletín: {str(e)}")
+
+
+@router.get("/lote", summary="Certificados o boletines en lote (ZIP)")
+async def reportes_lote(
+    tipo: str,
+    seccion_id: Optional[int] = None,
+    carrera_id: Optional[int] = None,
+    periodo_id: Optional[int] = None,
+    current_user: Dict[str, Any] = Depends(require_roles(['director', 'coordinador', 'administrativo']))
+):
+    """
+    Genera todos los certificados de inscripción (`tipo=certificados`) o
+    boletines de notas (`tipo=boletines`) de una sección, carrera o período
+    y los devuelve como un ZIP que se va enviando mientras se renderiza.
+    """
+    logger.info(
+        f"Lote de {tipo} solicitado por {current_user['cedula']} "
+        f"(seccion={seccion_id}, carrera={carrera_id}, periodo={periodo_id})"
+    )
+
+    if tipo not in TIPOS_LOTE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"tipo debe ser uno de: {', '.join(TIPOS_LOTE)}")
+    if seccion_id is None and carrera_id is None and periodo_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Indique seccion_id, carrera_id o periodo_id")
+
+    try:
+        # Validación previa: una vez iniciado el streaming ya no se puede devolver un error HTTP
+        async with get_db() as conn:
+            total = await contar_documentos(conn, tipo, seccion_id, carrera_id, periodo_id)
+
+        if not total:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No hay documentos para los filtros indicados")
+
+        filtro = f"seccion{seccion_id}" if seccion_id else f"carrera{carrera_id}" if carrera_id else f"periodo{periodo_id}"
+        nombre_archivo = f"{tipo}_{filtro}_{datetime.now().strftime('%Y%m%d')}.zip"
+
+        return StreamingResponse(
+            generar_zip(tipo, seccion_id, carrera_id, periodo_id),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f"attachment; filename={nombre_archivo}",
+                "X-Total-Documentos": str(total),
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generando lote de {tipo}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error generando lote: {str(e)}")
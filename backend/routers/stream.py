@@ -0,0 +1,86 @@
+"""
+Server-Sent Events para actualizar dashboards sin volver a consultarlos.
+
+El cliente abre GET /api/stream/dashboard y recibe eventos pequeños
+(services/eventos.py) con los que parchea su estado local: un 'pago' suma
+al recaudado, una 'nota' actualiza una fila, etc. Ante 'resync' debe
+recargar el dashboard completo.
+
+EventSource no permite enviar headers: el token puede ir como ?token=.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from auth.dependencies import get_current_user_sse
+from config import settings
+from services import eventos
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/stream",
+    tags=["Stream"],
+    responses={401: {"description": "No autorizado"}},
+)
+
+# Ven todos los eventos; estudiantes y profesores solo los propios
+ROLES_VEN_TODO = {'director', 'admin', 'coordinador', 'administrativo', 'tesorero'}
+
+INTERVALO_LATIDO_SEGUNDOS = 15
+
+
+def _visible(evento: Dict[str, Any], usuario: Dict[str, Any]) -> bool:
+    if evento.get('tipo') == 'resync' or usuario['rol'] in ROLES_VEN_TODO:
+        return True
+    datos = evento.get('datos') or {}
+    if usuario['rol'] == 'estudiante':
+        return datos.get('estudiante_id') == usuario['id']
+    if usuario['rol'] == 'profesor':
+        return datos.get('docente_id') == usuario['id']
+    return False
+
+
+def _formatear(evento: Dict[str, Any]) -> str:
+    linea_id = f"id: {evento['id']}\n" if evento.get('id') else ""
+    datos = json.dumps(evento.get('datos') or {}, ensure_ascii=False, default=str)
+    return f"{linea_id}event: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+@router.get("/dashboard", summary="Eventos en vivo del dashboard (SSE)")
+async def stream_dashboard(
+    request: Request,
+    current_user: Dict[str, Any] = Depends(get_current_user_sse),
+) -> StreamingResponse:
+    if eventos.total_suscriptores() >= settings.SSE_MAX_SUSCRIPTORES:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas conexiones en vivo, reintente más tarde",
+            headers={"Retry-After": "30"},
+        )
+
+    async def _generar():
+        with eventos.suscribir() as cola:
+            # retry: milisegundos que espera EventSource antes de reconectar
+            yield f"retry: 5000\nevent: conectado\ndata: {json.dumps({'rol': current_user['rol']})}\n\n"
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=INTERVALO_LATIDO_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": ping\n\n"
+                    continue
+                if _visible(evento, current_user):
+                    yield _formatear(evento)
+
+    return StreamingResponse(
+        _generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from typing import Dict, Any, List, Optional, Tuple
 from decimal import Decimal
 import logging
 
 from auth.dependencies import require_roles
 from database import get_db
+from services import cache_respuestas, eventos, kpis
+from services.cache_respuestas import cache_respuesta
+from services.busqueda_estudiantes import cedula_exacta, condicion_busqueda
+from services.exportador import respuesta_exportacion
+from services.paginacion import (
+    ModoTotal, Orden, campos_paginacion, condicion_cursor, contar, modo_total, recortar,
+)
+from services.paralelo import en_paralelo, fetch, fetchrow
 
 logger = logging.getLogger(__name__)
 
@@ -15,30 +23,55 @@ router = APIRouter(
 )
 
 
+def _filtros_pagos(
+    estudiante_id: Optional[int],
+    estado: Optional[str],
+    periodo_id: Optional[int],
+    carrera_id: Optional[int],
+    semestre: Optional[int],
+) -> Tuple[List[str], list]:
+    """Filtros de /pagos (alias p = pagos, u = usuarios) compartidos con la exportación."""
+    filtros: List[str] = []
+    params: list = []
+    for condicion, valor in (
+        ("p.estudiante_id", estudiante_id),
+        ("p.estado", estado),
+        ("p.periodo_id", periodo_id),
+        ("u.carrera_id", carrera_id),
+        ("u.semestre_actual", semestre),
+    ):
+        if valor:
+            params.append(valor)
+            filtros.append(f"{condicion} = ${len(params)}")
+    return filtros, params
+
+
+ORDEN_PAGOS = Orden("pagos", (("p.fecha_pago", "fecha_pago", True), ("p.id", "id", True)))
+
+COLUMNAS_EXPORTACION_PAGOS = [
+    ("id", lambda r: r["id"]),
+    ("fecha_pago", lambda r: r["fecha_pago"]),
+    ("cedula", lambda r: r["cedula"]),
+    ("estudiante", lambda r: f"{r['first_name']} {r['last_name']}"),
+    ("carrera", lambda r: r["carrera_nombre"]),
+    ("periodo", lambda r: r["periodo_codigo"]),
+    ("concepto", lambda r: r["concepto"]),
+    ("metodo_pago", lambda r: r["metodo_pago"]),
+    ("referencia", lambda r: r["referencia"]),
+    ("estado", lambda r: r["estado"]),
+    ("monto", lambda r: r["monto"]),
+]
+
+
 @router.get("/resumen-kpis", summary="KPIs financieros rápidos")
+@cache_respuesta(ttl=60, etiquetas=('pagos', 'inscripciones', 'usuarios'))
 async def resumen_kpis(
+    request: Request,
     current_user: Dict[str, Any] = Depends(require_roles(["tesorero", "director", "admin"]))
 ) -> Dict[str, Any]:
     try:
         async with get_db() as conn:
-            pagos_stats = dict(await conn.fetchrow("""
-                SELECT
-                    COALESCE(SUM(CASE WHEN estado = 'completado' THEN monto ELSE 0 END), 0) AS recaudado_total,
-                    COALESCE(SUM(CASE WHEN estado = 'pendiente'  THEN monto ELSE 0 END), 0) AS pendiente_cobro,
-                    COUNT(CASE WHEN estado = 'completado' THEN 1 END) AS pagos_completados,
-                    COUNT(CASE WHEN estado = 'pendiente'  THEN 1 END) AS pagos_pendientes
-                FROM public.pagos
-            """))
-
-            estudiantes_mora_row = await conn.fetchrow("""
-                SELECT COUNT(DISTINCT u.id) AS total
-                FROM public.usuarios u
-                JOIN public.inscripciones i ON i.estudiante_id = u.id
-                WHERE u.rol = 'estudiante' AND i.pago_id IS NULL
-            """)
-            estudiantes_mora = estudiantes_mora_row["total"]
-
-            ingresos_rows = await conn.fetch("""
+            consulta_ingresos = fetch("""
                 SELECT
                     DATE_TRUNC('month', fecha_pago) AS mes,
                     COALESCE(SUM(monto), 0)         AS total
@@ -49,6 +82,39 @@ async def resumen_kpis(
                 ORDER BY mes DESC
                 LIMIT 6
             """)
+
+            contadores = await kpis.leer_contadores(conn)
+            if contadores is not None:
+                pagos_stats = {
+                    "recaudado_total":   contadores['monto_completado'],
+                    "pendiente_cobro":   contadores['monto_pendiente'],
+                    "pagos_completados": int(contadores['pagos_completados']),
+                    "pagos_pendientes":  int(contadores['pagos_pendientes']),
+                }
+                estudiantes_mora = int(contadores['estudiantes_mora'])
+                ingresos_rows = await consulta_ingresos(conn)
+            else:
+                pagos_row, estudiantes_mora_row, ingresos_rows = await en_paralelo(
+                    conn,
+                    fetchrow("""
+                        SELECT
+                            COALESCE(SUM(CASE WHEN estado = 'completado' THEN monto ELSE 0 END), 0) AS recaudado_total,
+                            COALESCE(SUM(CASE WHEN estado = 'pendiente'  THEN monto ELSE 0 END), 0) AS pendiente_cobro,
+                            COUNT(CASE WHEN estado = 'completado' THEN 1 END) AS pagos_completados,
+                            COUNT(CASE WHEN estado = 'pendiente'  THEN 1 END) AS pagos_pendientes
+                        FROM public.pagos
+                    """),
+                    fetchrow("""
+                        SELECT COUNT(DISTINCT u.id) AS total
+                        FROM public.usuarios u
+                        JOIN public.inscripciones i ON i.estudiante_id = u.id
+                        WHERE u.rol = 'estudiante' AND i.pago_id IS NULL
+                    """),
+                    consulta_ingresos,
+                )
+                pagos_stats = dict(pagos_row)
+                estudiantes_mora = estudiantes_mora_row["total"]
+
             ingresos_mensuales = []
             for row in ingresos_rows:
                 r = dict(row)
@@ -57,12 +123,7 @@ async def resumen_kpis(
                     "monto": float(r["total"]),
                 })
 
-            proyeccion_row = await conn.fetchrow("""
-                SELECT COALESCE(SUM(monto), 0) AS proyeccion
-                FROM public.pagos
-                WHERE estado = 'pendiente'
-            """)
-            proyeccion_mes = float(proyeccion_row["proyeccion"])
+            proyeccion_mes = float(pagos_stats["pendiente_cobro"])
 
         return {
             "recaudado_total":          float(pagos_stats["recaudado_total"]),
@@ -88,65 +149,29 @@ async def listar_pagos(
     semestre: Optional[int] = None,
     page: int = 1,
     limit: int = 20,
+    cursor: Optional[str] = None,
+    total: Optional[ModoTotal] = None,
     current_user: Dict[str, Any] = Depends(require_roles(["tesorero", "director", "admin"])),
 ) -> Dict[str, Any]:
+    """Más recientes primero (fecha_pago, id); paginación por `cursor` o `page`."""
     try:
         async with get_db() as conn:
-            # Filtros para query de DATOS (incluye u.rol para mostrar info correcta)
-            filtros_data = ["u.rol = 'estudiante'"]
-            params_data: list = []
-
-            # Filtros para COUNT (solo p.* - sin carrera/semestre)
-            filtros_count: list = []
-            params_count: list = []
-
-            idx = 1
-            if estudiante_id:
-                filtros_data.append(f"p.estudiante_id = ${idx}")
-                params_data.append(estudiante_id)
-                filtros_count.append(f"p.estudiante_id = ${idx}")
-                params_count.append(estudiante_id)
-                idx += 1
-            if estado:
-                filtros_data.append(f"p.estado = ${idx}")
-                params_data.append(estado)
-                filtros_count.append(f"p.estado = ${idx}")
-                params_count.append(estado)
-                idx += 1
-            if periodo_id:
-                filtros_data.append(f"p.periodo_id = ${idx}")
-                params_data.append(periodo_id)
-                filtros_count.append(f"p.periodo_id = ${idx}")
-                params_count.append(periodo_id)
-                idx += 1
-            if carrera_id:
-                filtros_data.append(f"u.carrera_id = ${idx}")
-                params_data.append(carrera_id)
-                filtros_count.append(f"u.carrera_id = ${idx}")
-                params_count.append(carrera_id)
-                idx += 1
-            if semestre:
-                filtros_data.append(f"u.semestre_actual = ${idx}")
-                params_data.append(semestre)
-                filtros_count.append(f"u.semestre_actual = ${idx}")
-                params_count.append(semestre)
-                idx += 1
-
-            where_data = " AND ".join(filtros_data)
-            where_count = " AND ".join(filtros_count) if filtros_count else "1=1"
+            # Filtros para COUNT (solo p.* salvo carrera/semestre); los DATOS además filtran u.rol
+            filtros_count, params_count = _filtros_pagos(estudiante_id, estado, periodo_id, carrera_id, semestre)
 
             # COUNT: necesita JOIN a usuarios si hay filtros de carrera/semestre
             count_from = "public.pagos p"
             if carrera_id or semestre:
                 count_from = "public.pagos p JOIN public.usuarios u ON p.estudiante_id = u.id"
-            total_row = await conn.fetchrow(
-                f"SELECT COUNT(*) AS total FROM {count_from} WHERE {where_count}",
-                *params_count,
-            )
-            total = total_row["total"]
+            modo = modo_total(total, cursor)
+            cantidad = await contar(conn, modo, count_from, " AND ".join(filtros_count), params_count, "public.pagos")
+
+            condicion, params_cursor = condicion_cursor(ORDEN_PAGOS, cursor, len(params_count) + 1)
+            filtros_data = ["u.rol = 'estudiante'"] + filtros_count + ([condicion] if condicion else [])
+            where_data = " AND ".join(filtros_data)
 
-            param_count = len(params_data)
-            params_pag = params_data + [limit, (page - 1) * limit]
+            param_count = len(params_count) + len(params_cursor)
+            params_pag = list(params_count) + params_cursor + [limit + 1, 0 if cursor else (page - 1) * limit]
 
             pagos_rows = await conn.fetch(
                 f"""
@@ -159,11 +184,12 @@ async def listar_pagos(
                 JOIN public.usuarios u ON p.estudiante_id = u.id
                 LEFT JOIN public.periodos_lectivos pl ON p.periodo_id = pl.id
                 WHERE {where_data}
-                ORDER BY p.fecha_pago DESC
+                ORDER BY {ORDEN_PAGOS.sql()}
                 LIMIT ${param_count + 1} OFFSET ${param_count + 2}
                 """,
                 *params_pag,
             )
+            pagos_rows, siguiente = recortar(ORDEN_PAGOS, pagos_rows, limit)
 
             pagos = []
             for row in pagos_rows:
@@ -183,18 +209,54 @@ async def listar_pagos(
 
         return {
             "data": {
-                "pagos":       pagos,
-                "total":       total,
-                "page":        page,
-                "total_pages": (total + limit - 1) // limit,
+                "pagos": pagos,
+                **campos_paginacion(cantidad, None if cursor else page, limit, siguiente, modo),
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listando pagos: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 
+@router.get("/pagos/exportar", summary="Exportar pagos (CSV/XLSX)")
+async def exportar_pagos(
+    estudiante_id: Optional[int] = None,
+    estado: Optional[str] = None,
+    periodo_id: Optional[int] = None,
+    carrera_id: Optional[int] = None,
+    semestre: Optional[int] = None,
+    formato: str = "csv",
+    current_user: Dict[str, Any] = Depends(require_roles(["tesorero", "director", "admin"])),
+):
+    """Mismos filtros que /pagos, sin paginar; se transmite directo desde un cursor."""
+    logger.info(f"Exportación de pagos ({formato}) solicitada por {current_user['cedula']}")
+    filtros, params = _filtros_pagos(estudiante_id, estado, periodo_id, carrera_id, semestre)
+    where = " AND ".join(["u.rol = 'estudiante'"] + filtros)
+    return respuesta_exportacion(
+        f"""
+        SELECT
+            p.id, p.monto, p.fecha_pago, p.metodo_pago, p.estado,
+            p.referencia, p.concepto,
+            u.first_name, u.last_name, u.cedula,
+            c.nombre AS carrera_nombre,
+            pl.codigo AS periodo_codigo
+        FROM public.pagos p
+        JOIN public.usuarios u ON p.estudiante_id = u.id
+        LEFT JOIN public.carreras c ON u.carrera_id = c.id
+        LEFT JOIN public.periodos_lectivos pl ON p.periodo_id = pl.id
+        WHERE {where}
+        ORDER BY p.fecha_pago DESC, p.id DESC
+        """,
+        params,
+        COLUMNAS_EXPORTACION_PAGOS,
+        formato,
+        "pagos",
+    )
+
+
 @router.get("/estudiantes-mora", summary="Estudiantes en mora")
 async def estudiantes_mora(
     current_user: Dict[str, Any] = Depends(require_roles(["tesorero", "director", "admin"]))
@@ -300,9 +362,10 @@ async def buscar_estudiante(
     current_user: Dict[str, Any] = Depends(require_roles(["tesorero", "director", "admin"])),
 ) -> Dict[str, Any]:
     try:
-        search_term = f"%{q}%"
         async with get_db() as conn:
-            rows = await conn.fetch("""
+            cedula = await cedula_exacta(conn, q)
+            condicion, params, relevancia = condicion_busqueda(q, 1, cedula=cedula)
+            rows = await conn.fetch(f"""
                 SELECT
                     u.id, u.first_name, u.last_name, u.cedula, u.email,
                     u.es_becado, u.porcentaje_beca, u.carrera_id,
@@ -314,14 +377,11 @@ async def buscar_estudiante(
                 LEFT JOIN public.inscripciones i
                        ON i.estudiante_id = u.id AND i.pago_id IS NULL
                 WHERE u.rol = 'estudiante'
-                  AND (
-                      LOWER(u.first_name) LIKE LOWER($1) OR
-                      LOWER(u.last_name)  LIKE LOWER($2) OR
-                      u.cedula            LIKE $3
-                  )
+                  AND {condicion}
                 GROUP BY u.id, c.nombre, c.precio_credito
+                ORDER BY {f'{relevancia} DESC' if relevancia else 'u.last_name'}
                 LIMIT 10
-            """, search_term, search_term, search_term)
+            """, *params)
 
             estudiantes = []
             for row in rows:
@@ -364,7 +424,8 @@ async def asignar_beca(
     try:
         async with get_db() as conn:
             estudiante = await conn.fetchrow(
-                "SELECT id, first_name, last_name FROM public.usuarios WHERE id = $1 AND rol = 'estudiante'",
+                "SELECT id, first_name, last_name, rol, carrera_id, es_becado FROM public.usuarios "
+                "WHERE id = $1 AND rol = 'estudiante' FOR UPDATE",
                 estudiante_id,
             )
             if not estudiante:
@@ -379,7 +440,10 @@ async def asignar_beca(
                 """,
                 es_becado, porcentaje_beca, tipo_beca, estudiante_id,
             )
+            await kpis.registrar_cambio_usuario(conn, estudiante, {**dict(estudiante), 'es_becado': es_becado})
+            await eventos.publicar(conn, 'usuario', estudiante_id=estudiante_id)
 
+        cache_respuestas.invalidar('usuarios', 'pagos')
         est = dict(estudiante)
         return {
             "ok": True,
@@ -0,0 +1,90 @@
+"""
+Búsqueda de estudiantes por nombre o cédula, compartida por
+/academico/estudiantes (y su exportación) y /tesorero/buscar-estudiante.
+
+Usa la columna generada usuarios.busqueda ("nombres apellidos cédula" en
+minúsculas y sin tildes) y su índice GIN de trigramas
+(migrations/005_busqueda_estudiantes.sql):
+- cada palabra del texto debe aparecer en la columna (LIKE '%palabra%',
+  en cualquier orden: "perez juan" encuentra a "Juan Pérez");
+- o bien el texto completo se parece por palabras (<%), lo que tolera
+  errores de tipeo ("gonzales" → "González");
+- los resultados se ordenan por word_similarity (expresión de relevancia).
+
+Si el texto es una cédula completa de un estudiante se filtra por igualdad
+(índice UNIQUE de cedula) y se evita la búsqueda aproximada.
+
+    cedula = await cedula_exacta(conn, q)
+    condicion, params, orden = condicion_busqueda(q, primer_param=1, cedula=cedula)
+
+Las condiciones asumen el filtro u.rol = 'estudiante' (el índice es parcial).
+"""
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+# Palabras del texto que generan un LIKE propio; el resto solo cuenta para
+# la similitud
+MAX_PALABRAS = 4
+
+PATRON_CEDULA = re.compile(r"^[0-9][0-9-]{4,14}$")
+
+
+def normalizar(texto: str) -> str:
+    """Mismo criterio que public.normalizar_busqueda: minúsculas y sin tildes."""
+    sin_tildes = ''.join(
+        c for c in unicodedata.normalize('NFD', texto or '')
+        if unicodedata.category(c) != 'Mn'
+    )
+    return ' '.join(sin_tildes.lower().split())
+
+
+def _escapar_like(texto: str) -> str:
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+async def cedula_exacta(conn, q: Optional[str]) -> Optional[str]:
+    """La cédula si `q` es exactamente la de un estudiante; si no, None."""
+    cedula = (q or '').strip()
+    if not PATRON_CEDULA.match(cedula):
+        return None
+    existe = await conn.fetchval(
+        "SELECT 1 FROM public.usuarios WHERE cedula = $1 AND rol = 'estudiante'",
+        cedula,
+    )
+    return cedula if existe else None
+
+
+def condicion_busqueda(
+    q: str,
+    primer_param: int,
+    alias: str = "u",
+    cedula: Optional[str] = None,
+) -> Tuple[str, List[str], Optional[str]]:
+    """
+    Condición WHERE para buscar `q`.
+
+    Args:
+        q: Texto ingresado por el usuario
+        primer_param: Número del primer placeholder ($n) que puede usar
+        alias: Alias de public.usuarios en la consulta
+        cedula: Resultado de cedula_exacta(); activa el camino por igualdad
+
+    Returns:
+        (condición, parámetros, expresión de relevancia, mayor es mejor, o None)
+    """
+    if cedula:
+        return f"{alias}.cedula = ${primer_param}", [cedula], None
+
+    termino = normalizar(q)
+    palabras = termino.split()[:MAX_PALABRAS]
+    if not palabras:
+        return "true", [], None
+    params = [f"%{_escapar_like(p)}%" for p in palabras]
+    likes = " AND ".join(
+        f"{alias}.busqueda LIKE ${primer_param + i}" for i in range(len(palabras))
+    )
+    n_termino = primer_param + len(palabras)
+    params.append(termino)
+    condicion = f"(({likes}) OR ${n_termino} <% {alias}.busqueda)"
+    return condicion, params, f"word_similarity(${n_termino}, {alias}.busqueda)"
@@ -0,0 +1,82 @@
+"""
+Caché del contexto de IA por usuario.
+
+/ia/chat necesita el mismo contexto (notas, deuda, KPIs...) en cada mensaje
+de una conversación; reconstruirlo cuesta varias consultas. Aquí se guarda
+por (usuario, rol, versión de datos) durante IA_CONTEXTO_TTL_SEGUNDOS.
+
+Versiones:
+- estudiante / profesor: versión propia del usuario, que sube con cada
+  evento (services/eventos.py) que lo menciona como estudiante_id o
+  docente_id.
+- roles institucionales: su contexto es agregado, así que usan además la
+  versión global, que sube con cualquier evento.
+
+Como los eventos llegan por LISTEN/NOTIFY a todos los workers, la
+invalidación es global; el TTL acota lo que no genera evento.
+
+Uso:
+    version = cache_contexto_ia.version(usuario)
+    contexto = cache_contexto_ia.obtener(usuario, version)
+    if contexto is None:
+        contexto = await construir(...)
+        cache_contexto_ia.guardar(usuario, version, contexto)
+"""
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from config import settings
+
+MAX_ENTRADAS = 1000
+
+ROLES_PERSONALES = ('estudiante', 'profesor')
+
+_version_global = 0
+_versiones_usuario: Dict[int, int] = {}
+# user_id -> (clave de versión, creado, contexto)
+_entradas: Dict[int, Tuple[tuple, float, Dict[str, Any]]] = {}
+
+
+def version(usuario: Mapping[str, Any]) -> tuple:
+    propia = _versiones_usuario.get(usuario['id'], 0)
+    if usuario.get('rol') in ROLES_PERSONALES:
+        return (usuario.get('rol'), propia)
+    return (usuario.get('rol'), propia, _version_global)
+
+
+def obtener(usuario: Mapping[str, Any], version_actual: tuple) -> Optional[Dict[str, Any]]:
+    entrada = _entradas.get(usuario['id'])
+    if entrada is None:
+        return None
+    clave, creado, contexto = entrada
+    if clave != version_actual or time.monotonic() - creado > settings.IA_CONTEXTO_TTL_SEGUNDOS:
+        return None
+    return contexto
+
+
+def guardar(usuario: Mapping[str, Any], version_calculada: tuple, contexto: Dict[str, Any]) -> None:
+    # Si los datos cambiaron mientras se calculaba, no se guarda una foto vieja
+    if version_calculada != version(usuario):
+        return
+    if len(_entradas) >= MAX_ENTRADAS and usuario['id'] not in _entradas:
+        # Descarta la entrada más antigua (dict conserva el orden de inserción)
+        _entradas.pop(next(iter(_entradas)))
+    _entradas.pop(usuario['id'], None)
+    _entradas[usuario['id']] = (version_calculada, time.monotonic(), contexto)
+
+
+def invalidar_usuario(user_id: Optional[int]) -> None:
+    if user_id is not None:
+        _versiones_usuario[user_id] = _versiones_usuario.get(user_id, 0) + 1
+
+
+def invalidar_evento(datos: Mapping[str, Any]) -> None:
+    """Sube la versión global y la de los usuarios que menciona el evento."""
+    global _version_global
+    _version_global += 1
+    invalidar_usuario(datos.get('estudiante_id'))
+    invalidar_usuario(datos.get('docente_id'))
+
+
+def invalidar_todo() -> None:
+    _entradas.clear()
@@ -0,0 +1,204 @@
+"""
+Caché de respuestas JSON para endpoints de solo lectura (dashboards, KPIs).
+
+La clave es (ruta, rol, query params); con por_usuario=True el rol se
+reemplaza por el id del usuario para endpoints cuyo contenido depende de
+quién pregunta. Cada entrada vive `ttl` segundos fresca y otros `ttl`
+segundos "rancia": en esa ventana se sirve igual y se recalcula en segundo
+plano (stale-while-revalidate). Peticiones simultáneas sobre una clave
+vacía comparten un único cálculo.
+
+Cada respuesta lleva ETag; si el cliente manda If-None-Match y coincide,
+se responde 304 sin cuerpo.
+
+Los endpoints de escritura llaman invalidar('pagos', ...) después de
+confirmar la transacción. La caché es por worker: otro worker puede servir
+datos de hasta 2×ttl de antigüedad.
+
+Uso:
+    @router.get("/finanzas")
+    @cache_respuesta(ttl=60, etiquetas=('pagos',))
+    async def dashboard_finanzas(request: Request, current_user=Depends(...)):
+        ...
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence, Set, Tuple
+
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRADAS = 512
+
+ETIQUETAS = ('pagos', 'notas', 'inscripciones', 'usuarios')
+
+
+class _Entrada:
+    __slots__ = ('contenido', 'etag', 'creado', 'ttl', 'etiquetas')
+
+    def __init__(self, contenido: bytes, ttl: float, etiquetas: Tuple[str, ...]):
+        self.contenido = contenido
+        self.etag = f'"{hashlib.sha256(contenido).hexdigest()[:32]}"'
+        self.creado = time.monotonic()
+        self.ttl = ttl
+        self.etiquetas = etiquetas
+
+    def edad(self) -> float:
+        return time.monotonic() - self.creado
+
+
+_entradas: "OrderedDict[tuple, _Entrada]" = OrderedDict()
+_en_vuelo: Dict[tuple, asyncio.Future] = {}
+# Contador por etiqueta: un cálculo que empezó antes de una invalidación no se guarda
+_generaciones: Dict[str, int] = {}
+# Referencias a las revalidaciones en segundo plano (evita que el GC las cancele)
+_revalidaciones: Set[asyncio.Task] = set()
+
+
+def _generacion(etiquetas: Tuple[str, ...]) -> Tuple[int, ...]:
+    return tuple(_generaciones.get(e, 0) for e in etiquetas)
+
+
+def invalidar(*etiquetas: str) -> None:
+    """Descarta las entradas que dependen de alguna de las etiquetas."""
+    for etiqueta in etiquetas:
+        _generaciones[etiqueta] = _generaciones.get(etiqueta, 0) + 1
+    afectadas = [clave for clave, entrada in _entradas.items()
+                 if any(e in entrada.etiquetas for e in etiquetas)]
+    for clave in afectadas:
+        del _entradas[clave]
+    if afectadas:
+        logger.debug(f"Caché invalidada ({', '.join(etiquetas)}): {len(afectadas)} entradas")
+
+
+def limpiar() -> None:
+    _entradas.clear()
+
+
+def _serializar(valor: Any) -> bytes:
+    return json.dumps(
+        jsonable_encoder(valor), ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def _guardar(clave: tuple, entrada: _Entrada) -> None:
+    _entradas[clave] = entrada
+    _entradas.move_to_end(clave)
+    while len(_entradas) > MAX_ENTRADAS:
+        _entradas.popitem(last=False)
+
+
+async def _calcular(clave: tuple, calcular: Callable, ttl: float, etiquetas: Tuple[str, ...]) -> _Entrada:
+    """Un solo cálculo por clave; el resto de peticiones espera el mismo futuro."""
+    pendiente = _en_vuelo.get(clave)
+    if pendiente is not None:
+        return await asyncio.shield(pendiente)
+
+    futuro = asyncio.get_running_loop().create_future()
+    _en_vuelo[clave] = futuro
+    generacion = _generacion(etiquetas)
+    try:
+        entrada = _Entrada(_serializar(await calcular()), ttl, etiquetas)
+        if _generacion(etiquetas) == generacion:
+            _guardar(clave, entrada)
+        futuro.set_result(entrada)
+        return entrada
+    except BaseException as e:
+        futuro.set_exception(e)
+        # Evita el aviso "exception was never retrieved" si nadie más esperaba
+        futuro.exception()
+        raise
+    finally:
+        _en_vuelo.pop(clave, None)
+
+
+async def _revalidar(clave: tuple, calcular: Callable, ttl: float, etiquetas: Tuple[str, ...]) -> None:
+    try:
+        await _calcular(clave, calcular, ttl, etiquetas)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo revalidar {clave[0]}: {e}")
+
+
+def _respuesta(request: Request, entrada: _Entrada, estado_cache: str) -> Response:
+    headers = {
+        "ETag": entrada.etag,
+        "Cache-Control": "private, no-cache",
+        "X-Cache": estado_cache,
+    }
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and entrada.etag in [v.strip() for v in if_none_match.split(',')]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entrada.contenido, media_type="application/json", headers=headers)
+
+
+def preparar(valor: Any) -> _Entrada:
+    """Serializa `valor` con su ETag, para servicios que guardan sus propias vistas."""
+    return _Entrada(_serializar(valor), 0, ())
+
+
+def responder(request: Request, entrada: _Entrada, estado_cache: str = 'BYPASS') -> Response:
+    """Respuesta con ETag (304 si coincide con If-None-Match) de una entrada de preparar()."""
+    return _respuesta(request, entrada, estado_cache)
+
+
+def cache_respuesta(
+    ttl: float,
+    etiquetas: Sequence[str] = (),
+    por_usuario: bool = False,
+    omitir: Optional[Callable[[Dict[str, Any]], bool]] = None,
+):
+    """
+    Decorador para endpoints GET que devuelven JSON.
+
+    El endpoint debe declarar los parámetros `request: Request` y
+    `current_user`. Las HTTPException se propagan sin cachearse.
+
+    Args:
+        ttl: Segundos que la respuesta se considera fresca
+        etiquetas: Datos de los que depende (ver ETIQUETAS) para invalidar()
+        por_usuario: Clave por id de usuario en vez de por rol
+        omitir: Recibe los kwargs del endpoint; si devuelve True se calcula
+            sin caché (la respuesta igual lleva ETag)
+    """
+    etiquetas = tuple(etiquetas)
+
+    def decorador(func):
+        @functools.wraps(func)
+        async def envoltura(*args, **kwargs):
+            request: Request = kwargs['request']
+            usuario = kwargs['current_user']
+            calcular = functools.partial(func, *args, **kwargs)
+
+            if omitir is not None and omitir(kwargs):
+                return _respuesta(request, _Entrada(_serializar(await calcular()), ttl, etiquetas), 'BYPASS')
+
+            clave = (
+                request.url.path,
+                f"u:{usuario['id']}" if por_usuario else f"r:{usuario['rol']}",
+                tuple(sorted(request.query_params.multi_items())),
+            )
+            entrada = _entradas.get(clave)
+            if entrada is not None:
+                edad = entrada.edad()
+                if edad < entrada.ttl:
+                    return _respuesta(request, entrada, 'HIT')
+                if edad < 2 * entrada.ttl:
+                    if clave not in _en_vuelo:
+                        tarea = asyncio.create_task(_revalidar(clave, calcular, ttl, etiquetas))
+                        _revalidaciones.add(tarea)
+                        tarea.add_done_callback(_revalidaciones.discard)
+                    return _respuesta(request, entrada, 'STALE')
+
+            entrada = await _calcular(clave, calcular, ttl, etiquetas)
+            return _respuesta(request, entrada, 'MISS')
+
+        return envoltura
+
+    return decorador
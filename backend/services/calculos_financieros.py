@@ -383,6 +383,73 @@ async def calcular_deuda_vencida(
     return total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
 
+async def consultar_deudores(
+    conn,
+    periodo_id: Optional[int],
+    fecha_inicio_actual: date
+) -> List[Any]:
+    """
+    Deuda y estado de mora de todos los estudiantes con inscripciones sin
+    pagar, en una sola consulta (ordenados por deuda, mayor primero).
+    
+    Reglas (las de calcular_en_mora):
+    - convenio activo: en mora solo si la fecha límite ya pasó
+    - inscripción impaga de un período que terminó antes del actual
+    - inscripción impaga del período actual pasados los días de gracia de
+      la carrera (10 si no están definidos, como en el contexto de IA)
+    
+    Args:
+        conn: Conexión a base de datos
+        periodo_id: Período activo (None si no hay)
+        fecha_inicio_actual: Inicio del período activo (hoy si no hay)
+    
+    Returns:
+        Filas con id, nombre, cedula, convenio_activo, carrera,
+        insc_pendientes, deuda_calculada y en_mora
+    """
+    return await conn.fetch(
+        """
+        SELECT
+            u.id,
+            u.first_name || ' ' || u.last_name AS nombre,
+            u.cedula,
+            u.convenio_activo,
+            c.nombre AS carrera,
+            COUNT(i.id) AS insc_pendientes,
+            SUM(
+                m.creditos * c.precio_credito *
+                (1 - COALESCE(u.porcentaje_beca, 0) / 100.0)
+            ) AS deuda_calculada,
+            CASE
+                WHEN u.convenio_activo THEN
+                    COALESCE(u.fecha_limite_convenio::date < $1, false)
+                ELSE COALESCE(bool_or(
+                    pl.fecha_fin < $2
+                    OR (
+                        s.periodo_id = $3
+                        AND i.fecha_inscripcion < $4::timestamp - make_interval(
+                            days => COALESCE(NULLIF(c.dias_gracia_pago, 0), 10)
+                        )
+                    )
+                ), false)
+            END AS en_mora
+        FROM public.usuarios u
+        JOIN public.inscripciones i ON i.estudiante_id = u.id AND i.pago_id IS NULL
+        JOIN public.secciones s ON i.seccion_id = s.id
+        JOIN public.materias m ON s.materia_id = m.id
+        JOIN public.carreras c ON u.carrera_id = c.id
+        LEFT JOIN public.periodos_lectivos pl ON s.periodo_id = pl.id
+        WHERE u.rol = 'estudiante'
+        GROUP BY u.id, c.nombre
+        ORDER BY deuda_calculada DESC
+        """,
+        date.today(),
+        fecha_inicio_actual,
+        periodo_id,
+        datetime.now(),
+    )
+
+
 def calcular_costo_materia(
     creditos: int,
     precio_credito: Decimal,
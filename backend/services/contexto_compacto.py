@@ -0,0 +1,146 @@
+"""
+Compactación del contexto de IA antes de meterlo en el system prompt.
+
+El contexto de /ia/contexto crece con la historia del usuario (historial de
+notas, secciones de todos los períodos, evaluaciones...). Para el prompt:
+- se serializa JSON compacto, sin indentación ni campos vacíos;
+- cada lista larga tiene un presupuesto de tokens: se conservan los
+  elementos más recientes (las consultas ya vienen ordenadas así) y el
+  resto se reemplaza por un resumen con totales;
+- si el total supera IA_CONTEXTO_MAX_TOKENS, los presupuestos se reducen a
+  la mitad hasta que entre.
+
+Los tokens se estiman (~4 caracteres por token): no hay tokenizer del
+modelo disponible y basta para presupuestar y medir.
+
+medir_prompt() registra en el log los tokens de cada prompt (system +
+historial + mensaje) por rol, junto al tamaño del contexto sin compactar.
+"""
+import json
+import logging
+import math
+from typing import Any, Dict, List, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CARACTERES_POR_TOKEN = 4
+
+# Presupuesto de tokens por lista del contexto
+PRESUPUESTOS = {
+    "historial_notas": 350,
+    "materias_activas": 450,
+    "evaluaciones_por_materia": 350,
+    "secciones": 500,
+    "ultimos_pagos": 150,
+    "listado": 400,  # mora.listado (tesorero)
+    "estudiantes_por_carrera": 250,
+    "ingresos_por_periodo": 200,
+}
+
+def serializar(valor: Any) -> str:
+    return json.dumps(valor, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+def estimar_tokens(texto: str) -> int:
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+def _sin_vacios(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        return {
+            k: _sin_vacios(v)
+            for k, v in valor.items()
+            if v is not None and v != "" and v != [] and v != {}
+        }
+    if isinstance(valor, list):
+        return [_sin_vacios(v) for v in valor]
+    return valor
+
+
+def _recortar(items: List[Any], presupuesto: int) -> Tuple[List[Any], int]:
+    """Primeros elementos que entran en el presupuesto (al menos uno)."""
+    usados = 0
+    for i, item in enumerate(items):
+        usados += estimar_tokens(serializar(item))
+        if usados > presupuesto and i > 0:
+            return items[:i], len(items) - i
+    return items, 0
+
+
+def _resumen_notas(notas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    valores = [n["nota_final"] for n in notas if n.get("nota_final") is not None]
+    return {
+        "total": len(notas),
+        "aprobadas": sum(1 for n in notas if n.get("estado") == "aprobado"),
+        "reprobadas": sum(1 for n in notas if n.get("estado") == "reprobado"),
+        "promedio": round(sum(valores) / len(valores), 2) if valores else None,
+    }
+
+
+def _compactar_lista(clave: str, items: List[Any], factor: float) -> Any:
+    presupuesto = int(PRESUPUESTOS[clave] * factor)
+    conservados, omitidos = _recortar(items, presupuesto)
+    if not omitidos:
+        return items
+    if clave == "historial_notas":
+        return {
+            "resumen": _resumen_notas(items),
+            "recientes": conservados,
+            "omitidas": omitidos,
+        }
+    if clave == "secciones":
+        resto = items[len(conservados):]
+        return {
+            "recientes": conservados,
+            "anteriores": {
+                "total": len(resto),
+                "inscritos": sum(s.get("inscritos") or 0 for s in resto),
+                "aprobados": sum(s.get("aprobados") or 0 for s in resto),
+                "reprobados": sum(s.get("reprobados") or 0 for s in resto),
+            },
+        }
+    return {"recientes": conservados, "omitidos": omitidos}
+
+
+def _compactar_nodo(valor: Any, factor: float) -> Any:
+    if isinstance(valor, dict):
+        resultado = {}
+        for k, v in valor.items():
+            if k == "evaluaciones_por_materia" and isinstance(v, dict):
+                # Las materias con más evaluaciones quedan al final
+                materias = sorted(v.items(), key=lambda kv: len(kv[1]))
+                conservadas, omitidas = _recortar(
+                    materias, int(PRESUPUESTOS[k] * factor)
+                )
+                resultado[k] = dict(conservadas)
+                if omitidas:
+                    resultado[k]["_materias_omitidas"] = omitidas
+            elif k in PRESUPUESTOS and isinstance(v, list):
+                resultado[k] = _compactar_lista(k, v, factor)
+            else:
+                resultado[k] = _compactar_nodo(v, factor)
+        return resultado
+    return valor
+
+
+def compactar(contexto: Dict[str, Any]) -> str:
+    """Contexto serializado para el prompt, dentro de IA_CONTEXTO_MAX_TOKENS."""
+    base = _sin_vacios(contexto)
+    factor = 1.0
+    texto = serializar(_compactar_nodo(base, factor))
+    while estimar_tokens(texto) > settings.IA_CONTEXTO_MAX_TOKENS and factor > 0.1:
+        factor /= 2
+        texto = serializar(_compactar_nodo(base, factor))
+    return texto
+
+
+def medir_prompt(rol: str, mensajes: List[Dict[str, Any]], tokens_contexto_original: int) -> int:
+    tokens = sum(estimar_tokens(m.get("content") or "") for m in mensajes)
+    logger.info(
+        f"📏 Prompt IA rol={rol} tokens≈{tokens} "
+        f"(contexto sin compactar ≈{tokens_contexto_original})"
+    )
+    return tokens
+
@@ -0,0 +1,268 @@
+"""
+Elegibilidad de inscripción: qué secciones abiertas puede tomar cada
+estudiante.
+
+Una sección es elegible para un estudiante si:
+- su materia es de la carrera del estudiante,
+- tiene cupo,
+- el estudiante no aprobó ya esa materia ni la está cursando en el período,
+- aprobó todos los prerrequisitos directos de la materia.
+
+Se resuelve en una pasada para un estudiante o una cohorte completa:
+tres consultas (estudiantes, materias aprobadas/en curso agregadas por
+estudiante, secciones del período) y el grafo de malla en memoria
+(services/malla_curricular.py). Cada conjunto de materias es un entero
+con un bit por materia, así "tiene todos los prerrequisitos" es
+`requisitos & ~aprobadas == 0`, sin bucles por materia.
+
+    resultado = await calcular(conn, periodo_id, carrera_id=3)
+    await validar_inscripcion(conn, estudiante_id, seccion_id)  # 400 si no procede
+
+Medición con cohortes sintéticas: python -m benchmarks.elegibilidad_benchmark
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from services import malla_curricular
+from services.malla_curricular import GrafoMalla
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Seccion:
+    id: int
+    codigo: str
+    materia_id: int
+    materia: str
+    carrera_id: Optional[int]
+    cupo_disponible: int
+
+
+@dataclass
+class Estudiante:
+    id: int
+    carrera_id: int
+    aprobadas: Tuple[int, ...] = ()
+    cursando: Tuple[int, ...] = ()
+
+
+@dataclass
+class Resultado:
+    # estudiante_id -> secciones elegibles
+    elegibles: Dict[int, List[int]] = field(default_factory=dict)
+    # estudiante_id -> [(seccion_id, motivo, prerrequisitos faltantes)]
+    bloqueadas: Dict[int, List[Tuple[int, str, List[int]]]] = field(default_factory=dict)
+
+
+def evaluar(
+    estudiantes: Iterable[Estudiante],
+    secciones: Iterable[Seccion],
+    grafos: Dict[int, GrafoMalla],
+    con_motivos: bool = False,
+) -> Resultado:
+    """
+    Pasada en memoria sobre estudiantes × secciones de su carrera.
+
+    Con `con_motivos` se devuelve también por qué cada sección no es
+    elegible (para la vista de un solo estudiante).
+    """
+    por_carrera: Dict[int, List[Tuple[Seccion, int, int]]] = {}
+    for s in secciones:
+        grafo = grafos.get(s.carrera_id)
+        if grafo is None or s.materia_id not in grafo.bits:
+            continue
+        por_carrera.setdefault(s.carrera_id, []).append(
+            (s, grafo.bits[s.materia_id], grafo.mascara_directos.get(s.materia_id, 0))
+        )
+
+    resultado = Resultado()
+    for e in estudiantes:
+        grafo = grafos.get(e.carrera_id)
+        candidatas = por_carrera.get(e.carrera_id, [])
+        if grafo is None:
+            resultado.elegibles[e.id] = []
+            continue
+        aprobadas = grafo.mascara(e.aprobadas)
+        ocupadas = aprobadas | grafo.mascara(e.cursando)
+        elegibles = []
+        bloqueadas = []
+        for s, bit, requisitos in candidatas:
+            faltan = requisitos & ~aprobadas
+            if not (bit & ocupadas) and not faltan and s.cupo_disponible > 0:
+                elegibles.append(s.id)
+            elif con_motivos:
+                if bit & aprobadas:
+                    bloqueadas.append((s.id, "aprobada", []))
+                elif bit & ocupadas:
+                    bloqueadas.append((s.id, "cursando", []))
+                elif faltan:
+                    bloqueadas.append((s.id, "prerrequisitos", sorted(grafo.faltantes(s.materia_id, e.aprobadas))))
+                else:
+                    bloqueadas.append((s.id, "sin_cupo", []))
+        resultado.elegibles[e.id] = elegibles
+        if con_motivos:
+            resultado.bloqueadas[e.id] = bloqueadas
+    return resultado
+
+
+async def _estudiantes(
+    conn,
+    periodo_id: int,
+    estudiante_id: Optional[int],
+    carrera_id: Optional[int],
+    semestre: Optional[int],
+) -> List[Estudiante]:
+    filtros = ["u.rol = 'estudiante'", "u.activo = true", "u.carrera_id IS NOT NULL"]
+    params: list = [periodo_id]
+    for condicion, valor in (("u.id", estudiante_id), ("u.carrera_id", carrera_id), ("u.semestre_actual", semestre)):
+        if valor:
+            params.append(valor)
+            filtros.append(f"{condicion} = ${len(params)}")
+
+    rows = await conn.fetch(f"""
+        SELECT
+            u.id, u.carrera_id,
+            COALESCE(h.aprobadas, '{{}}') AS aprobadas,
+            COALESCE(h.cursando,  '{{}}') AS cursando
+        FROM public.usuarios u
+        LEFT JOIN LATERAL (
+            SELECT
+                array_agg(DISTINCT s.materia_id) FILTER (WHERE i.estado = 'aprobado') AS aprobadas,
+                array_agg(DISTINCT s.materia_id) FILTER (
+                    WHERE i.estado = 'activo' AND s.periodo_id = $1
+                ) AS cursando
+            FROM public.inscripciones i
+            JOIN public.secciones s ON s.id = i.seccion_id
+            WHERE i.estudiante_id = u.id
+        ) h ON true
+        WHERE {' AND '.join(filtros)}
+        ORDER BY u.id
+    """, *params)
+    return [Estudiante(r['id'], r['carrera_id'], tuple(r['aprobadas']), tuple(r['cursando'])) for r in rows]
+
+
+async def _secciones(conn, periodo_id: int, carrera_ids: List[int]) -> List[Seccion]:
+    rows = await conn.fetch("""
+        SELECT s.id, s.codigo, s.materia_id, m.nombre AS materia, m.carrera_id,
+               GREATEST(s.cupo_maximo - COALESCE(s.cupo_actual, 0), 0) AS cupo_disponible
+        FROM public.secciones s
+        JOIN public.materias m ON m.id = s.materia_id
+        WHERE s.periodo_id = $1 AND m.carrera_id = ANY($2::int[])
+        ORDER BY m.semestre, m.nombre, s.codigo
+    """, periodo_id, carrera_ids)
+    return [
+        Seccion(r['id'], r['codigo'], r['materia_id'], r['materia'], r['carrera_id'], r['cupo_disponible'])
+        for r in rows
+    ]
+
+
+async def calcular(
+    conn,
+    periodo_id: int,
+    estudiante_id: Optional[int] = None,
+    carrera_id: Optional[int] = None,
+    semestre: Optional[int] = None,
+) -> Tuple[List[Estudiante], List[Seccion], Resultado]:
+    """Elegibilidad de un estudiante o de la cohorte filtrada, en el período dado."""
+    estudiantes = await _estudiantes(conn, periodo_id, estudiante_id, carrera_id, semestre)
+    carrera_ids = sorted({e.carrera_id for e in estudiantes})
+    grafos = {}
+    for c in carrera_ids:
+        grafo = await malla_curricular.obtener(conn, c)
+        if grafo is not None:
+            grafos[c] = grafo
+    secciones = await _secciones(conn, periodo_id, carrera_ids) if carrera_ids else []
+    return estudiantes, secciones, evaluar(estudiantes, secciones, grafos, con_motivos=estudiante_id is not None)
+
+
+async def validar_inscripcion(conn, estudiante_id: int, seccion_id: int) -> None:
+    """
+    Paso de validación de una inscripción individual: rechaza con 400 si
+    el estudiante ya aprobó la materia, ya la cursa en el período de la
+    sección o le faltan prerrequisitos directos (según la malla de la
+    carrera de la materia, que puede ser otra que la del estudiante).
+    """
+    seccion = await conn.fetchrow("""
+        SELECT s.materia_id, s.periodo_id, m.carrera_id, m.codigo
+        FROM public.secciones s
+        JOIN public.materias m ON m.id = s.materia_id
+        WHERE s.id = $1
+    """, seccion_id)
+    if not seccion or seccion['carrera_id'] is None:
+        return
+    historial = await conn.fetchrow("""
+        SELECT
+            COALESCE(array_agg(DISTINCT s.materia_id) FILTER (WHERE i.estado = 'aprobado'), '{}') AS aprobadas,
+            bool_or(i.estado = 'activo' AND s.periodo_id = $2 AND s.materia_id = $3) AS cursando
+        FROM public.inscripciones i
+        JOIN public.secciones s ON s.id = i.seccion_id
+        WHERE i.estudiante_id = $1
+    """, estudiante_id, seccion['periodo_id'], seccion['materia_id'])
+    aprobadas = set(historial['aprobadas'])
+    if seccion['materia_id'] in aprobadas:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El estudiante ya aprobó {seccion['codigo']}",
+        )
+    if historial['cursando']:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El estudiante ya cursa {seccion['codigo']} en este período",
+        )
+
+    grafo = await malla_curricular.obtener(conn, seccion['carrera_id'])
+    if grafo is None:
+        return
+    faltantes = grafo.faltantes(seccion['materia_id'], aprobadas)
+    if faltantes:
+        materias = (grafo.materias.get(m) or grafo.externas.get(m) for m in faltantes)
+        codigos = sorted(m.codigo for m in materias if m)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Prerrequisitos pendientes para {seccion['codigo']}: {', '.join(codigos)}",
+        )
+
+
+def respuesta(
+    estudiantes: List[Estudiante],
+    secciones: List[Seccion],
+    resultado: Resultado,
+    periodo_id: int,
+    individual: bool,
+) -> Dict[str, Any]:
+    """Cuerpo de /academico/elegibilidad."""
+    por_id = {s.id: s for s in secciones}
+
+    def detalle(s: Seccion) -> Dict[str, Any]:
+        return {
+            "seccion_id": s.id, "codigo": s.codigo, "materia_id": s.materia_id,
+            "materia": s.materia, "cupo_disponible": s.cupo_disponible,
+        }
+
+    if individual:
+        e = estudiantes[0]
+        return {
+            "periodo_id": periodo_id,
+            "estudiante_id": e.id,
+            "secciones": [detalle(por_id[s]) for s in resultado.elegibles[e.id]],
+            "bloqueadas": [
+                {**detalle(por_id[s]), "motivo": motivo, "prerrequisitos_faltantes": faltantes}
+                for s, motivo, faltantes in resultado.bloqueadas.get(e.id, [])
+            ],
+        }
+
+    usadas = {s for ids in resultado.elegibles.values() for s in ids}
+    return {
+        "periodo_id": periodo_id,
+        "total_estudiantes": len(estudiantes),
+        "estudiantes": [
+            {"estudiante_id": e.id, "secciones": resultado.elegibles.get(e.id, [])}
+            for e in estudiantes
+        ],
+        # Detalle de cada sección una sola vez
+        "secciones": [detalle(s) for s in secciones if s.id in usadas],
+    }
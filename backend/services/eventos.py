@@ -0,0 +1,178 @@
+"""
+Eventos en vivo del dashboard (Postgres LISTEN/NOTIFY → SSE).
+
+Los endpoints de escritura llaman publicar(conn, 'pago', ...) dentro de su
+transacción: pg_notify solo se entrega si la transacción confirma. Cada
+worker mantiene UNA conexión dedicada con LISTEN y reparte cada evento a
+las colas de sus suscriptores SSE (routers/stream.py), filtrando por rol.
+
+Además, cada evento recibido invalida la caché de respuestas del worker
+(services/cache_respuestas.py), así los demás workers dejan de servir
+datos viejos sin esperar al TTL.
+
+LISTEN no funciona a través de pgbouncer en modo transacción: si
+DATABASE_URL apunta a un pooler así, configurar DATABASE_LISTEN_URL con la
+conexión directa o en modo sesión.
+
+Tipos de evento y datos:
+    pago          estudiante_id, pagos, monto, estado
+    nota          inscripcion_id, estudiante_id, seccion_id, docente_id, nota_final, estado
+    inscripcion   inscripcion_id, estudiante_id, seccion_id, pago_id, monto
+    ciclo_cerrado periodo_id, aprobados, reprobados
+    usuario       estudiante_id (beca, convenio o datos del perfil)
+    configuracion clave (solo interno: no se envía a los clientes SSE)
+    malla         tabla (solo interno; lo emiten triggers de materias,
+                  prerequisitos y carreras, migrations/007_malla_eventos.sql)
+    seccion       seccion_id, periodo_id, docente_id (solo interno: alta o
+                  edición de una sección)
+    resync        (local) el cliente pudo perder eventos y debe recargar
+
+Cada evento invalida también el contexto de IA cacheado de los usuarios
+que menciona (services/cache_contexto_ia.py); 'configuracion' descarta
+además el índice de políticas (services/politicas_ia.py); 'malla', los
+grafos de malla curricular (services/malla_curricular.py) y las grillas de
+horarios; 'seccion' e 'inscripcion' marcan su sección para que la grilla
+del período la relea (services/grilla_horarios.py).
+"""
+import asyncio
+import itertools
+import json
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+
+import asyncpg
+
+from config import settings
+from services import cache_contexto_ia, cache_respuestas, grilla_horarios, malla_curricular, politicas_ia
+
+logger = logging.getLogger(__name__)
+
+CANAL = "infocampus_eventos"
+
+# Etiquetas de caché que invalida cada tipo de evento
+ETIQUETAS_POR_TIPO = {
+    'pago': ('pagos',),
+    'nota': ('notas',),
+    'inscripcion': ('inscripciones', 'pagos'),
+    'ciclo_cerrado': ('inscripciones', 'notas', 'usuarios'),
+    'usuario': ('usuarios', 'pagos'),
+}
+
+# Eventos que solo sirven para invalidar cachés entre workers
+TIPOS_INTERNOS = {'configuracion', 'malla', 'seccion'}
+
+MAX_EVENTOS_EN_COLA = 100
+INTERVALO_PING_SEGUNDOS = 30
+
+_suscriptores: Set[asyncio.Queue] = set()
+_secuencia = itertools.count(1)
+_tarea: Optional[asyncio.Task] = None
+
+
+async def publicar(conn, tipo: str, **datos: Any) -> None:
+    """Encola el evento en la transacción de `conn`; se emite al confirmar."""
+    payload = json.dumps({'tipo': tipo, 'datos': datos}, default=str)
+    await conn.execute("SELECT pg_notify($1, $2)", CANAL, payload)
+
+
+def _difundir(evento: Dict[str, Any]) -> None:
+    evento['id'] = next(_secuencia)
+    for cola in list(_suscriptores):
+        try:
+            cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            # Cliente lento: se descarta lo pendiente y se le pide recargar
+            while not cola.empty():
+                cola.get_nowait()
+            cola.put_nowait({'tipo': 'resync', 'datos': {}, 'id': evento['id']})
+
+
+def _al_notificar(conexion, pid, canal, payload: str) -> None:
+    try:
+        evento = json.loads(payload)
+    except ValueError:
+        logger.warning(f"⚠️ Evento con payload inválido en {canal}")
+        return
+    tipo = evento.get('tipo')
+    etiquetas = ETIQUETAS_POR_TIPO.get(tipo)
+    if etiquetas:
+        cache_respuestas.invalidar(*etiquetas)
+    if tipo == 'configuracion':
+        cache_contexto_ia.invalidar_todo()
+        politicas_ia.invalidar()
+    elif tipo == 'malla':
+        malla_curricular.invalidar()
+        grilla_horarios.invalidar()
+    else:
+        datos = evento.get('datos') or {}
+        cache_contexto_ia.invalidar_evento(datos)
+        if tipo in ('seccion', 'inscripcion'):
+            grilla_horarios.marcar(datos.get('seccion_id'))
+    if tipo not in TIPOS_INTERNOS:
+        _difundir(evento)
+
+
+@contextmanager
+def suscribir() -> Iterator[asyncio.Queue]:
+    cola: asyncio.Queue = asyncio.Queue(maxsize=MAX_EVENTOS_EN_COLA)
+    _suscriptores.add(cola)
+    try:
+        yield cola
+    finally:
+        _suscriptores.discard(cola)
+
+
+def total_suscriptores() -> int:
+    return len(_suscriptores)
+
+
+async def _escuchar() -> None:
+    dsn = settings.DATABASE_LISTEN_URL or settings.DATABASE_URL
+    espera = 1
+    reconexion = False
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn=dsn, statement_cache_size=0, timeout=10)
+            await conn.add_listener(CANAL, _al_notificar)
+            logger.info(f"✅ LISTEN {CANAL} activo")
+            espera = 1
+            if reconexion:
+                # Los eventos emitidos mientras no escuchábamos se perdieron
+                cache_respuestas.limpiar()
+                cache_contexto_ia.invalidar_todo()
+                politicas_ia.invalidar()
+                malla_curricular.invalidar()
+                grilla_horarios.invalidar()
+                _difundir({'tipo': 'resync', 'datos': {}})
+            reconexion = True
+            while True:
+                await asyncio.sleep(INTERVALO_PING_SEGUNDOS)
+                await conn.fetchval("SELECT 1", timeout=10)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Conexión LISTEN caída ({e}); reintento en {espera}s")
+        finally:
+            if conn is not None and not conn.is_closed():
+                try:
+                    await conn.close(timeout=5)
+                except Exception:
+                    conn.terminate()
+        await asyncio.sleep(espera)
+        espera = min(espera * 2, 30)
+
+
+def iniciar() -> None:
+    global _tarea
+    if _tarea is None:
+        _tarea = asyncio.create_task(_escuchar(), name="eventos:listen")
+
+
+async def detener() -> None:
+    global _tarea
+    if _tarea is not None:
+        _tarea.cancel()
+        await asyncio.gather(_tarea, return_exceptions=True)
+        _tarea = None
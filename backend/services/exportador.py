@@ -0,0 +1,157 @@
+"""
+Exportaciones tabulares (CSV / XLSX) en streaming.
+
+Las filas salen de un cursor asyncpg dentro de una transacción de solo
+lectura (get_db_readonly) y se escriben por trozos: ningún export
+materializa el resultado completo en memoria.
+
+- CSV: se envía al cliente a medida que se leen las filas (UTF-8 con BOM
+  para que Excel respete las tildes).
+- XLSX: xlsxwriter en modo constant_memory sobre un archivo temporal; el
+  formato exige cerrar el libro antes de enviarlo, así que el archivo se
+  transmite por bloques al terminar y luego se borra.
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import tempfile
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, List, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from database import get_db_readonly
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_EXPORTACION = ('csv', 'xlsx')
+
+# Filas por prefetch del cursor y por trozo enviado
+FILAS_POR_TROZO = 500
+
+# Límite de filas de una hoja de Excel (incluye la cabecera)
+MAX_FILAS_XLSX = 1_048_576
+
+# (encabezado, función que extrae el valor de la fila)
+Columna = Tuple[str, Callable[[Any], Any]]
+
+
+def _valor_csv(valor: Any) -> Any:
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return 'sí' if valor else 'no'
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+async def _filas(sql: str, params: Sequence[Any]) -> AsyncIterator[Any]:
+    async with get_db_readonly() as conn:
+        async for row in conn.cursor(sql, *params, prefetch=FILAS_POR_TROZO):
+            yield row
+
+
+async def _generar_csv(sql: str, params: Sequence[Any], columnas: List[Columna]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow([encabezado for encabezado, _ in columnas])
+
+    total = 0
+    async for row in _filas(sql, params):
+        writer.writerow([_valor_csv(extraer(row)) for _, extraer in columnas])
+        total += 1
+        if total % FILAS_POR_TROZO == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    yield buffer.getvalue().encode('utf-8')
+    logger.info(f"📤 Exportación CSV completada ({total} filas)")
+
+
+async def _generar_xlsx(
+    sql: str,
+    params: Sequence[Any],
+    columnas: List[Columna],
+    hoja: str,
+) -> AsyncIterator[bytes]:
+    import xlsxwriter
+
+    fd, ruta = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        libro = xlsxwriter.Workbook(ruta, {
+            'constant_memory': True,
+            'remove_timezone': True,
+            'default_date_format': 'yyyy-mm-dd',
+        })
+        negrita = libro.add_format({'bold': True})
+        hoja_xlsx = libro.add_worksheet(hoja[:31])
+        hoja_xlsx.write_row(0, 0, [encabezado for encabezado, _ in columnas], negrita)
+
+        fila = 1
+        async for row in _filas(sql, params):
+            if fila >= MAX_FILAS_XLSX:
+                logger.warning(f"⚠️ Exportación XLSX truncada en {MAX_FILAS_XLSX - 1} filas (límite de Excel)")
+                break
+            hoja_xlsx.write_row(fila, 0, [extraer(row) for _, extraer in columnas])
+            fila += 1
+
+        await asyncio.to_thread(libro.close)
+        logger.info(f"📤 Exportación XLSX completada ({fila - 1} filas)")
+
+        with open(ruta, 'rb') as f:
+            while True:
+                bloque = await asyncio.to_thread(f.read, 64 * 1024)
+                if not bloque:
+                    break
+                yield bloque
+    finally:
+        try:
+            os.unlink(ruta)
+        except OSError:
+            pass
+
+
+def respuesta_exportacion(
+    sql: str,
+    params: Sequence[Any],
+    columnas: List[Columna],
+    formato: str,
+    nombre: str,
+) -> StreamingResponse:
+    """
+    Construye la StreamingResponse de una exportación.
+
+    Args:
+        sql: Consulta con placeholders $1, $2... (debe incluir ORDER BY)
+        params: Parámetros de la consulta
+        columnas: Lista de (encabezado, extractor) en el orden de salida
+        formato: 'csv' o 'xlsx'
+        nombre: Base del nombre de archivo (y de la hoja en XLSX)
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"formato debe ser uno de: {', '.join(FORMATOS_EXPORTACION)}"
+        )
+
+    nombre_archivo = f"{nombre}_{datetime.now().strftime('%Y%m%d_%H%M')}.{formato}"
+    if formato == 'csv':
+        contenido = _generar_csv(sql, params, columnas)
+        media_type = "text/csv; charset=utf-8"
+    else:
+        contenido = _generar_xlsx(sql, params, columnas, nombre)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={nombre_archivo}"}
+    )
+
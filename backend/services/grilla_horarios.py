@@ -0,0 +1,427 @@
+"""
+Grilla de horarios del período en memoria, con índice de ocupación de aulas.
+
+Por período se arma una vez (una consulta) la foto de sus secciones con el
+horario ya normalizado (services/horarios.py) y se indexa:
+- por aula, docente y carrera: secciones de cada recurso
+- por celda (día, franja de FRANJA_MINUTOS): secciones que la ocupan
+
+Con eso se sirven sin SQL /academico/horarios, la grilla por recurso, la
+ocupación de aulas y el horario semanal de cada estudiante. Cada vista se
+serializa una sola vez con su ETag (services/cache_respuestas.py) hasta el
+próximo cambio de la grilla.
+
+Actualización incremental: los eventos 'seccion' (alta o edición) e
+'inscripcion' (cambia cupo_actual) marcan la sección como pendiente
+(services/eventos.py); el siguiente obtener() relee solo esas filas y las
+reubica en los índices. 'malla' (materias o carreras renombradas) y la
+reconexión de LISTEN descartan todo. HORARIOS_TTL_SEGUNDOS acota lo que no
+avisa un evento (nombres de docentes o de períodos).
+
+    grilla = await grilla_horarios.obtener(conn, periodo_id)
+    entrada, estado = grilla.vista(('ocupacion',), grilla.ocupacion)
+
+obtener() debe recibir una conexión READ COMMITTED (get_db): dentro de una
+transacción REPEATABLE READ la relectura de pendientes podría no ver el
+cambio que los marcó.
+"""
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import settings
+from services import cache_respuestas
+from services.horarios import DIAS, MINUTOS_DIA, Intervalo, clave_aula, intervalos
+
+logger = logging.getLogger(__name__)
+
+FRANJA_MINUTOS = 30
+# Ventana hábil para el porcentaje de ocupación: lunes a sábado, 07:00–22:00
+DIAS_HABILES = 6
+VENTANA_DESDE = 7 * 60
+VENTANA_HASTA = 22 * 60
+FRANJAS_PICO = 5
+
+Celda = Tuple[int, int]
+
+
+def _hora(minutos: int) -> str:
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+@dataclass
+class SeccionGrilla:
+    id: int
+    codigo: str
+    aula: Optional[str]
+    horario: Dict[str, Any]
+    materia: str
+    materia_codigo: str
+    carrera: Optional[str]
+    carrera_id: Optional[int]
+    periodo: str
+    periodo_id: int
+    docente_id: Optional[int]
+    profesor: Optional[str]
+    cupo_maximo: int
+    cupo_actual: int
+    intervalos: Tuple[Intervalo, ...] = ()
+
+    def celdas(self) -> Iterable[Celda]:
+        for inicio, fin in self.intervalos:
+            dia, desde = divmod(inicio, MINUTOS_DIA)
+            hasta = fin - dia * MINUTOS_DIA
+            for franja in range(desde // FRANJA_MINUTOS, (hasta - 1) // FRANJA_MINUTOS + 1):
+                yield dia, franja
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Forma de cada sección en /academico/horarios."""
+        return {
+            "seccion_id": self.id,
+            "seccion_codigo": self.codigo,
+            "aula": self.aula,
+            "horario": self.horario,
+            "materia": self.materia,
+            "materia_codigo": self.materia_codigo,
+            "carrera": self.carrera,
+            "carrera_id": self.carrera_id,
+            "periodo": self.periodo,
+            "periodo_id": self.periodo_id,
+            "profesor": self.profesor,
+            "cupo_maximo": self.cupo_maximo,
+            "cupo_actual": self.cupo_actual,
+        }
+
+
+def _parse_horario(horario_raw) -> Dict[str, Any]:
+    datos = horario_raw or {}
+    if isinstance(datos, str):
+        try:
+            datos = json.loads(datos)
+        except ValueError:
+            datos = {}
+    return datos if isinstance(datos, dict) else {}
+
+
+def _seccion(fila) -> SeccionGrilla:
+    horario = _parse_horario(fila['horario'])
+    return SeccionGrilla(
+        id=fila['seccion_id'], codigo=fila['seccion_codigo'], aula=fila['aula'], horario=horario,
+        materia=fila['materia'], materia_codigo=fila['materia_codigo'],
+        carrera=fila['carrera'], carrera_id=fila['carrera_id'],
+        periodo=fila['periodo'], periodo_id=fila['periodo_id'],
+        docente_id=fila['docente_id'], profesor=fila['profesor'],
+        cupo_maximo=fila['cupo_maximo'], cupo_actual=fila['cupo_actual'] or 0,
+        intervalos=tuple(intervalos(horario)),
+    )
+
+
+class GrillaPeriodo:
+    """Secciones de un período con sus índices por recurso y por celda."""
+
+    def __init__(self, periodo_id: int, secciones: Iterable[SeccionGrilla] = ()):
+        self.periodo_id = periodo_id
+        self.creado = time.monotonic()
+        self.secciones: Dict[int, SeccionGrilla] = {}
+        self.por_aula: Dict[str, Set[int]] = {}
+        self.por_docente: Dict[int, Set[int]] = {}
+        self.por_carrera: Dict[int, Set[int]] = {}
+        self.celdas: Dict[Celda, Set[int]] = {}
+        # Vistas serializadas; se descartan con cada cambio
+        self._vistas: Dict[tuple, Any] = {}
+        for s in secciones:
+            self.aplicar(s)
+
+    def _indexar(self, s: SeccionGrilla, agregar: bool) -> None:
+        claves = (
+            (self.por_aula, clave_aula(s.aula)),
+            (self.por_docente, s.docente_id),
+            (self.por_carrera, s.carrera_id),
+        )
+        claves += tuple((self.celdas, celda) for celda in set(s.celdas()))
+        for indice, clave in claves:
+            if clave is None:
+                continue
+            if agregar:
+                indice.setdefault(clave, set()).add(s.id)
+            else:
+                ids = indice.get(clave)
+                if ids is not None:
+                    ids.discard(s.id)
+                    if not ids:
+                        del indice[clave]
+
+    def aplicar(self, s: SeccionGrilla) -> None:
+        """Agrega la sección o reemplaza su versión anterior."""
+        self.quitar(s.id)
+        self.secciones[s.id] = s
+        self._indexar(s, agregar=True)
+        self._vistas.clear()
+
+    def quitar(self, seccion_id: int) -> None:
+        anterior = self.secciones.pop(seccion_id, None)
+        if anterior is not None:
+            self._indexar(anterior, agregar=False)
+            self._vistas.clear()
+
+    def vista(self, clave: tuple, calcular: Callable[[], Any]):
+        """(entrada con ETag, 'HIT' | 'MISS') de una vista, calculada una vez por versión."""
+        entrada = self._vistas.get(clave)
+        if entrada is not None:
+            return entrada, 'HIT'
+        entrada = cache_respuestas.preparar(calcular())
+        self._vistas[clave] = entrada
+        return entrada, 'MISS'
+
+    def filtrar(
+        self,
+        carrera_id: Optional[int] = None,
+        aula: Optional[str] = None,
+        docente_id: Optional[int] = None,
+    ) -> List[SeccionGrilla]:
+        """Secciones que cumplen todos los filtros, por intersección de índices."""
+        ids: Optional[Set[int]] = None
+        for indice, clave in (
+            (self.por_carrera, carrera_id), (self.por_aula, clave_aula(aula)), (self.por_docente, docente_id),
+        ):
+            if clave is None:
+                continue
+            encontrados = indice.get(clave, set())
+            ids = set(encontrados) if ids is None else ids & encontrados
+        secciones = self.secciones.values() if ids is None else (self.secciones[i] for i in ids)
+        return list(secciones)
+
+    def listado(self, carrera_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Cuerpo de /academico/horarios para el período (secciones con carrera)."""
+        secciones = sorted(
+            (s for s in self.filtrar(carrera_id=carrera_id) if s.carrera_id is not None),
+            key=lambda s: (s.carrera, s.materia, s.codigo),
+        )
+        return [s.a_dict() for s in secciones]
+
+    def grilla(
+        self,
+        carrera_id: Optional[int] = None,
+        aula: Optional[str] = None,
+        docente_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Bloques por día listos para dibujar: cada bloque indica su primera
+        franja (índice en "franjas") y cuántas ocupa.
+        """
+        secciones = self.filtrar(carrera_id, aula, docente_id)
+        bloques = [(s, intervalo) for s in secciones for intervalo in s.intervalos]
+        desde = min([VENTANA_DESDE] + [i % MINUTOS_DIA for _, (i, _) in bloques])
+        hasta = max([VENTANA_HASTA] + [f - (i // MINUTOS_DIA) * MINUTOS_DIA for _, (i, f) in bloques])
+        desde -= desde % FRANJA_MINUTOS
+        hasta += -hasta % FRANJA_MINUTOS
+        primera = desde // FRANJA_MINUTOS
+
+        dias: Dict[str, List[Dict[str, Any]]] = {dia: [] for dia in DIAS[:DIAS_HABILES]}
+        for s, (inicio, fin) in sorted(bloques, key=lambda b: (b[1], b[0].codigo)):
+            dia, minuto_inicio = divmod(inicio, MINUTOS_DIA)
+            minuto_fin = fin - dia * MINUTOS_DIA
+            franja = minuto_inicio // FRANJA_MINUTOS
+            dias.setdefault(DIAS[dia], []).append({
+                "seccion_id": s.id,
+                "seccion_codigo": s.codigo,
+                "materia": s.materia,
+                "materia_codigo": s.materia_codigo,
+                "carrera_id": s.carrera_id,
+                "aula": s.aula,
+                "docente_id": s.docente_id,
+                "profesor": s.profesor,
+                "hora_inicio": _hora(minuto_inicio),
+                "hora_fin": _hora(minuto_fin),
+                "franja": franja - primera,
+                "franjas": (minuto_fin - 1) // FRANJA_MINUTOS - franja + 1,
+            })
+
+        return {
+            "periodo_id": self.periodo_id,
+            "franja_minutos": FRANJA_MINUTOS,
+            "franjas": [_hora(m) for m in range(desde, hasta, FRANJA_MINUTOS)],
+            "dias": dias,
+            "sin_horario": sorted(s.id for s in secciones if not s.intervalos),
+        }
+
+    def ocupacion(self) -> Dict[str, Any]:
+        """
+        Uso de aulas en la ventana hábil: minutos ocupados (unión de
+        intervalos, un cruce no cuenta doble), porcentaje total y por día,
+        minutos superpuestos, y las celdas con más aulas en uso.
+        """
+        ventana_dia = VENTANA_HASTA - VENTANA_DESDE
+        aulas = []
+        for clave, ids in self.por_aula.items():
+            secciones = [self.secciones[i] for i in ids]
+            por_dia = [0] * DIAS_HABILES
+            asignados = superpuestos = 0
+            fin_abierto: Dict[int, int] = {}
+            for inicio, fin in sorted(iv for s in secciones for iv in s.intervalos):
+                asignados += fin - inicio
+                dia = inicio // MINUTOS_DIA
+                # Fin de lo ya cubierto ese día: solo cuenta lo nuevo, dentro de la ventana
+                cubierto = fin_abierto.get(dia, inicio)
+                superpuestos += max(0, min(fin, cubierto) - inicio)
+                fin_abierto[dia] = max(cubierto, fin)
+                if dia < DIAS_HABILES:
+                    base = dia * MINUTOS_DIA
+                    desde = max(inicio, cubierto, base + VENTANA_DESDE)
+                    por_dia[dia] += max(0, min(fin, base + VENTANA_HASTA) - desde)
+            ocupados = sum(por_dia)
+            aulas.append({
+                "aula": min(secciones, key=lambda s: s.id).aula.strip(),
+                "secciones": len(secciones),
+                "minutos_asignados": asignados,
+                "minutos_ocupados": ocupados,
+                "minutos_superpuestos": superpuestos,
+                "porcentaje": round(100 * ocupados / (ventana_dia * DIAS_HABILES), 1),
+                "por_dia": {
+                    DIAS[d]: round(100 * por_dia[d] / ventana_dia, 1) for d in range(DIAS_HABILES)
+                },
+            })
+        aulas.sort(key=lambda a: (-a["porcentaje"], a["aula"]))
+
+        primera, ultima = VENTANA_DESDE // FRANJA_MINUTOS, VENTANA_HASTA // FRANJA_MINUTOS
+        mapa = {DIAS[d]: [0] * (ultima - primera) for d in range(DIAS_HABILES)}
+        celdas = []
+        for (dia, franja), ids in self.celdas.items():
+            if dia >= DIAS_HABILES or not primera <= franja < ultima:
+                continue
+            en_uso = len({clave_aula(self.secciones[i].aula) for i in ids} - {None})
+            mapa[DIAS[dia]][franja - primera] = en_uso
+            if en_uso:
+                celdas.append((en_uso, dia, franja))
+        celdas.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+        return {
+            "periodo_id": self.periodo_id,
+            "ventana": {
+                "dias": list(DIAS[:DIAS_HABILES]),
+                "desde": _hora(VENTANA_DESDE),
+                "hasta": _hora(VENTANA_HASTA),
+                "minutos_por_aula": ventana_dia * DIAS_HABILES,
+            },
+            "total_aulas": len(aulas),
+            "porcentaje_promedio": round(sum(a["porcentaje"] for a in aulas) / len(aulas), 1) if aulas else 0,
+            "aulas": aulas,
+            "franja_minutos": FRANJA_MINUTOS,
+            "franjas": [_hora(f * FRANJA_MINUTOS) for f in range(primera, ultima)],
+            "mapa": mapa,
+            "franjas_pico": [
+                {
+                    "dia": DIAS[dia],
+                    "desde": _hora(franja * FRANJA_MINUTOS),
+                    "hasta": _hora((franja + 1) * FRANJA_MINUTOS),
+                    "aulas_en_uso": en_uso,
+                }
+                for en_uso, dia, franja in celdas[:FRANJAS_PICO]
+            ],
+        }
+
+
+def semana(secciones: Iterable[SeccionGrilla]) -> Dict[str, List[Dict[str, Any]]]:
+    """Horario semanal de un estudiante (cuerpo de /estudiante/{id}/horario)."""
+    horario_semanal: Dict[str, List[Dict[str, Any]]] = {dia: [] for dia in DIAS[:DIAS_HABILES]}
+    for s in sorted(secciones, key=lambda s: s.materia):
+        evento = {
+            "materia": s.materia,
+            "materia_codigo": s.materia_codigo,
+            "seccion": s.codigo,
+            "aula": s.aula,
+            "profesor": s.profesor,
+            "hora_inicio": s.horario.get('hora_inicio', ''),
+            "hora_fin": s.horario.get('hora_fin', ''),
+        }
+        for dia in s.horario.get('dias', []):
+            if dia in horario_semanal:
+                horario_semanal[dia].append(evento)
+    for eventos_dia in horario_semanal.values():
+        eventos_dia.sort(key=lambda x: x.get('hora_inicio', ''))
+    return horario_semanal
+
+
+_CONSULTA = """
+    SELECT
+        s.id AS seccion_id, s.codigo AS seccion_codigo, s.aula, s.horario,
+        s.docente_id, s.cupo_maximo, s.cupo_actual,
+        m.nombre AS materia, m.codigo AS materia_codigo,
+        c.nombre AS carrera, c.id AS carrera_id,
+        p.nombre AS periodo, p.id AS periodo_id,
+        u.first_name || ' ' || u.last_name AS profesor
+    FROM public.secciones s
+    JOIN public.materias m ON s.materia_id = m.id
+    LEFT JOIN public.carreras c ON m.carrera_id = c.id
+    JOIN public.periodos_lectivos p ON s.periodo_id = p.id
+    LEFT JOIN public.usuarios u ON s.docente_id = u.id
+"""
+
+_version = 0
+_grillas: Dict[int, GrillaPeriodo] = {}
+# Secciones cambiadas desde la última relectura
+_pendientes: Set[int] = set()
+_lock = asyncio.Lock()
+
+
+def marcar(*seccion_ids: Optional[int]) -> None:
+    """Secciones a releer en el próximo obtener() (lo llama services/eventos.py)."""
+    _pendientes.update(i for i in seccion_ids if i is not None)
+
+
+def invalidar() -> None:
+    global _version
+    _version += 1
+    _grillas.clear()
+    _pendientes.clear()
+
+
+async def _construir(conn, periodo_id: int) -> Optional[GrillaPeriodo]:
+    if not await conn.fetchval("SELECT 1 FROM public.periodos_lectivos WHERE id = $1", periodo_id):
+        return None
+    inicio = time.perf_counter()
+    filas = await conn.fetch(_CONSULTA + " WHERE s.periodo_id = $1", periodo_id)
+    grilla = GrillaPeriodo(periodo_id, (_seccion(f) for f in filas))
+    logger.info(
+        f"🗓️ Grilla del período {periodo_id}: {len(grilla.secciones)} secciones, "
+        f"{len(grilla.por_aula)} aulas en {(time.perf_counter() - inicio) * 1000:.1f} ms"
+    )
+    return grilla
+
+
+async def _releer_pendientes(conn, grillas: List[GrillaPeriodo]) -> None:
+    ids = list(_pendientes)
+    _pendientes.difference_update(ids)
+    try:
+        filas = await conn.fetch(_CONSULTA + " WHERE s.id = ANY($1::int[])", ids)
+    except Exception:
+        _pendientes.update(ids)
+        raise
+    actuales = {f['seccion_id']: _seccion(f) for f in filas}
+    for grilla in grillas:
+        for seccion_id in ids:
+            s = actuales.get(seccion_id)
+            if s is not None and s.periodo_id == grilla.periodo_id:
+                grilla.aplicar(s)
+            else:
+                grilla.quitar(seccion_id)
+
+
+async def obtener(conn, periodo_id: int) -> Optional[GrillaPeriodo]:
+    """Grilla del período (None si no existe), al día con las secciones marcadas."""
+    async with _lock:
+        version = _version
+        grilla = _grillas.get(periodo_id)
+        if grilla is None or time.monotonic() - grilla.creado > settings.HORARIOS_TTL_SEGUNDOS:
+            grilla = await _construir(conn, periodo_id)
+            if grilla is None:
+                return None
+            # Si llegó un 'malla' mientras se armaba, no se guarda una foto vieja
+            if version == _version:
+                _grillas[periodo_id] = grilla
+        if _pendientes:
+            await _releer_pendientes(conn, list({id(g): g for g in (*_grillas.values(), grilla)}.values()))
+        return grilla
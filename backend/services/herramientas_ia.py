@@ -0,0 +1,361 @@
+"""
+Herramientas de datos para el chat de IA en modo "herramientas".
+
+En vez de precargar todo el contexto del rol (obtener_contexto), al modelo
+se le ofrecen consultas acotadas y parametrizadas y él pide solo las que
+la pregunta necesita: "¿cuándo es mi próxima clase?" ejecuta mi_horario y
+nada más.
+
+Cada herramienta declara los roles que la pueden usar; los datos propios
+(mi_*) siempre se filtran por el usuario autenticado y un profesor solo ve
+estadísticas de sus secciones. Dentro de un mismo request los resultados
+se cachean por (herramienta, argumentos).
+
+    texto = await herramientas_ia.responder(mensajes, current_user)
+"""
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from database import get_db_readonly
+from services import contexto_compacto, llm
+from services.calculos_financieros import (
+    calcular_deuda_total,
+    calcular_deuda_vencida,
+    calcular_en_mora,
+    consultar_deudores,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rondas de llamadas a herramientas antes de forzar una respuesta final
+MAX_RONDAS = 4
+
+ROLES_INSTITUCIONALES = frozenset({'director', 'admin', 'coordinador', 'administrativo'})
+
+
+def formatear_horario(raw) -> str:
+    data = raw or {}
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except Exception:
+            return ""
+    dias = data.get("dias", [])
+    hi = data.get("hora_inicio", "")
+    hf = data.get("hora_fin", "")
+    return f"{', '.join(dias)} {hi}-{hf}".strip()
+
+
+def _f(v) -> float:
+    return float(v) if v is not None else 0.0
+
+
+async def _periodo_activo(conn) -> Optional[Dict[str, Any]]:
+    row = await conn.fetchrow(
+        """
+        SELECT id, codigo, nombre, fecha_inicio, fecha_fin
+        FROM public.periodos_lectivos
+        WHERE activo = true
+        ORDER BY fecha_inicio DESC LIMIT 1
+        """
+    )
+    return dict(row) if row else None
+
+
+# ─── Herramientas ─────────────────────────────────────────────────────────────
+
+async def _mi_deuda(conn, usuario: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+    perfil = await conn.fetchrow(
+        """
+        SELECT u.es_becado, u.porcentaje_beca, u.convenio_activo,
+               u.fecha_limite_convenio, u.carrera_id
+        FROM public.usuarios u
+        WHERE u.id = $1
+        """,
+        usuario['id'],
+    )
+    sin_pagar = [
+        dict(r) for r in await conn.fetch(
+            """
+            SELECT i.id, i.seccion_id, i.pago_id, i.fecha_inscripcion, m.nombre AS materia
+            FROM public.inscripciones i
+            JOIN public.secciones s ON i.seccion_id = s.id
+            JOIN public.materias m ON s.materia_id = m.id
+            WHERE i.estudiante_id = $1 AND i.pago_id IS NULL
+            """,
+            usuario['id'],
+        )
+    ]
+    periodo = await _periodo_activo(conn)
+    est = {**usuario, **dict(perfil or {})}
+    return {
+        "deuda_total_usd": _f(await calcular_deuda_total(est, sin_pagar, conn)),
+        "deuda_vencida_usd": _f(await calcular_deuda_vencida(est, sin_pagar, periodo, conn)),
+        "en_mora": await calcular_en_mora(est, sin_pagar, periodo, conn),
+        "materias_sin_pagar": [i["materia"] for i in sin_pagar],
+        "convenio_activo": bool(est.get("convenio_activo")),
+        "fecha_limite_convenio": est.get("fecha_limite_convenio"),
+    }
+
+
+async def _mis_notas(conn, usuario: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+    codigo = args.get("periodo") or None
+    rows = await conn.fetch(
+        """
+        SELECT m.nombre AS materia, m.creditos, i.nota_final, i.estado, p.codigo AS periodo
+        FROM public.inscripciones i
+        JOIN public.secciones s ON i.seccion_id = s.id
+        JOIN public.materias m ON s.materia_id = m.id
+        JOIN public.periodos_lectivos p ON s.periodo_id = p.id
+        WHERE i.estudiante_id = $1
+          AND (p.codigo = $2 OR ($2::text IS NULL AND p.activo = true))
+        ORDER BY m.nombre
+        """,
+        usuario['id'], codigo,
+    )
+    return {
+        "periodo": codigo or "activo",
+        "notas": [
+            {
+                "materia": r["materia"],
+                "creditos": r["creditos"],
+                "nota_final": _f(r["nota_final"]) if r["nota_final"] is not None else None,
+                "estado": r["estado"],
+            }
+            for r in rows
+        ],
+    }
+
+
+async def _mi_horario(conn, usuario: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+    rows = await conn.fetch(
+        """
+        SELECT m.nombre AS materia, s.codigo AS seccion, s.aula, s.horario,
+               COALESCE(d.first_name || ' ' || d.last_name, '') AS profesor
+        FROM public.inscripciones i
+        JOIN public.secciones s ON i.seccion_id = s.id
+        JOIN public.materias m ON s.materia_id = m.id
+        JOIN public.periodos_lectivos p ON s.periodo_id = p.id
+        LEFT JOIN public.usuarios d ON s.docente_id = d.id
+        WHERE i.estudiante_id = $1 AND p.activo = true
+        ORDER BY m.nombre
+        """,
+        usuario['id'],
+    )
+    return {
+        "clases": [
+            {
+                "materia": r["materia"],
+                "seccion": r["seccion"],
+                "aula": r["aula"],
+                "horario": formatear_horario(r["horario"]),
+                "profesor": r["profesor"],
+            }
+            for r in rows
+        ],
+    }
+
+
+async def _estadisticas_seccion(conn, usuario: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+    codigo = str(args.get("seccion") or "").strip()
+    if not codigo:
+        return {"error": "Indica el código de la sección"}
+    # Un profesor solo consulta sus propias secciones
+    docente_id = usuario['id'] if usuario.get('rol') == 'profesor' else None
+    rows = await conn.fetch(
+        """
+        SELECT s.codigo AS seccion, m.nombre AS materia, p.codigo AS periodo, p.activo,
+               s.cupo_maximo,
+               COUNT(i.id) AS inscritos,
+               ROUND(AVG(i.nota_final)::numeric, 2) AS promedio,
+               COUNT(CASE WHEN i.nota_final >= 7 THEN 1 END) AS aprobados,
+               COUNT(CASE WHEN i.nota_final < 7 THEN 1 END) AS reprobados,
+               COUNT(CASE WHEN i.id IS NOT NULL AND i.nota_final IS NULL THEN 1 END) AS sin_nota
+        FROM public.secciones s
+        JOIN public.materias m ON s.materia_id = m.id
+        JOIN public.periodos_lectivos p ON s.periodo_id = p.id
+        LEFT JOIN public.inscripciones i ON i.seccion_id = s.id
+        WHERE s.codigo ILIKE $1
+          AND ($2::int IS NULL OR s.docente_id = $2)
+        GROUP BY s.id, m.nombre, p.codigo, p.activo
+        ORDER BY p.activo DESC, p.codigo DESC
+        LIMIT 5
+        """,
+        codigo, docente_id,
+    )
+    if not rows:
+        return {"error": f"No se encontró la sección {codigo}"}
+    return {
+        "secciones": [
+            {
+                **dict(r),
+                "promedio": _f(r["promedio"]) if r["promedio"] is not None else None,
+            }
+            for r in rows
+        ],
+    }
+
+
+async def _lista_mora(conn, usuario: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        limite = max(1, min(int(args.get("limite") or 15), 50))
+    except (TypeError, ValueError):
+        limite = 15
+    periodo = await _periodo_activo(conn)
+    deudores = await consultar_deudores(
+        conn,
+        periodo["id"] if periodo else None,
+        periodo["fecha_inicio"] if periodo and periodo["fecha_inicio"] else date.today(),
+    )
+    en_mora = [d for d in deudores if d["en_mora"]]
+    return {
+        "total_en_mora": len(en_mora),
+        "deuda_total_mora_usd": round(sum(_f(d["deuda_calculada"]) for d in en_mora), 2),
+        "listado": [
+            {
+                "nombre": d["nombre"],
+                "cedula": d["cedula"],
+                "carrera": d["carrera"],
+                "deuda_usd": round(_f(d["deuda_calculada"]), 2),
+                "materias_pendientes": d["insc_pendientes"],
+                "convenio": bool(d["convenio_activo"]),
+            }
+            for d in en_mora[:limite]
+        ],
+    }
+
+
+@dataclass(frozen=True)
+class Herramienta:
+    descripcion: str
+    parametros: Dict[str, Any]
+    roles: FrozenSet[str]
+    funcion: Callable[[Any, Dict[str, Any], Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+_SIN_PARAMETROS: Dict[str, Any] = {"type": "object", "properties": {}}
+
+HERRAMIENTAS: Dict[str, Herramienta] = {
+    "mi_deuda": Herramienta(
+        "Deuda del estudiante: total, vencida, si está en mora, materias sin pagar y convenio.",
+        _SIN_PARAMETROS,
+        frozenset({'estudiante'}),
+        _mi_deuda,
+    ),
+    "mis_notas": Herramienta(
+        "Notas finales y estado de las materias del estudiante en un período.",
+        {
+            "type": "object",
+            "properties": {
+                "periodo": {
+                    "type": "string",
+                    "description": "Código del período (ej. 2025-1). Omitir para el período activo.",
+                },
+            },
+        },
+        frozenset({'estudiante'}),
+        _mis_notas,
+    ),
+    "mi_horario": Herramienta(
+        "Clases del estudiante en el período activo: materia, días, horas, aula y profesor.",
+        _SIN_PARAMETROS,
+        frozenset({'estudiante'}),
+        _mi_horario,
+    ),
+    "estadisticas_seccion": Herramienta(
+        "Inscritos, cupo, promedio, aprobados, reprobados y alumnos sin nota de una sección.",
+        {
+            "type": "object",
+            "properties": {
+                "seccion": {"type": "string", "description": "Código de la sección"},
+            },
+            "required": ["seccion"],
+        },
+        frozenset({'profesor'}) | ROLES_INSTITUCIONALES,
+        _estadisticas_seccion,
+    ),
+    "lista_mora": Herramienta(
+        "Estudiantes en mora ordenados por deuda, con totales.",
+        {
+            "type": "object",
+            "properties": {
+                "limite": {"type": "integer", "description": "Máximo de estudiantes (1-50)"},
+            },
+        },
+        frozenset({'tesorero'}) | ROLES_INSTITUCIONALES,
+        _lista_mora,
+    ),
+}
+
+
+class EjecutorHerramientas:
+    """Herramientas de un usuario con caché de resultados para un request."""
+
+    def __init__(self, usuario: Dict[str, Any]):
+        self.usuario = usuario
+        self._cache: Dict[Tuple[str, str], str] = {}
+
+    def disponibles(self) -> Dict[str, Herramienta]:
+        rol = self.usuario.get('rol')
+        return {n: h for n, h in HERRAMIENTAS.items() if rol in h.roles}
+
+    def definiciones(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "type": "function",
+                "function": {"name": n, "description": h.descripcion, "parameters": h.parametros},
+            }
+            for n, h in self.disponibles().items()
+        ]
+
+    async def ejecutar(self, nombre: str, argumentos: str) -> str:
+        herramienta = self.disponibles().get(nombre)
+        if herramienta is None:
+            return contexto_compacto.serializar({"error": f"Herramienta no disponible: {nombre}"})
+        try:
+            args = json.loads(argumentos or "{}")
+            if not isinstance(args, dict):
+                raise ValueError
+        except ValueError:
+            return contexto_compacto.serializar({"error": "Argumentos inválidos"})
+
+        clave = (nombre, json.dumps(args, sort_keys=True))
+        if clave not in self._cache:
+            async with get_db_readonly() as conn:
+                resultado = await herramienta.funcion(conn, self.usuario, args)
+            self._cache[clave] = contexto_compacto.serializar(resultado)
+            logger.info(f"🔧 Herramienta IA {nombre}({clave[1]}) para usuario {self.usuario['id']}")
+        return self._cache[clave]
+
+
+async def responder(mensajes: List[Dict[str, Any]], usuario: Dict[str, Any]) -> str:
+    """Conversación con herramientas hasta que el modelo da una respuesta final."""
+    ejecutor = EjecutorHerramientas(usuario)
+    definiciones = ejecutor.definiciones()
+    mensajes = list(mensajes)
+    for _ in range(MAX_RONDAS if definiciones else 0):
+        respuesta = await llm.completar_con_herramientas(mensajes, definiciones)
+        if not respuesta["llamadas"]:
+            return respuesta["contenido"]
+        mensajes.append({
+            "role": "assistant",
+            "content": respuesta["contenido"] or "",
+            "tool_calls": [
+                {
+                    "id": ll["id"],
+                    "type": "function",
+                    "function": {"name": ll["nombre"], "arguments": ll["argumentos"]},
+                }
+                for ll in respuesta["llamadas"]
+            ],
+        })
+        for ll in respuesta["llamadas"]:
+            mensajes.append({
+                "role": "tool",
+                "tool_call_id": ll["id"],
+                "content": await ejecutor.ejecutar(ll["nombre"], ll["argumentos"]),
+            })
+    return await llm.completar(mensajes)
@@ -0,0 +1,339 @@
+"""
+Cruces de horario entre secciones, por aula, docente y estudiante.
+
+secciones.horario es JSONB libre: {"dias": ["Lunes", "Miércoles"],
+"hora_inicio": "08:00", "hora_fin": "10:00"}. Aquí se normaliza a
+intervalos semiabiertos [inicio, fin) en minutos de la semana
+(día × 1440 + minutos), así un cruce es solo `a.inicio < b.fin and
+b.inicio < a.fin` (terminar 10:00 y empezar 10:00 no es cruce).
+
+- Agenda: intervalos de un recurso ordenados por inicio, con el máximo
+  acumulado de fin; "¿se cruza [i, f)?" es una búsqueda binaria, O(log n).
+- conflictos_seccion / conflictos_inscripcion: validación de escrituras.
+  Cargan en la misma transacción solo las secciones del período que
+  comparten aula o docente (o los horarios de los estudiantes afectados) y
+  consultan sus agendas.
+- auditar: cruces de todo un período en una sola pasada de barrido
+  (sweep line) sobre los eventos de inicio/fin ordenados, con las
+  secciones abiertas por recurso.
+
+Las inscripciones retiradas no ocupan horario. Las validaciones toman un
+advisory lock de transacción (por período para secciones, por estudiante
+para inscripciones) para que dos escrituras simultáneas no se validen
+cada una sin ver a la otra: deben llamarse en la transacción que escribe.
+"""
+import bisect
+import json
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+DIAS = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+MINUTOS_DIA = 1440
+
+Intervalo = Tuple[int, int]
+
+
+def _sin_tildes(texto: str) -> str:
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn'
+    ).strip().lower()
+
+
+_INDICE_DIA = {}
+for _i, _dia in enumerate(DIAS):
+    _INDICE_DIA[_sin_tildes(_dia)] = _i
+    _INDICE_DIA[_sin_tildes(_dia)[:3]] = _i
+
+
+def _minutos(hora: Any) -> int:
+    horas, _, minutos = str(hora).strip().partition(':')
+    valor = int(horas) * 60 + int(minutos[:2] or 0)
+    if not 0 <= valor <= MINUTOS_DIA:
+        raise ValueError(f"Hora fuera de rango: {hora}")
+    return valor
+
+
+def intervalos(horario_raw: Any, estricto: bool = False) -> List[Intervalo]:
+    """
+    Intervalos [inicio, fin) en minutos de la semana.
+
+    Un horario vacío no ocupa tiempo. Con `estricto` un horario con datos
+    inválidos (día desconocido, hora mal escrita, fin ≤ inicio) lanza
+    ValueError; sin él (datos ya guardados) se ignora.
+    """
+    datos = horario_raw or {}
+    if isinstance(datos, str):
+        try:
+            datos = json.loads(datos)
+        except ValueError:
+            if estricto:
+                raise ValueError("Horario inválido")
+            return []
+    if not isinstance(datos, dict) or not datos:
+        return []
+    try:
+        dias = datos.get('dias') or ([datos['dia']] if datos.get('dia') else [])
+        if isinstance(dias, str):
+            dias = [d for d in dias.replace(';', ',').split(',') if d.strip()]
+        if not dias and not datos.get('hora_inicio') and not datos.get('hora_fin'):
+            return []
+        inicio, fin = _minutos(datos['hora_inicio']), _minutos(datos['hora_fin'])
+        if fin <= inicio:
+            raise ValueError("hora_fin debe ser posterior a hora_inicio")
+        indices = []
+        for dia in dias:
+            clave = _sin_tildes(str(dia))
+            if clave not in _INDICE_DIA:
+                raise ValueError(f"Día desconocido: {dia}")
+            indices.append(_INDICE_DIA[clave])
+    except (KeyError, TypeError, ValueError) as e:
+        if estricto:
+            raise ValueError(str(e) if isinstance(e, ValueError) else "Horario incompleto: faltan días u horas")
+        return []
+    return sorted({(d * MINUTOS_DIA + inicio, d * MINUTOS_DIA + fin) for d in indices})
+
+
+def describir(intervalo: Intervalo) -> Tuple[str, str, str]:
+    """(día, desde, hasta) de un intervalo en minutos de la semana."""
+    inicio, fin = intervalo
+    dia, desde = divmod(inicio, MINUTOS_DIA)
+    hasta = fin - dia * MINUTOS_DIA
+    return DIAS[dia], f"{desde // 60:02d}:{desde % 60:02d}", f"{hasta // 60:02d}:{hasta % 60:02d}"
+
+
+def clave_aula(aula: Optional[str]) -> Optional[str]:
+    aula = (aula or '').strip().lower()
+    return aula or None
+
+
+class Agenda:
+    """Intervalos ocupados de un recurso (aula, docente o estudiante)."""
+
+    def __init__(self, ocupados: Iterable[Tuple[int, int, Any]] = ()):
+        # (inicio, fin, dueño) ordenados por inicio
+        self._ocupados = sorted(ocupados)
+        self._inicios = [i for i, _, _ in self._ocupados]
+        self._fin_maximo = []
+        maximo = -1
+        for _, fin, _ in self._ocupados:
+            maximo = max(maximo, fin)
+            self._fin_maximo.append(maximo)
+
+    def __len__(self) -> int:
+        return len(self._ocupados)
+
+    def se_cruza(self, inicio: int, fin: int) -> bool:
+        """O(log n): algún intervalo que empieza antes de `fin` termina después de `inicio`."""
+        k = bisect.bisect_left(self._inicios, fin)
+        return k > 0 and self._fin_maximo[k - 1] > inicio
+
+    def cruces(self, inicio: int, fin: int) -> List[Tuple[int, int, Any]]:
+        """Intervalos que se cruzan con [inicio, fin): O(log n + cruces)."""
+        k = bisect.bisect_left(self._inicios, fin)
+        encontrados = []
+        while k > 0 and self._fin_maximo[k - 1] > inicio:
+            k -= 1
+            if self._ocupados[k][1] > inicio:
+                encontrados.append(self._ocupados[k])
+        return encontrados[::-1]
+
+
+@dataclass(frozen=True)
+class Conflicto:
+    tipo: str          # 'aula' | 'docente' | 'estudiante'
+    recurso: Any       # aula, docente_id o estudiante_id
+    seccion_id: Optional[int]
+    otra_seccion_id: int
+    otra_seccion: str
+    intervalo: Intervalo
+
+    def mensaje(self) -> str:
+        dia, desde, hasta = describir(self.intervalo)
+        recurso = {
+            'aula': f"el aula {self.recurso}",
+            'docente': "el docente",
+            'estudiante': "el estudiante",
+        }[self.tipo]
+        return f"Cruce de horario para {recurso} con la sección {self.otra_seccion} ({dia} {desde}-{hasta})"
+
+    def a_dict(self) -> Dict[str, Any]:
+        dia, desde, hasta = describir(self.intervalo)
+        return {
+            "tipo": self.tipo, "recurso": self.recurso, "seccion_id": self.seccion_id,
+            "otra_seccion_id": self.otra_seccion_id, "otra_seccion": self.otra_seccion,
+            "dia": dia, "desde": desde, "hasta": hasta,
+        }
+
+
+def _agenda(filas: Iterable) -> Agenda:
+    return Agenda(
+        (inicio, fin, (f['id'], f['codigo']))
+        for f in filas for inicio, fin in intervalos(f['horario'])
+    )
+
+
+def _cruces(
+    tipo: str, recurso: Any, agenda: Agenda, propuestos: Sequence[Intervalo], seccion_id: Optional[int],
+) -> List[Conflicto]:
+    conflictos = []
+    for inicio, fin in propuestos:
+        for otro_inicio, otro_fin, (otra_id, otra_codigo) in agenda.cruces(inicio, fin):
+            conflictos.append(Conflicto(
+                tipo, recurso, seccion_id, otra_id, otra_codigo,
+                (max(inicio, otro_inicio), min(fin, otro_fin)),
+            ))
+    return conflictos
+
+
+async def conflictos_seccion(
+    conn,
+    periodo_id: int,
+    horario: Any,
+    aula: Optional[str],
+    docente_id: Optional[int],
+    seccion_id: Optional[int] = None,
+) -> List[Conflicto]:
+    """
+    Cruces de una sección propuesta (nueva o editada) con el resto del
+    período: misma aula, mismo docente y, si ya existe, los horarios de
+    sus estudiantes inscritos. `horario` se valida en modo estricto.
+    """
+    propuestos = intervalos(horario, estricto=True)
+    if not propuestos:
+        return []
+    await conn.execute("SELECT pg_advisory_xact_lock(hashtext('horarios:seccion'), $1)", periodo_id)
+    aula_clave = clave_aula(aula)
+    filas = await conn.fetch("""
+        SELECT s.id, s.codigo, s.horario, lower(btrim(s.aula)) AS aula, s.docente_id
+        FROM public.secciones s
+        WHERE s.periodo_id = $1
+          AND s.id <> COALESCE($4, 0)
+          AND (lower(btrim(s.aula)) = $2 OR s.docente_id = $3)
+    """, periodo_id, aula_clave, docente_id, seccion_id)
+
+    conflictos: List[Conflicto] = []
+    if aula_clave:
+        agenda = _agenda(f for f in filas if f['aula'] == aula_clave)
+        conflictos += _cruces('aula', aula.strip(), agenda, propuestos, seccion_id)
+    if docente_id:
+        agenda = _agenda(f for f in filas if f['docente_id'] == docente_id)
+        conflictos += _cruces('docente', docente_id, agenda, propuestos, seccion_id)
+
+    if seccion_id:
+        otras = await conn.fetch("""
+            SELECT i.estudiante_id, s.id, s.codigo, s.horario
+            FROM public.inscripciones i
+            JOIN public.secciones s ON s.id = i.seccion_id
+            WHERE s.periodo_id = $1 AND s.id <> $2 AND i.estado <> 'retirado'
+              AND i.estudiante_id IN (
+                  SELECT estudiante_id FROM public.inscripciones
+                  WHERE seccion_id = $2 AND estado <> 'retirado'
+              )
+        """, periodo_id, seccion_id)
+        por_estudiante: Dict[int, list] = {}
+        for f in otras:
+            por_estudiante.setdefault(f['estudiante_id'], []).append(f)
+        for estudiante_id, suyas in por_estudiante.items():
+            conflictos += _cruces('estudiante', estudiante_id, _agenda(suyas), propuestos, seccion_id)
+    return conflictos
+
+
+async def conflictos_inscripcion(conn, estudiante_id: int, seccion_id: int) -> List[Conflicto]:
+    """Cruces de la sección con las demás secciones del estudiante en el mismo período."""
+    seccion = await conn.fetchrow(
+        "SELECT id, periodo_id, horario FROM public.secciones WHERE id = $1", seccion_id
+    )
+    if not seccion:
+        return []
+    propuestos = intervalos(seccion['horario'])
+    if not propuestos:
+        return []
+    await conn.execute("SELECT pg_advisory_xact_lock(hashtext('horarios:inscripcion'), $1)", estudiante_id)
+    suyas = await conn.fetch("""
+        SELECT s.id, s.codigo, s.horario
+        FROM public.inscripciones i
+        JOIN public.secciones s ON s.id = i.seccion_id
+        WHERE i.estudiante_id = $1 AND s.periodo_id = $2 AND s.id <> $3 AND i.estado <> 'retirado'
+    """, estudiante_id, seccion['periodo_id'], seccion_id)
+    return _cruces('estudiante', estudiante_id, _agenda(suyas), propuestos, seccion_id)
+
+
+def auditar(secciones: Sequence[Dict[str, Any]], inscripciones: Iterable[Tuple[int, int]]) -> Dict[str, Any]:
+    """
+    Cruces de un período completo en una pasada de barrido.
+
+    Args:
+        secciones: filas con id, codigo, aula, docente_id, horario
+        inscripciones: pares (estudiante_id, seccion_id) vigentes
+
+    Cada inicio de intervalo se compara solo con las secciones abiertas en
+    ese momento que comparten aula, docente o algún estudiante; los fines
+    se procesan antes que los inicios del mismo minuto.
+    """
+    estudiantes_de: Dict[int, List[int]] = {}
+    for estudiante_id, seccion_id in inscripciones:
+        estudiantes_de.setdefault(seccion_id, []).append(estudiante_id)
+
+    codigos = {s['id']: s['codigo'] for s in secciones}
+    recursos: Dict[int, List[Tuple[str, Any]]] = {}
+    # (minuto, 0 fin / 1 inicio, seccion_id, fin del intervalo)
+    eventos: List[Tuple[int, int, int, int]] = []
+    invalidos = []
+    for s in secciones:
+        propios = intervalos(s['horario'])
+        if s['horario'] and not propios:
+            invalidos.append({"seccion_id": s['id'], "codigo": s['codigo']})
+        claves: List[Tuple[str, Any]] = []
+        if clave_aula(s['aula']):
+            claves.append(('aula', clave_aula(s['aula'])))
+        if s['docente_id']:
+            claves.append(('docente', s['docente_id']))
+        claves.extend(('estudiante', e) for e in estudiantes_de.get(s['id'], ()))
+        recursos[s['id']] = claves
+        for inicio, fin in propios:
+            eventos.append((inicio, 1, s['id'], fin))
+            eventos.append((fin, 0, s['id'], fin))
+    eventos.sort()
+
+    abiertas: Dict[Tuple[str, Any], Set[int]] = {}
+    # Fin del intervalo abierto de cada sección (sus intervalos no se solapan)
+    abierta_hasta: Dict[int, int] = {}
+    cruces: Dict[Tuple[str, Any, int, int], List[Intervalo]] = {}
+    for minuto, es_inicio, seccion_id, fin in eventos:
+        if not es_inicio:
+            for clave in recursos[seccion_id]:
+                abiertas[clave].discard(seccion_id)
+            continue
+        abierta_hasta[seccion_id] = fin
+        for clave in recursos[seccion_id]:
+            grupo = abiertas.setdefault(clave, set())
+            for otra in grupo:
+                a, b = sorted((otra, seccion_id))
+                cruces.setdefault((clave[0], clave[1], a, b), []).append(
+                    (minuto, min(fin, abierta_hasta[otra]))
+                )
+            grupo.add(seccion_id)
+
+    resultado = []
+    for (tipo, recurso, a, b), tramos in sorted(cruces.items(), key=lambda kv: (kv[0][0], str(kv[0][1]), kv[0][2:])):
+        detalle = []
+        for tramo in tramos:
+            dia, desde, hasta = describir(tramo)
+            detalle.append({"dia": dia, "desde": desde, "hasta": hasta})
+        resultado.append({
+            "tipo": tipo,
+            "recurso": recurso,
+            "secciones": [{"id": a, "codigo": codigos[a]}, {"id": b, "codigo": codigos[b]}],
+            "cruces": detalle,
+        })
+
+    por_tipo: Dict[str, int] = {}
+    for c in resultado:
+        por_tipo[c["tipo"]] = por_tipo.get(c["tipo"], 0) + 1
+    return {
+        "total": len(resultado),
+        "por_tipo": por_tipo,
+        "conflictos": resultado,
+        "horarios_invalidos": invalidos,
+    }
@@ -0,0 +1,254 @@
+"""
+KPIs institucionales precalculados.
+
+Dos mecanismos complementarios:
+
+- Vistas materializadas (migrations/002_kpi_institucional.sql), refrescadas
+  cada KPI_REFRESH_SEGUNDOS desde el scheduler (services/tareas.py).
+- Contadores incrementales (migrations/003_kpi_counters.sql): los endpoints
+  de escritura llaman registrar_cambio_usuario / registrar_cambio_pagos en
+  la misma transacción, y la lectura es una búsqueda por clave primaria.
+  verificar_contadores recalcula todo, corrige y registra las diferencias.
+
+Métricas de los contadores (ámbitos entre corchetes):
+    total_estudiantes, estudiantes_becados, estudiantes_mora  [global, carrera]
+    total_profesores                                          [global]
+    pagos_completados, pagos_pendientes,
+    monto_completado, monto_pendiente, ingresos_totales       [global, periodo]
+
+estudiantes_mora = estudiantes con alguna inscripción sin pago_id;
+ingresos_totales = SUM(monto) de todos los pagos (como el dashboard).
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+VISTAS_KPI = (
+    "public.mv_kpi_institucional",
+    "public.mv_estudiantes_por_carrera",
+    "public.mv_alumnos_mora",
+)
+
+# (ambito, ambito_id, metrica)
+ClaveContador = Tuple[str, int, str]
+
+SQL_RECUENTO = """
+    WITH est AS (
+        SELECT u.carrera_id, COALESCE(u.es_becado, false) AS es_becado,
+               EXISTS (SELECT 1 FROM public.inscripciones i
+                       WHERE i.estudiante_id = u.id AND i.pago_id IS NULL) AS en_mora
+        FROM public.usuarios u
+        WHERE u.rol = 'estudiante'
+    ),
+    est_metricas AS (
+        SELECT e.carrera_id, m.metrica, COUNT(*) FILTER (WHERE m.cuenta) AS valor,
+               GROUPING(e.carrera_id) AS es_global
+        FROM est e
+        CROSS JOIN LATERAL (VALUES
+            ('total_estudiantes', true),
+            ('estudiantes_becados', e.es_becado),
+            ('estudiantes_mora', e.en_mora)
+        ) AS m(metrica, cuenta)
+        GROUP BY GROUPING SETS ((m.metrica), (e.carrera_id, m.metrica))
+    ),
+    pag_metricas AS (
+        SELECT p.periodo_id, m.metrica, SUM(m.valor) AS valor,
+               GROUPING(p.periodo_id) AS es_global
+        FROM public.pagos p
+        CROSS JOIN LATERAL (VALUES
+            ('pagos_completados', CASE WHEN p.estado = 'completado' THEN 1 ELSE 0 END),
+            ('pagos_pendientes',  CASE WHEN p.estado = 'pendiente'  THEN 1 ELSE 0 END),
+            ('monto_completado',  CASE WHEN p.estado = 'completado' THEN p.monto ELSE 0 END),
+            ('monto_pendiente',   CASE WHEN p.estado = 'pendiente'  THEN p.monto ELSE 0 END),
+            ('ingresos_totales',  p.monto)
+        ) AS m(metrica, valor)
+        GROUP BY GROUPING SETS ((m.metrica), (p.periodo_id, m.metrica))
+    )
+    SELECT 'global' AS ambito, 0 AS ambito_id, 'total_profesores' AS metrica, COUNT(*)::numeric AS valor
+    FROM public.usuarios WHERE rol = 'profesor'
+    UNION ALL
+    SELECT CASE WHEN es_global = 1 THEN 'global' ELSE 'carrera' END,
+           CASE WHEN es_global = 1 THEN 0 ELSE carrera_id END, metrica, valor
+    FROM est_metricas
+    WHERE es_global = 1 OR carrera_id IS NOT NULL
+    UNION ALL
+    SELECT CASE WHEN es_global = 1 THEN 'global' ELSE 'periodo' END,
+           CASE WHEN es_global = 1 THEN 0 ELSE periodo_id END, metrica, valor
+    FROM pag_metricas
+    WHERE es_global = 1 OR periodo_id IS NOT NULL
+"""
+
+
+async def refrescar_vistas_kpi(conn) -> None:
+    """REFRESH CONCURRENTLY: las lecturas del dashboard no se bloquean mientras se recalcula."""
+    for vista in VISTAS_KPI:
+        await conn.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {vista}")
+
+
+def _contribucion_usuario(usuario: Optional[Mapping[str, Any]], en_mora: bool) -> Dict[ClaveContador, Decimal]:
+    """Lo que aporta una fila de usuarios (rol, carrera_id, es_becado) a los contadores."""
+    aporte: Dict[ClaveContador, Decimal] = {}
+    if not usuario:
+        return aporte
+    if usuario.get('rol') == 'profesor':
+        aporte[('global', 0, 'total_profesores')] = Decimal(1)
+    if usuario.get('rol') != 'estudiante':
+        return aporte
+
+    ambitos = [('global', 0)]
+    if usuario.get('carrera_id'):
+        ambitos.append(('carrera', usuario['carrera_id']))
+    metricas = ['total_estudiantes']
+    if usuario.get('es_becado'):
+        metricas.append('estudiantes_becados')
+    if en_mora:
+        metricas.append('estudiantes_mora')
+    for ambito, ambito_id in ambitos:
+        for metrica in metricas:
+            aporte[(ambito, ambito_id, metrica)] = Decimal(1)
+    return aporte
+
+
+def _contribucion_pago(pago: Mapping[str, Any]) -> Dict[ClaveContador, Decimal]:
+    """Lo que aporta una fila de pagos (estado, monto, periodo_id) a los contadores."""
+    monto = Decimal(str(pago.get('monto') or 0))
+    metricas = {'ingresos_totales': monto}
+    if pago.get('estado') == 'completado':
+        metricas.update(pagos_completados=Decimal(1), monto_completado=monto)
+    elif pago.get('estado') == 'pendiente':
+        metricas.update(pagos_pendientes=Decimal(1), monto_pendiente=monto)
+
+    ambitos = [('global', 0)]
+    if pago.get('periodo_id'):
+        ambitos.append(('periodo', pago['periodo_id']))
+    return {(ambito, ambito_id, metrica): valor
+            for ambito, ambito_id in ambitos for metrica, valor in metricas.items()}
+
+
+async def _aplicar_deltas(conn, deltas: Dict[ClaveContador, Decimal]) -> None:
+    deltas = {clave: valor for clave, valor in deltas.items() if valor}
+    if not deltas:
+        return
+    # Orden fijo de claves: dos transacciones concurrentes bloquean filas en el mismo orden
+    claves = sorted(deltas)
+    await conn.execute(
+        """
+        INSERT INTO public.kpi_counters (ambito, ambito_id, metrica, valor)
+        SELECT * FROM unnest($1::varchar[], $2::int[], $3::varchar[], $4::numeric[])
+        ON CONFLICT (ambito, ambito_id, metrica)
+        DO UPDATE SET valor = kpi_counters.valor + EXCLUDED.valor, actualizado_en = NOW()
+        """,
+        [c[0] for c in claves], [c[1] for c in claves], [c[2] for c in claves],
+        [deltas[c] for c in claves],
+    )
+
+
+async def estudiante_en_mora(conn, estudiante_id: int) -> bool:
+    return await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM public.inscripciones WHERE estudiante_id = $1 AND pago_id IS NULL)",
+        estudiante_id,
+    )
+
+
+async def registrar_cambio_usuario(
+    conn,
+    antes: Optional[Mapping[str, Any]],
+    despues: Optional[Mapping[str, Any]],
+    mora_antes: bool = False,
+    mora_despues: bool = False,
+) -> None:
+    """
+    Aplica la diferencia entre el estado anterior y el nuevo de un usuario.
+
+    antes=None para altas. Las filas necesitan rol, carrera_id y es_becado.
+    """
+    deltas: Dict[ClaveContador, Decimal] = defaultdict(Decimal)
+    for clave, valor in _contribucion_usuario(despues, mora_despues).items():
+        deltas[clave] += valor
+    for clave, valor in _contribucion_usuario(antes, mora_antes).items():
+        deltas[clave] -= valor
+    await _aplicar_deltas(conn, deltas)
+
+
+async def registrar_cambio_pagos(
+    conn,
+    nuevos: Iterable[Mapping[str, Any]] = (),
+    anteriores: Iterable[Mapping[str, Any]] = (),
+) -> None:
+    """Suma los pagos nuevos (o su estado nuevo) y resta los anteriores."""
+    deltas: Dict[ClaveContador, Decimal] = defaultdict(Decimal)
+    for pago in nuevos:
+        for clave, valor in _contribucion_pago(pago).items():
+            deltas[clave] += valor
+    for pago in anteriores:
+        for clave, valor in _contribucion_pago(pago).items():
+            deltas[clave] -= valor
+    await _aplicar_deltas(conn, deltas)
+
+
+async def leer_contadores(conn, ambito: str = 'global', ambito_id: int = 0) -> Optional[Dict[str, Decimal]]:
+    """
+    Contadores de un ámbito. None si la tabla no existe o aún no se sembró:
+    el llamador debe calcular en vivo.
+    """
+    try:
+        async with conn.transaction():
+            sembrado = await conn.fetchval(
+                "SELECT 1 FROM public.kpi_counters WHERE ambito = 'global' AND ambito_id = 0 LIMIT 1"
+            )
+            rows = await conn.fetch(
+                "SELECT metrica, valor FROM public.kpi_counters WHERE ambito = $1 AND ambito_id = $2",
+                ambito, ambito_id,
+            )
+    except asyncpg.UndefinedTableError:
+        return None
+    if not sembrado:
+        return None
+    contadores = defaultdict(Decimal)
+    contadores.update({r['metrica']: r['valor'] for r in rows})
+    return contadores
+
+
+async def verificar_contadores(conn) -> None:
+    """
+    Recuento completo: corrige los contadores y registra los que diferían.
+
+    El lock EXCLUSIVE deja leer los contadores pero espera a las escrituras
+    en curso y frena las nuevas hasta el COMMIT, así el recuento y los
+    deltas posteriores no se pisan.
+    """
+    await conn.execute("LOCK TABLE public.kpi_counters IN EXCLUSIVE MODE")
+    reales = {(r['ambito'], r['ambito_id'], r['metrica']): r['valor']
+              for r in await conn.fetch(SQL_RECUENTO)}
+    actuales = {(r['ambito'], r['ambito_id'], r['metrica']): r['valor']
+                for r in await conn.fetch("SELECT ambito, ambito_id, metrica, valor FROM public.kpi_counters")}
+
+    diferencias = {clave: reales.get(clave, Decimal(0))
+                   for clave in reales.keys() | actuales.keys()
+                   if reales.get(clave, Decimal(0)) != actuales.get(clave)}
+    if not diferencias:
+        return
+
+    if actuales:
+        for clave in sorted(diferencias)[:20]:
+            logger.warning(f"⚠️ Contador KPI {clave}: {actuales.get(clave)} → {diferencias[clave]}")
+        logger.warning(f"⚠️ {len(diferencias)} contadores KPI corregidos por el recuento")
+    else:
+        logger.info(f"✅ Contadores KPI sembrados ({len(diferencias)} filas)")
+
+    claves = sorted(diferencias)
+    await conn.execute(
+        """
+        INSERT INTO public.kpi_counters (ambito, ambito_id, metrica, valor)
+        SELECT * FROM unnest($1::varchar[], $2::int[], $3::varchar[], $4::numeric[])
+        ON CONFLICT (ambito, ambito_id, metrica)
+        DO UPDATE SET valor = EXCLUDED.valor, actualizado_en = NOW()
+        """,
+        [c[0] for c in claves], [c[1] for c in claves], [c[2] for c in claves],
+        [diferencias[c] for c in claves],
+    )
@@ -0,0 +1,239 @@
+"""
+Cliente del modelo de lenguaje para /ia/chat.
+
+    texto = await llm.completar(mensajes)
+
+    async for fragmento in llm.generar(mensajes):
+        ...
+
+    respuesta = await llm.completar_con_herramientas(mensajes, definiciones)
+
+IA_PROVEEDOR elige el backend:
+- groq:  API de Groq (llama-3.3-70b-versatile).
+- falso: modelo local, sin red ni clave, que responde un texto derivado
+  del último mensaje fragmento a fragmento (IA_FALSO_DEMORA_SEGUNDOS entre
+  fragmentos). Sirve para probar el streaming offline.
+
+generar() consume el stream del proveedor a medida que llega. Si quien lo
+itera lo abandona (cliente desconectado → cancelación), hay que cerrarlo
+con aclose(): el finally cierra la respuesta HTTP del proveedor y la
+generación deja de consumir cuota.
+
+Concurrencia (por worker):
+- Un único AsyncGroq para todo el proceso: reutiliza conexiones keep-alive
+  en vez de abrir pool y handshake TLS en cada request.
+- Como mucho IA_MAX_CONCURRENTES llamadas a la vez; una generación en
+  streaming ocupa su turno hasta terminar o cancelarse.
+- Hasta IA_MAX_EN_ESPERA requests esperan turno, cada uno un máximo de
+  IA_ESPERA_SEGUNDOS. Pasado eso, o con la cola llena, 503 inmediato con
+  Retry-After, en lugar de acumular requests hasta el timeout de gunicorn.
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from fastapi import HTTPException, status
+from groq import AsyncGroq
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MODELO = "llama-3.3-70b-versatile"
+
+Mensajes = List[Dict[str, Any]]
+
+_cliente: Optional[AsyncGroq] = None
+_semaforo: Optional[asyncio.Semaphore] = None
+_en_espera = 0
+
+
+def _clave_groq() -> str:
+    return settings.GROQ_API_KEY or os.getenv("GROQ_API_KEY", "")
+
+
+def _obtener_cliente() -> AsyncGroq:
+    global _cliente
+    if _cliente is None:
+        _cliente = AsyncGroq(
+            api_key=_clave_groq(),
+            timeout=settings.IA_TIMEOUT_SEGUNDOS,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.IA_MAX_CONCURRENTES,
+                    max_keepalive_connections=settings.IA_MAX_CONCURRENTES,
+                ),
+            ),
+        )
+    return _cliente
+
+
+async def cerrar() -> None:
+    global _cliente
+    if _cliente is not None:
+        await _cliente.close()
+        _cliente = None
+
+
+def _saturado(motivo: str) -> HTTPException:
+    logger.warning(f"⚠️ IA saturada: {motivo}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="El asistente de IA está atendiendo demasiadas consultas. Intenta de nuevo en unos segundos.",
+        headers={"Retry-After": "5"},
+    )
+
+
+@asynccontextmanager
+async def _turno():
+    """Reserva un turno de llamada al proveedor o lanza 503."""
+    global _semaforo, _en_espera
+    if _semaforo is None:
+        _semaforo = asyncio.Semaphore(settings.IA_MAX_CONCURRENTES)
+    if _semaforo.locked():
+        if _en_espera >= settings.IA_MAX_EN_ESPERA:
+            raise _saturado(f"{_en_espera} requests en espera")
+        _en_espera += 1
+        try:
+            # asyncio.timeout (no wait_for): si el turno llega justo al vencer,
+            # acquire() lo devuelve al cancelarse y no se pierde
+            async with asyncio.timeout(settings.IA_ESPERA_SEGUNDOS):
+                await _semaforo.acquire()
+        except TimeoutError:
+            raise _saturado(f"sin turno tras {settings.IA_ESPERA_SEGUNDOS}s")
+        finally:
+            _en_espera -= 1
+    else:
+        await _semaforo.acquire()
+    try:
+        yield
+    finally:
+        _semaforo.release()
+
+
+def es_falso() -> bool:
+    return settings.IA_PROVEEDOR == "falso"
+
+
+def configurado() -> bool:
+    return es_falso() or bool(_clave_groq())
+
+
+def _respuesta_falsa(mensajes: Mensajes) -> str:
+    ultimo = next(
+        (m.get("content") or "" for m in reversed(mensajes) if m.get("role") == "user"),
+        "",
+    )
+    return (
+        f"Respuesta de prueba (modelo local). Recibí tu mensaje: \"{ultimo.strip()}\". "
+        f"El contexto tenía {len(mensajes)} mensajes."
+    )
+
+
+async def _generar_falso(mensajes: Mensajes, max_tokens: int) -> AsyncIterator[str]:
+    palabras = _respuesta_falsa(mensajes).split(" ")[:max_tokens]
+    for i, palabra in enumerate(palabras):
+        await asyncio.sleep(settings.IA_FALSO_DEMORA_SEGUNDOS)
+        yield palabra if i == 0 else f" {palabra}"
+
+
+async def _generar_groq(
+    mensajes: Mensajes, temperature: float, max_tokens: int
+) -> AsyncIterator[str]:
+    stream = await _obtener_cliente().chat.completions.create(
+        model=MODELO,
+        messages=mensajes,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Corta la generación en el proveedor si el consumidor se fue
+        await stream.close()
+
+
+async def generar(
+    mensajes: Mensajes, temperature: float = 0.2, max_tokens: int = 4000
+) -> AsyncIterator[str]:
+    """Itera los fragmentos de texto de la respuesta según van llegando."""
+    async with _turno():
+        if es_falso():
+            fuente = _generar_falso(mensajes, max_tokens)
+        else:
+            fuente = _generar_groq(mensajes, temperature, max_tokens)
+        try:
+            async for fragmento in fuente:
+                yield fragmento
+        finally:
+            await fuente.aclose()
+
+
+async def completar(
+    mensajes: Mensajes, temperature: float = 0.2, max_tokens: int = 4000
+) -> str:
+    """Respuesta completa, sin streaming."""
+    async with _turno():
+        if es_falso():
+            return "".join([f async for f in _generar_falso(mensajes, max_tokens)])
+        completion = await _obtener_cliente().chat.completions.create(
+            model=MODELO,
+            messages=mensajes,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return completion.choices[0].message.content or ""
+
+
+def _herramientas_falso(mensajes: Mensajes, herramientas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Primera vuelta: pide la herramienta cuyo nombre aparece en la pregunta
+    # (o la primera); con resultados ya presentes, responde con ellos
+    resultados = [m["content"] for m in mensajes if m.get("role") == "tool"]
+    if resultados or not herramientas:
+        return {
+            "contenido": f"{_respuesta_falsa(mensajes)} Datos: {' '.join(resultados)[:500]}",
+            "llamadas": [],
+        }
+    ultimo = next((m.get("content") or "" for m in reversed(mensajes) if m.get("role") == "user"), "")
+    nombres = [h["function"]["name"] for h in herramientas]
+    nombre = next((n for n in nombres if n in ultimo), nombres[0])
+    return {"contenido": "", "llamadas": [{"id": "falso-1", "nombre": nombre, "argumentos": "{}"}]}
+
+
+async def completar_con_herramientas(
+    mensajes: Mensajes,
+    herramientas: List[Dict[str, Any]],
+    temperature: float = 0.2,
+    max_tokens: int = 4000,
+) -> Dict[str, Any]:
+    """
+    Una vuelta con herramientas ofrecidas al modelo.
+
+    Returns:
+        {"contenido": str, "llamadas": [{"id", "nombre", "argumentos" (JSON)}]}
+    """
+    async with _turno():
+        if es_falso():
+            return _herramientas_falso(mensajes, herramientas)
+        completion = await _obtener_cliente().chat.completions.create(
+            model=MODELO,
+            messages=mensajes,
+            tools=herramientas,
+            tool_choice="auto",
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        mensaje = completion.choices[0].message
+        return {
+            "contenido": mensaje.content or "",
+            "llamadas": [
+                {"id": t.id, "nombre": t.function.name, "argumentos": t.function.arguments}
+                for t in (mensaje.tool_calls or [])
+            ],
+        }
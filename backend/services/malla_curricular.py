@@ -0,0 +1,291 @@
+"""
+Grafo de la malla curricular por carrera, en memoria.
+
+Se arma una vez por carrera a partir de public.materias y
+public.prerequisitos y guarda:
+- prerrequisitos directos y su cierre transitivo
+- "desbloquea": materias que dependen directa o transitivamente de cada una
+- orden topológico (a igual nivel, por semestre y nombre) y nivel de cada
+  materia (la cadena de prerrequisitos más larga que la precede)
+- un bit por materia y la máscara de prerrequisitos directos de cada una,
+  para comparar conjuntos con operaciones de enteros (services/elegibilidad.py)
+- la respuesta de /academico/carreras/{id}/malla ya armada
+
+Así la malla se sirve sin consultas y otros servicios pueden preguntar
+alcanzabilidad sin SQL:
+
+    grafo = await malla_curricular.obtener(conn, carrera_id)
+    grafo.requiere(materia_id, otra_id)
+    grafo.faltantes(materia_id, aprobadas)
+
+Invalidación: triggers sobre materias, prerequisitos y carreras
+(migrations/007_malla_eventos.sql) emiten el evento interno 'malla' y cada
+worker descarta sus grafos (services/eventos.py). MALLA_TTL_SEGUNDOS acota
+lo que se pierda si LISTEN no está disponible.
+
+Si los prerrequisitos forman un ciclo, las materias del ciclo quedan al
+final del orden topológico y se registra una advertencia.
+"""
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Materia:
+    id: int
+    codigo: str
+    nombre: str
+    creditos: int
+    semestre: Optional[int]
+    descripcion: Optional[str]
+
+
+@dataclass
+class GrafoMalla:
+    carrera: Dict[str, Any]
+    materias: Dict[int, Materia]
+    # Prerrequisitos de otras carreras (solo para mostrarlos)
+    externas: Dict[int, Materia]
+    directos: Dict[int, FrozenSet[int]]
+    cierre: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+    desbloquea: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+    desbloquea_total: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+    orden: Tuple[int, ...] = ()
+    nivel: Dict[int, int] = field(default_factory=dict)
+    en_ciclo: FrozenSet[int] = frozenset()
+    # materia_id (propia o externa) -> bit; máscara de prerrequisitos directos
+    bits: Dict[int, int] = field(default_factory=dict)
+    mascara_directos: Dict[int, int] = field(default_factory=dict)
+    respuesta: Dict[str, Any] = field(default_factory=dict)
+
+    def mascara(self, materia_ids: Iterable[int]) -> int:
+        """Máscara de bits de `materia_ids`; las que no son de la malla se ignoran."""
+        mascara = 0
+        for m in materia_ids:
+            mascara |= self.bits.get(m, 0)
+        return mascara
+
+    def requiere(self, materia_id: int, prerequisito_id: int) -> bool:
+        """True si `prerequisito_id` es prerrequisito directo o transitivo."""
+        return prerequisito_id in self.cierre.get(materia_id, frozenset())
+
+    def faltantes(self, materia_id: int, aprobadas: Iterable[int]) -> FrozenSet[int]:
+        """Prerrequisitos directos de `materia_id` que no están en `aprobadas`."""
+        return self.directos.get(materia_id, frozenset()) - frozenset(aprobadas)
+
+    def habilitadas(self, aprobadas: Iterable[int]) -> List[int]:
+        """Materias no aprobadas con todos sus prerrequisitos directos aprobados, en orden."""
+        aprobadas = frozenset(aprobadas)
+        return [
+            m for m in self.orden
+            if m not in aprobadas and self.directos.get(m, frozenset()) <= aprobadas
+        ]
+
+
+def _orden_semestre(m: Materia) -> tuple:
+    return (m.semestre if m.semestre is not None else 0, m.nombre, m.id)
+
+
+def construir(
+    carrera: Dict[str, Any],
+    materias: Iterable[Materia],
+    prerequisitos: Iterable[Tuple[int, int]],
+    externas: Iterable[Materia] = (),
+) -> GrafoMalla:
+    """
+    Args:
+        carrera: fila de public.carreras
+        materias: materias de la carrera
+        prerequisitos: pares (materia_id, prerequisito_id) de esas materias
+        externas: prerrequisitos que pertenecen a otra carrera
+    """
+    por_id = {m.id: m for m in materias}
+    externas_por_id = {m.id: m for m in externas if m.id not in por_id}
+    directos: Dict[int, set] = {m: set() for m in por_id}
+    inversos: Dict[int, set] = {m: set() for m in por_id}
+    for materia_id, prerequisito_id in prerequisitos:
+        if materia_id not in por_id or materia_id == prerequisito_id:
+            continue
+        directos[materia_id].add(prerequisito_id)
+        if prerequisito_id in por_id:
+            inversos[prerequisito_id].add(materia_id)
+
+    # Kahn con desempate por semestre y nombre; solo cuentan las aristas internas
+    pendientes = {m: sum(1 for p in directos[m] if p in por_id) for m in por_id}
+    listos = [(_orden_semestre(por_id[m]), m) for m, n in pendientes.items() if n == 0]
+    heapq.heapify(listos)
+    orden: List[int] = []
+    nivel: Dict[int, int] = {}
+    while listos:
+        _, m = heapq.heappop(listos)
+        orden.append(m)
+        nivel[m] = max((nivel[p] + 1 for p in directos[m] if p in nivel), default=0)
+        for siguiente in inversos[m]:
+            pendientes[siguiente] -= 1
+            if pendientes[siguiente] == 0:
+                heapq.heappush(listos, (_orden_semestre(por_id[siguiente]), siguiente))
+
+    en_ciclo = frozenset(por_id) - frozenset(orden)
+    if en_ciclo:
+        logger.warning(
+            f"⚠️ Ciclo de prerrequisitos en la carrera {carrera.get('id')}: materias {sorted(en_ciclo)}"
+        )
+        restantes = sorted(en_ciclo, key=lambda m: _orden_semestre(por_id[m]))
+        orden.extend(restantes)
+        for m in restantes:
+            nivel[m] = max((nivel.get(p, 0) + 1 for p in directos[m] if p in por_id), default=0)
+
+    # Cierres en orden topológico: cada materia une los cierres de sus directos
+    cierre: Dict[int, FrozenSet[int]] = {}
+    for m in orden:
+        total = set(directos[m])
+        for p in directos[m]:
+            total |= cierre.get(p, frozenset())
+        cierre[m] = frozenset(total)
+    desbloquea_total: Dict[int, set] = {m: set() for m in por_id}
+    for m, prerequisitos_m in cierre.items():
+        for p in prerequisitos_m:
+            if p in desbloquea_total:
+                desbloquea_total[p].add(m)
+
+    # Bits en orden topológico; las externas al final
+    bits = {m: 1 << i for i, m in enumerate(orden + sorted(externas_por_id))}
+    mascara_directos = {}
+    for m, prerequisitos_m in directos.items():
+        mascara = 0
+        for p in prerequisitos_m:
+            mascara |= bits.get(p, 0)
+        mascara_directos[m] = mascara
+
+    grafo = GrafoMalla(
+        carrera=dict(carrera),
+        materias=por_id,
+        externas=externas_por_id,
+        directos={m: frozenset(p) for m, p in directos.items()},
+        cierre=cierre,
+        desbloquea={m: frozenset(d) for m, d in inversos.items()},
+        desbloquea_total={m: frozenset(d) for m, d in desbloquea_total.items()},
+        orden=tuple(orden),
+        nivel=nivel,
+        en_ciclo=en_ciclo,
+        bits=bits,
+        mascara_directos=mascara_directos,
+    )
+    grafo.respuesta = _respuesta(grafo)
+    return grafo
+
+
+def _resumen(grafo: GrafoMalla, ids: Iterable[int]) -> List[Dict[str, Any]]:
+    materias = [grafo.materias.get(i) or grafo.externas.get(i) for i in ids]
+    return [
+        {"id": m.id, "codigo": m.codigo, "nombre": m.nombre}
+        for m in sorted((m for m in materias if m), key=_orden_semestre)
+    ]
+
+
+def _respuesta(grafo: GrafoMalla) -> Dict[str, Any]:
+    """Cuerpo de /academico/carreras/{id}/malla."""
+    semestres: Dict[Any, Dict[str, Any]] = {}
+    for m in sorted(grafo.materias.values(), key=_orden_semestre):
+        semestre = semestres.setdefault(m.semestre, {"numero": m.semestre, "materias": [], "creditos": 0})
+        semestre["materias"].append({
+            "id": m.id,
+            "codigo": m.codigo,
+            "nombre": m.nombre,
+            "creditos": m.creditos,
+            "descripcion": m.descripcion,
+            "prerrequisitos": _resumen(grafo, grafo.directos[m.id]),
+            "prerrequisitos_totales": sorted(grafo.cierre[m.id]),
+            "desbloquea": _resumen(grafo, grafo.desbloquea[m.id]),
+            "desbloquea_totales": sorted(grafo.desbloquea_total[m.id]),
+            "nivel": grafo.nivel[m.id],
+        })
+        semestre["creditos"] += m.creditos or 0
+
+    carrera = grafo.carrera
+    return {
+        "carrera": {
+            "id": carrera['id'],
+            "nombre": carrera['nombre'],
+            "creditos_totales": carrera['creditos_totales'],
+            "precio_credito": float(carrera['precio_credito']) if carrera['precio_credito'] else 0,
+            "duracion_semestres": carrera['duracion_semestres'],
+            "descripcion": carrera['descripcion']
+        },
+        "semestres": list(semestres.values()),
+        "total_creditos": sum(s['creditos'] for s in semestres.values()),
+        "orden_topologico": list(grafo.orden),
+    }
+
+
+def _materia(row) -> Materia:
+    return Materia(
+        id=row['id'], codigo=row['codigo'], nombre=row['nombre'], creditos=row['creditos'] or 0,
+        semestre=row['semestre'], descripcion=row['descripcion'],
+    )
+
+
+async def _cargar(conn, carrera_id: int) -> Optional[GrafoMalla]:
+    carrera = await conn.fetchrow("""
+        SELECT id, nombre, creditos_totales, precio_credito, duracion_semestres, descripcion
+        FROM public.carreras WHERE id = $1
+    """, carrera_id)
+    if not carrera:
+        return None
+    materia_rows = await conn.fetch("""
+        SELECT id, nombre, codigo, creditos, semestre, descripcion
+        FROM public.materias
+        WHERE carrera_id = $1
+    """, carrera_id)
+    prereq_rows = await conn.fetch("""
+        SELECT p.materia_id, pr.id, pr.codigo, pr.nombre, pr.creditos, pr.semestre, pr.descripcion,
+               pr.carrera_id
+        FROM public.prerequisitos p
+        JOIN public.materias pr ON p.prerequisito_id = pr.id
+        JOIN public.materias m  ON p.materia_id = m.id
+        WHERE m.carrera_id = $1
+    """, carrera_id)
+    return construir(
+        dict(carrera),
+        (_materia(r) for r in materia_rows),
+        ((r['materia_id'], r['id']) for r in prereq_rows),
+        (_materia(r) for r in prereq_rows if r['carrera_id'] != carrera_id),
+    )
+
+
+_version = 0
+# carrera_id -> (creado, grafo)
+_grafos: Dict[int, Tuple[float, GrafoMalla]] = {}
+
+
+def invalidar() -> None:
+    global _version
+    _version += 1
+    _grafos.clear()
+
+
+async def obtener(conn, carrera_id: int) -> Optional[GrafoMalla]:
+    """Grafo de la carrera (None si no existe), desde memoria si está vigente."""
+    entrada = _grafos.get(carrera_id)
+    if entrada is not None and time.monotonic() - entrada[0] <= settings.MALLA_TTL_SEGUNDOS:
+        return entrada[1]
+    version = _version
+    inicio = time.perf_counter()
+    grafo = await _cargar(conn, carrera_id)
+    if grafo is None:
+        return None
+    # Si llegó un evento 'malla' mientras se cargaba, no se guarda una foto vieja
+    if version == _version:
+        _grafos[carrera_id] = (time.monotonic(), grafo)
+    logger.info(
+        f"🧭 Malla de la carrera {carrera_id}: {len(grafo.materias)} materias "
+        f"en {(time.perf_counter() - inicio) * 1000:.1f} ms"
+    )
+    return grafo
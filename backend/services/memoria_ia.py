@@ -0,0 +1,176 @@
+"""
+Memoria de conversaciones del chat de IA, guardada en el servidor.
+
+Con `sesion_id` el cliente ya no reenvía el historial: cada turno
+(pregunta + respuesta) se agrega a public.ia_conversaciones y el prompt
+lleva solo el resumen acumulado más los turnos recientes.
+
+Cuando los turnos guardados superan IA_MEMORIA_MAX_TOKENS, una tarea en
+segundo plano pliega los más antiguos en el resumen con el propio modelo y
+deja los últimos IA_MEMORIA_MENSAJES_RECIENTES mensajes. Así el tamaño del
+prompt (y la latencia por turno) no crece con la conversación, y el
+usuario no espera el resumen.
+
+Las conversaciones sin actividad en IA_MEMORIA_DIAS se borran a diario
+(tarea "ia_conversaciones").
+
+    resumen, turnos = await memoria_ia.cargar(conn, user_id, sesion_id)
+    mensajes += memoria_ia.mensajes_previos(resumen, turnos)
+    ...
+    await memoria_ia.guardar_turno(user_id, sesion_id, pregunta, respuesta)
+"""
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Set, Tuple
+
+from config import settings
+from database import get_db
+from services import llm
+from services.contexto_compacto import estimar_tokens
+
+logger = logging.getLogger(__name__)
+
+PROMPT_RESUMEN = """Resume en español la conversación entre un usuario de InfoCampus y Eva, su asistente.
+Conserva datos concretos (materias, notas, montos, fechas, decisiones y pedidos pendientes).
+Máximo 150 palabras, en prosa, sin saludos."""
+
+_resumiendo: Set[Tuple[int, str]] = set()
+_tareas: Set[asyncio.Task] = set()
+
+
+def _tokens(turnos: List[Dict[str, Any]]) -> int:
+    return sum(estimar_tokens(t.get("content") or "") for t in turnos)
+
+
+def _turnos(valor: Any) -> List[Dict[str, Any]]:
+    # Sin codec JSONB registrado, asyncpg devuelve el texto
+    return json.loads(valor) if isinstance(valor, str) else list(valor or [])
+
+
+async def cargar(conn, usuario_id: int, sesion_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+    row = await conn.fetchrow(
+        """
+        SELECT resumen, turnos FROM public.ia_conversaciones
+        WHERE usuario_id = $1 AND sesion_id = $2
+        """,
+        usuario_id, sesion_id,
+    )
+    if not row:
+        return "", []
+    return row["resumen"], _turnos(row["turnos"])
+
+
+def mensajes_previos(resumen: str, turnos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    previos = []
+    if resumen:
+        previos.append({
+            "role": "system",
+            "content": f"Resumen de la conversación anterior con este usuario:\n{resumen}",
+        })
+    previos.extend({"role": t["role"], "content": t["content"]} for t in turnos)
+    return previos
+
+
+async def guardar_turno(usuario_id: int, sesion_id: str, pregunta: str, respuesta: str) -> None:
+    nuevos = [
+        {"role": "user", "content": pregunta},
+        {"role": "assistant", "content": respuesta},
+    ]
+    async with get_db() as conn:
+        tokens = await conn.fetchval(
+            """
+            INSERT INTO public.ia_conversaciones (usuario_id, sesion_id, turnos, tokens_turnos)
+            VALUES ($1, $2, $3::jsonb, $4)
+            ON CONFLICT (usuario_id, sesion_id) DO UPDATE SET
+                turnos = ia_conversaciones.turnos || EXCLUDED.turnos,
+                tokens_turnos = ia_conversaciones.tokens_turnos + EXCLUDED.tokens_turnos,
+                actualizado_en = NOW()
+            RETURNING tokens_turnos
+            """,
+            usuario_id, sesion_id, json.dumps(nuevos, ensure_ascii=False), _tokens(nuevos),
+        )
+    clave = (usuario_id, sesion_id)
+    if tokens > settings.IA_MEMORIA_MAX_TOKENS and clave not in _resumiendo:
+        _resumiendo.add(clave)
+        tarea = asyncio.create_task(_resumir(usuario_id, sesion_id), name=f"memoria_ia:{usuario_id}")
+        _tareas.add(tarea)
+        tarea.add_done_callback(_tareas.discard)
+
+
+async def _resumir(usuario_id: int, sesion_id: str) -> None:
+    try:
+        async with get_db() as conn:
+            row = await conn.fetchrow(
+                """
+                SELECT resumen, turnos, version FROM public.ia_conversaciones
+                WHERE usuario_id = $1 AND sesion_id = $2
+                """,
+                usuario_id, sesion_id,
+            )
+        if not row:
+            return
+        turnos = _turnos(row["turnos"])
+        # Se pliegan pares completos pregunta/respuesta
+        plegar = max(0, len(turnos) - settings.IA_MEMORIA_MENSAJES_RECIENTES)
+        plegar -= plegar % 2
+        if plegar == 0:
+            return
+
+        transcripcion = "\n".join(
+            f"{'Usuario' if t['role'] == 'user' else 'Eva'}: {t['content']}"
+            for t in turnos[:plegar]
+        )
+        if row["resumen"]:
+            transcripcion = f"Resumen previo: {row['resumen']}\n\n{transcripcion}"
+        resumen = await llm.completar(
+            [
+                {"role": "system", "content": PROMPT_RESUMEN},
+                {"role": "user", "content": transcripcion},
+            ],
+            max_tokens=400,
+        )
+
+        # Solo se quitan los mensajes plegados: lo agregado mientras tanto
+        # queda al final del arreglo
+        async with get_db() as conn:
+            actualizado = await conn.fetchval(
+                """
+                UPDATE public.ia_conversaciones SET
+                    resumen = $4,
+                    turnos = COALESCE((
+                        SELECT jsonb_agg(t.e ORDER BY t.n)
+                        FROM jsonb_array_elements(turnos) WITH ORDINALITY AS t(e, n)
+                        WHERE t.n > $5
+                    ), '[]'::jsonb),
+                    tokens_turnos = GREATEST(tokens_turnos - $6, 0),
+                    version = version + 1
+                WHERE usuario_id = $1 AND sesion_id = $2 AND version = $3
+                RETURNING version
+                """,
+                usuario_id, sesion_id, row["version"], resumen.strip(),
+                plegar, _tokens(turnos[:plegar]),
+            )
+        if actualizado is None:
+            logger.info(f"Resumen de conversación {usuario_id}/{sesion_id} descartado: cambió mientras se generaba")
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo resumir la conversación {usuario_id}/{sesion_id}: {e}")
+    finally:
+        _resumiendo.discard((usuario_id, sesion_id))
+
+
+async def borrar(conn, usuario_id: int, sesion_id: str) -> bool:
+    resultado = await conn.execute(
+        "DELETE FROM public.ia_conversaciones WHERE usuario_id = $1 AND sesion_id = $2",
+        usuario_id, sesion_id,
+    )
+    return resultado != "DELETE 0"
+
+
+async def purgar_conversaciones(conn) -> None:
+    """Tarea periódica: borra conversaciones inactivas."""
+    resultado = await conn.execute(
+        "DELETE FROM public.ia_conversaciones WHERE actualizado_en < NOW() - make_interval(days => $1)",
+        settings.IA_MEMORIA_DIAS,
+    )
+    logger.info(f"🧹 Conversaciones de IA purgadas: {resultado}")
@@ -0,0 +1,169 @@
+"""
+Paginación por cursor (keyset) para los listados.
+
+Con LIMIT/OFFSET cada página recorre y descarta todas las filas anteriores,
+y el COUNT(*) exacto se paga en cada pedido. Aquí la página siguiente se
+pide con `cursor`: un token opaco con los valores de la clave de orden de
+la última fila entregada, y la consulta sigue desde ahí con una condición
+sobre esa clave (que los índices de migrations/006_paginacion_keyset.sql
+atienden sin recorrer lo anterior).
+
+El total es opcional (`total`):
+- "exacto": COUNT(*) con los mismos filtros
+- "estimado": estadísticas del planificador (pg_class.reltuples sin
+  filtros; estimación de EXPLAIN con filtros)
+- "no": no se calcula
+Por defecto es "exacto" sin cursor (primera página y `page` heredado) y
+"no" con cursor.
+
+`page` sigue funcionando con OFFSET para los clientes existentes.
+
+    orden = Orden("pagos", (("p.fecha_pago", "fecha_pago", True), ("p.id", "id", True)))
+    condicion, params_cursor = condicion_cursor(orden, cursor, len(params) + 1)
+    ... ORDER BY {orden.sql()} LIMIT {limit + 1} ...
+    rows, siguiente = recortar(orden, rows, limit)
+
+Las columnas de la clave deben ser NOT NULL y terminar en una única (id).
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Literal, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+
+ModoTotal = Literal["exacto", "estimado", "no"]
+
+
+@dataclass(frozen=True)
+class Orden:
+    # Identifica el listado y su orden; un cursor de otro listado se rechaza
+    clave: str
+    # (expresión SQL, campo de la fila con su valor, descendente)
+    columnas: Tuple[Tuple[str, str, bool], ...]
+
+    def sql(self) -> str:
+        return ", ".join(f"{expr} {'DESC' if desc else 'ASC'}" for expr, _, desc in self.columnas)
+
+
+def _a_json(valor: Any) -> Any:
+    if isinstance(valor, datetime):
+        return {"t": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    if isinstance(valor, Decimal):
+        return {"n": str(valor)}
+    return valor
+
+
+def _de_json(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        if "t" in valor:
+            return datetime.fromisoformat(valor["t"])
+        if "d" in valor:
+            return date.fromisoformat(valor["d"])
+        if "n" in valor:
+            return Decimal(valor["n"])
+        raise ValueError("valor de cursor desconocido")
+    return valor
+
+
+def codificar_cursor(orden: Orden, fila) -> str:
+    contenido = {"o": orden.clave, "v": [_a_json(fila[campo]) for _, campo, _ in orden.columnas]}
+    crudo = json.dumps(contenido, separators=(",", ":"), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar_cursor(orden: Orden, cursor: str) -> List[Any]:
+    try:
+        crudo = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        contenido = json.loads(crudo)
+        valores = [_de_json(v) for v in contenido["v"]]
+        if contenido["o"] != orden.clave or len(valores) != len(orden.columnas):
+            raise ValueError("cursor de otro listado")
+        return valores
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+def condicion_cursor(orden: Orden, cursor: Optional[str], primer_param: int) -> Tuple[Optional[str], list]:
+    """
+    Condición WHERE para las filas posteriores al cursor, o (None, []) sin cursor.
+
+    Con todas las columnas en la misma dirección se usa la comparación de
+    filas (a, b, id) > ($1, $2, $3), que Postgres resuelve con un índice
+    sobre esas columnas; con direcciones mixtas se expande a ORs.
+    """
+    if not cursor:
+        return None, []
+    valores = decodificar_cursor(orden, cursor)
+    exprs = [expr for expr, _, _ in orden.columnas]
+    marcas = [f"${primer_param + i}" for i in range(len(exprs))]
+    direcciones = {desc for _, _, desc in orden.columnas}
+
+    if len(direcciones) == 1:
+        op = "<" if direcciones.pop() else ">"
+        return f"({', '.join(exprs)}) {op} ({', '.join(marcas)})", valores
+
+    ramas = []
+    for i, (expr, _, desc) in enumerate(orden.columnas):
+        iguales = [f"{exprs[j]} = {marcas[j]}" for j in range(i)]
+        iguales.append(f"{expr} {'<' if desc else '>'} {marcas[i]}")
+        ramas.append("(" + " AND ".join(iguales) + ")")
+    return "(" + " OR ".join(ramas) + ")", valores
+
+
+def recortar(orden: Orden, filas: Sequence, limit: int) -> Tuple[Sequence, Optional[str]]:
+    """Filas de la página (se pidieron limit + 1) y el cursor de la siguiente."""
+    if len(filas) <= limit:
+        return filas, None
+    filas = filas[:limit]
+    return filas, codificar_cursor(orden, filas[-1])
+
+
+def modo_total(total: Optional[ModoTotal], cursor: Optional[str]) -> ModoTotal:
+    if total is None:
+        return "no" if cursor else "exacto"
+    return total
+
+
+async def contar(conn, modo: str, desde: str, where: str, params: Sequence, tabla: str) -> Optional[int]:
+    """
+    Total del listado según `modo`.
+
+    Args:
+        desde: Cláusula FROM (con JOINs) del conteo
+        where: Condición de los filtros ("" sin filtros)
+        tabla: Tabla principal, para reltuples de pg_class
+    """
+    if modo == "no":
+        return None
+    if modo == "estimado":
+        if not where:
+            estimado = await conn.fetchval(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = $1::regclass", tabla
+            )
+            # -1: la tabla aún no se analizó
+            if estimado is not None and estimado >= 0:
+                return estimado
+        else:
+            plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {desde} WHERE {where}", *params)
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            return int(plan[0]["Plan"]["Plan Rows"])
+    return await conn.fetchval(
+        f"SELECT COUNT(*) FROM {desde}{f' WHERE {where}' if where else ''}", *params
+    )
+
+
+def campos_paginacion(total: Optional[int], page: Optional[int], limit: int, siguiente: Optional[str], modo: str) -> dict:
+    """Campos de paginación comunes a las respuestas de los listados."""
+    return {
+        "total":            total,
+        "total_estimado":   modo == "estimado",
+        "page":             page,
+        "total_pages":      max(1, -(-total // limit)) if total is not None else None,
+        "siguiente_cursor": siguiente,
+    }
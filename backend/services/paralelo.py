@@ -0,0 +1,96 @@
+"""
+Consultas de lectura independientes en paralelo sobre varias conexiones.
+
+    filas, total, deuda = await en_paralelo(
+        conn,
+        fetch("SELECT ... FROM public.pagos WHERE estudiante_id = $1", user_id),
+        fetchrow("SELECT SUM(monto) ...", user_id),
+        fetchrow("SELECT ... deuda ...", user_id),
+    )
+
+La conexión del request (`conn`) siempre participa; además se piden hasta
+PARALELO_MAX_CONEXIONES - 1 conexiones de solo lectura al pool, sin tocar las
+últimas PARALELO_RESERVA_POOL libres. Solo cuentan las conexiones ociosas:
+abrir una nueva (handshake con el servidor) tarda más que
+PARALELO_ESPERA_SEGUNDOS y esa espera se cancelaría. Las consultas salen de
+una cola común: si el pool está saturado o una conexión extra no llega en
+PARALELO_ESPERA_SEGUNDOS, las consultas se ejecutan en serie sobre `conn`.
+La latencia queda cerca de la consulta más lenta.
+
+Solo para lecturas independientes: las conexiones extra no ven lo que la
+transacción de `conn` haya escrito y no confirmado.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, List, Optional
+
+from config import settings
+from database import conexiones_libres, conexiones_ociosas, get_db_readonly
+
+logger = logging.getLogger(__name__)
+
+# Recibe una conexión y devuelve el resultado de la consulta
+Consulta = Callable[[Any], Awaitable[Any]]
+
+
+def fetch(sql: str, *args) -> Consulta:
+    return lambda c: c.fetch(sql, *args)
+
+
+def fetchrow(sql: str, *args) -> Consulta:
+    return lambda c: c.fetchrow(sql, *args)
+
+
+def fetchval(sql: str, *args) -> Consulta:
+    return lambda c: c.fetchval(sql, *args)
+
+
+def _conexiones_extra(pendientes: int, presupuesto: Optional[int]) -> int:
+    presupuesto = settings.PARALELO_MAX_CONEXIONES if presupuesto is None else presupuesto
+    disponibles = min(conexiones_ociosas(), conexiones_libres() - settings.PARALELO_RESERVA_POOL)
+    return max(0, min(presupuesto - 1, pendientes - 1, disponibles))
+
+
+async def en_paralelo(conn, *consultas: Consulta, presupuesto: Optional[int] = None) -> List[Any]:
+    """
+    Ejecuta las consultas y devuelve sus resultados en el mismo orden.
+
+    Args:
+        conn: Conexión del request; ejecuta consultas y es el respaldo en serie
+        consultas: Callables conn -> awaitable (ver fetch/fetchrow/fetchval)
+        presupuesto: Máximo de conexiones a usar, incluida `conn`
+    """
+    resultados: List[Any] = [None] * len(consultas)
+    cola = deque(enumerate(consultas))
+
+    async def _trabajar(c) -> None:
+        while cola:
+            i, consulta = cola.popleft()
+            resultados[i] = await consulta(c)
+
+    async def _trabajar_extra() -> None:
+        obtenida = False
+        try:
+            async with get_db_readonly(timeout=settings.PARALELO_ESPERA_SEGUNDOS) as c:
+                obtenida = True
+                await _trabajar(c)
+        except asyncio.TimeoutError:
+            if obtenida:
+                raise
+            # Pool saturado: lo que quede lo resuelve la conexión del request
+
+    extra = _conexiones_extra(len(consultas), presupuesto)
+    if extra == 0:
+        await _trabajar(conn)
+        return resultados
+
+    try:
+        async with asyncio.TaskGroup() as grupo:
+            grupo.create_task(_trabajar(conn))
+            for _ in range(extra):
+                grupo.create_task(_trabajar_extra())
+    except BaseExceptionGroup as eg:
+        # Se propaga la primera excepción tal cual (HTTPException, errores de asyncpg...)
+        raise eg.exceptions[0]
+    return resultados
@@ -0,0 +1,172 @@
+"""
+Caché de PDFs direccionada por contenido.
+
+La clave de cada documento es el SHA-256 de los datos exactos con los que se
+renderiza. Cuando se registra un pago o cambia una nota, los datos cambian,
+cambia la clave y el PDF anterior simplemente deja de pedirse hasta que la
+expulsión LRU lo borra. No hace falta invalidar nada a mano.
+
+- Almacenamiento en disco compartido por todos los workers de gunicorn.
+- Expulsión LRU por tamaño total (PDF_CACHE_MAX_MB); el mtime del archivo
+  marca el último uso.
+- La clave se expone como ETag para responder 304 a If-None-Match.
+
+Nota: los documentos conservan la fecha de emisión del primer renderizado.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from io import BytesIO
+from typing import Any, Callable, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Súbela cuando cambie el layout de algún documento para no servir PDFs viejos
+PDF_CACHE_VERSION = "1"
+
+_lock = threading.Lock()
+_bytes_totales: Optional[int] = None
+
+
+def _directorio() -> str:
+    path = settings.PDF_CACHE_DIR or os.path.join(tempfile.gettempdir(), "infocampus_pdf_cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _ruta(clave: str) -> str:
+    return os.path.join(_directorio(), f"{clave}.pdf")
+
+
+def calcular_clave(tipo: str, *datos: Any) -> str:
+    """
+    Hash estable de los datos de entrada de un documento.
+
+    Args:
+        tipo: Tipo de documento ('estado_cuenta', 'boletin_notas', ...)
+        *datos: Exactamente los argumentos que recibe el generador del PDF
+
+    Returns:
+        str: SHA-256 en hexadecimal
+    """
+    payload = json.dumps(
+        [PDF_CACHE_VERSION, tipo, datos],
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def etag(clave: str) -> str:
+    return f'"{clave}"'
+
+
+def etag_coincide(if_none_match: Optional[str], clave: str) -> bool:
+    """Evalúa la cabecera If-None-Match contra la clave del documento."""
+    if not if_none_match:
+        return False
+    for valor in if_none_match.split(","):
+        valor = valor.strip()
+        if valor.startswith("W/"):
+            valor = valor[2:]
+        if valor == "*" or valor.strip('"') == clave:
+            return True
+    return False
+
+
+def obtener(clave: str) -> Optional[bytes]:
+    """Devuelve el PDF cacheado (y lo marca como usado) o None."""
+    ruta = _ruta(clave)
+    try:
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        os.utime(ruta, None)
+        return contenido
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"⚠️ No se pudo leer PDF cacheado {clave[:12]}: {e}")
+        return None
+
+
+def guardar(clave: str, contenido: bytes) -> None:
+    """Escribe el PDF de forma atómica y expulsa los más viejos si se excede el límite."""
+    global _bytes_totales
+    try:
+        directorio = _directorio()
+        fd, tmp = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        ruta = _ruta(clave)
+        # Si la clave ya existía, os.replace la sobrescribe: se descuenta su tamaño
+        try:
+            anterior = os.path.getsize(ruta)
+        except FileNotFoundError:
+            anterior = 0
+        os.replace(tmp, ruta)
+    except OSError as e:
+        logger.warning(f"⚠️ No se pudo guardar PDF en caché: {e}")
+        return
+
+    with _lock:
+        if _bytes_totales is None:
+            _bytes_totales = _escanear()[1]
+        else:
+            _bytes_totales += len(contenido) - anterior
+        if _bytes_totales > settings.PDF_CACHE_MAX_MB * 1024 * 1024:
+            _bytes_totales = _expulsar()
+
+
+def _escanear():
+    entradas = []
+    total = 0
+    for nombre in os.listdir(_directorio()):
+        if not nombre.endswith(".pdf"):
+            continue
+        try:
+            st = os.stat(os.path.join(_directorio(), nombre))
+        except OSError:
+            continue
+        entradas.append((st.st_mtime, st.st_size, nombre))
+        total += st.st_size
+    return entradas, total
+
+
+def _expulsar() -> int:
+    """Borra los PDFs menos usados hasta quedar al 90% del límite. Devuelve el total restante."""
+    limite = int(settings.PDF_CACHE_MAX_MB * 1024 * 1024 * 0.9)
+    entradas, total = _escanear()
+    entradas.sort()
+    expulsados = 0
+    for _, tamano, nombre in entradas:
+        if total <= limite:
+            break
+        try:
+            os.remove(os.path.join(_directorio(), nombre))
+            total -= tamano
+            expulsados += 1
+        except OSError:
+            continue
+    if expulsados:
+        logger.info(f"🧹 Caché PDF: {expulsados} documentos expulsados ({total // 1024} KB en uso)")
+    return total
+
+
+def obtener_o_generar(clave: str, generar: Callable[[], BytesIO]) -> bytes:
+    """
+    Devuelve el PDF cacheado para la clave o lo renderiza con `generar`
+    y lo guarda.
+    """
+    contenido = obtener(clave)
+    if contenido is not None:
+        return contenido
+    contenido = generar().getvalue()
+    guardar(clave, contenido)
+    return contenido
@@ -1,13 +1,16 @@
 from io import BytesIO
+from functools import lru_cache
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas as rl_canvas
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, HRFlowable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_JUSTIFY
 from reportlab.lib.units import inch
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, Iterable, List, Optional, Sequence, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,7 +24,9 @@ COLOR_SUCCESS = colors.HexColor('#10b981')
 COLOR_DANGER = colors.HexColor('#ef4444')
 
 
+@lru_cache(maxsize=1)
 def _get_styles():
+    # Se construye una sola vez por proceso: los estilos no se mutan al renderizar
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(
         name='DocTitle',
@@ -46,6 +51,18 @@ def _get_styles():
         alignment=TA_JUSTIFY,
         firstLineIndent=20
     ))
+    styles.add(ParagraphStyle(
+        name='EstadoOk',
+        fontSize=7,
+        fontName='Helvetica-Bold',
+        textColor=COLOR_SUCCESS,
+    ))
+    styles.add(ParagraphStyle(
+        name='EstadoError',
+        fontSize=7,
+        fontName='Helvetica-Bold',
+        textColor=COLOR_DANGER,
+    ))
     return styles
 
 
@@ -66,6 +83,176 @@ def _draw_branding(canvas, doc):
     canvas.restoreState()
 
 
+# Zona útil de las páginas con branding (debajo de la cabecera, encima del pie)
+Y_CONTENIDO_SUPERIOR = letter[1] - 1.3 * inch
+Y_CONTENIDO_INFERIOR = 60
+
+
+@lru_cache(maxsize=8192)
+def _ajustar_texto(texto: str, ancho: float, fuente: str, tamano: float) -> Tuple[str, float]:
+    """
+    Recorta el texto con '…' para que quepa en el ancho dado.
+
+    Returns:
+        Tuple[str, float]: (texto ajustado, ancho resultante). Cacheado porque
+        fechas, métodos y materias se repiten muchísimo en los listados.
+    """
+    ancho_texto = stringWidth(texto, fuente, tamano)
+    if ancho_texto <= ancho:
+        return texto, ancho_texto
+    corte = max(1, int(len(texto) * ancho / ancho_texto))
+    while corte > 1 and stringWidth(texto[:corte] + '…', fuente, tamano) > ancho:
+        corte -= 1
+    recortado = texto[:corte] + '…'
+    return recortado, stringWidth(recortado, fuente, tamano)
+
+
+class TablaCanvas:
+    """
+    Tabla dibujada directamente sobre el canvas, fila a fila.
+
+    A diferencia de platypus `Table`, no calcula el layout de la tabla
+    completa: las columnas tienen ancho fijo, cada fila ocupa una línea
+    (el texto largo se recorta) y el salto de página se decide al vuelo.
+    Las filas pueden llegar por tandas (p. ej. desde un cursor) y solo se
+    conserva en memoria la página en curso.
+
+    Args:
+        c: Canvas de reportlab
+        columnas: Lista de (titulo, ancho, alineacion) con alineacion 'LEFT', 'CENTER' o 'RIGHT'
+        y: Coordenada donde empieza la cabecera en la primera página
+        en_pagina_nueva: Callback(canvas) para dibujar el branding tras cada salto de página
+    """
+
+    def __init__(
+        self,
+        c,
+        columnas: Sequence[Tuple[str, float, str]],
+        y: float,
+        en_pagina_nueva: Optional[Callable] = None,
+        color_encabezado=COLOR_PRIMARY,
+        tamano_fuente: float = 7,
+        alto_fila: float = 12,
+    ):
+        self.c = c
+        self.columnas = list(columnas)
+        self.en_pagina_nueva = en_pagina_nueva
+        self.color_encabezado = color_encabezado
+        self.tamano_fuente = tamano_fuente
+        self.alto_fila = alto_fila
+        self.ancho_total = sum(ancho for _, ancho, _ in self.columnas)
+        self.x = (letter[0] - self.ancho_total) / 2
+        self.filas_dibujadas = 0
+
+        self._bordes_x = [self.x]
+        for _, ancho, _ in self.columnas:
+            self._bordes_x.append(self._bordes_x[-1] + ancho)
+
+        self.y = y
+        self._dibujar_encabezado()
+
+    def _dibujar_encabezado(self) -> None:
+        c = self.c
+        alto = self.alto_fila + 4
+        self._y_segmento = self.y
+        c.setFillColor(self.color_encabezado)
+        c.rect(self.x, self.y - alto, self.ancho_total, alto, fill=1, stroke=0)
+        c.setFillColor(colors.white)
+        c.setFont('Helvetica-Bold', self.tamano_fuente + 1)
+        for (titulo, ancho, _), x in zip(self.columnas, self._bordes_x):
+            c.drawString(x + 3, self.y - alto + 5, _ajustar_texto(titulo, ancho - 6, 'Helvetica-Bold', self.tamano_fuente + 1)[0])
+        self.y -= alto
+        c.setFont('Helvetica', self.tamano_fuente)
+
+    def _cerrar_segmento(self) -> None:
+        """Dibuja la rejilla vertical y el marco de la porción de tabla de esta página."""
+        c = self.c
+        c.setStrokeColor(COLOR_BORDER)
+        c.setLineWidth(0.5)
+        for x in self._bordes_x:
+            c.line(x, self._y_segmento, x, self.y)
+        c.line(self.x, self.y, self.x + self.ancho_total, self.y)
+
+    def _salto_pagina(self) -> None:
+        self._cerrar_segmento()
+        self.c.showPage()
+        if self.en_pagina_nueva:
+            self.en_pagina_nueva(self.c)
+        self.y = Y_CONTENIDO_SUPERIOR
+        self._dibujar_encabezado()
+
+    def fila(self, valores: Sequence[Any], color_texto=None) -> None:
+        c = self.c
+        if self.y - self.alto_fila < Y_CONTENIDO_INFERIOR:
+            self._salto_pagina()
+
+        y_base = self.y - self.alto_fila
+        if self.filas_dibujadas % 2:
+            c.setFillColor(COLOR_BG_LIGHT)
+            c.rect(self.x, y_base, self.ancho_total, self.alto_fila, fill=1, stroke=0)
+        c.setStrokeColor(COLOR_BORDER)
+        c.setLineWidth(0.5)
+        c.line(self.x, y_base, self.x + self.ancho_total, y_base)
+
+        # Un solo objeto de texto por fila: mucho más barato que un drawString por celda
+        y_texto = y_base + (self.alto_fila - self.tamano_fuente) / 2 + 1
+        texto_fila = c.beginText()
+        texto_fila.setFont('Helvetica', self.tamano_fuente)
+        texto_fila.setFillColor(color_texto or COLOR_PRIMARY)
+        for valor, (_, ancho, alineacion), x in zip(valores, self.columnas, self._bordes_x):
+            texto, ancho_texto = _ajustar_texto(str(valor), ancho - 6, 'Helvetica', self.tamano_fuente)
+            if alineacion == 'RIGHT':
+                x_texto = x + ancho - 3 - ancho_texto
+            elif alineacion == 'CENTER':
+                x_texto = x + (ancho - ancho_texto) / 2
+            else:
+                x_texto = x + 3
+            texto_fila.setTextOrigin(x_texto, y_texto)
+            texto_fila.textOut(texto)
+        c.drawText(texto_fila)
+
+        self.y = y_base
+        self.filas_dibujadas += 1
+
+    def agregar_filas(self, filas: Iterable[Sequence[Any]]) -> None:
+        for valores in filas:
+            self.fila(valores)
+
+    def cerrar(self) -> float:
+        """Termina la tabla y devuelve la coordenada y libre debajo de ella."""
+        self._cerrar_segmento()
+        return self.y
+
+    def reservar(self, alto: float) -> float:
+        """Garantiza `alto` puntos libres debajo de la tabla (saltando de página si hace falta)."""
+        if self.y - alto < Y_CONTENIDO_INFERIOR:
+            self.c.showPage()
+            if self.en_pagina_nueva:
+                self.en_pagina_nueva(self.c)
+            self.y = Y_CONTENIDO_SUPERIOR
+        return self.y
+
+
+def _nuevo_canvas(buffer: BytesIO):
+    c = rl_canvas.Canvas(buffer, pagesize=letter)
+    _draw_branding(c, None)
+    return c
+
+
+def _titulo_canvas(c, y: float, titulo: str, subtitulo: Optional[str] = None) -> float:
+    """Título y subtítulo con el mismo aspecto que DocTitle / TechLabel."""
+    c.setFillColor(COLOR_PRIMARY)
+    c.setFont('Helvetica-BoldOblique', 24)
+    c.drawString(40, y - 24, titulo)
+    y -= 36
+    if subtitulo:
+        c.setFillColor(COLOR_ACCENT)
+        c.setFont('Helvetica-Bold', 7)
+        c.drawString(40, y - 7, subtitulo)
+        y -= 14
+    return y - 20
+
+
 def generar_estado_cuenta(
     estudiante: Dict,
     inscripciones: List,
@@ -96,10 +283,7 @@ def generar_estado_cuenta(
         data.append([
             Paragraph(i.get('materia_nombre', 'N/A'), styles['Normal']),
             i.get('periodo_nombre', 'N/A'),
-            Paragraph("PAGADO" if pagado else "PENDIENTE", ParagraphStyle(
-                'st', fontSize=7, fontName='Helvetica-Bold',
-                textColor=COLOR_SUCCESS if pagado else COLOR_DANGER
-            )),
+            Paragraph("PAGADO" if pagado else "PENDIENTE", styles['EstadoOk' if pagado else 'EstadoError']),
             f"${float(i.get('costo', 0)):,.2f}"
         ])
 
@@ -172,48 +356,37 @@ def generar_certificado_inscripcion(
     return buffer
 
 
-def generar_acta_notas_seccion(seccion: Dict, alumnos: List) -> BytesIO:
+def generar_acta_notas_seccion(seccion: Dict, alumnos: Iterable[Dict]) -> BytesIO:
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1.3 * inch)
-    styles = _get_styles()
-    elements = [
-        Paragraph("ACTA OFICIAL DE CALIFICACIONES", styles['DocTitle']),
-        Paragraph(f"MATERIA: {seccion.get('materia_nombre', 'N/A')} | SECCIÓN: {seccion.get('codigo', 'N/A')}", styles['TechLabel']),
-        Spacer(1, 20)
-    ]
-    data = [["#", "CÉDULA", "NOMBRE COMPLETO", "NOTA"]]
+    c = _nuevo_canvas(buffer)
+    y = _titulo_canvas(
+        c, Y_CONTENIDO_SUPERIOR, "ACTA OFICIAL DE CALIFICACIONES",
+        f"MATERIA: {seccion.get('materia_nombre', 'N/A')} | SECCIÓN: {seccion.get('codigo', 'N/A')}"
+    )
+    tabla = TablaCanvas(
+        c,
+        [("#", 0.5 * inch, 'LEFT'), ("CÉDULA", 1.2 * inch, 'LEFT'),
+         ("NOMBRE COMPLETO", 4 * inch, 'LEFT'), ("NOTA", 1 * inch, 'CENTER')],
+        y,
+        en_pagina_nueva=lambda cv: _draw_branding(cv, None),
+    )
     for idx, a in enumerate(alumnos, 1):
         nota = float(a.get('nota_final', 0))
-        data.append([
-            str(idx),
-            a.get('cedula', 'N/A'),
-            Paragraph(a.get('nombre_completo', 'N/A'), styles['Normal']),
-            Paragraph(f"{nota:.1f}", ParagraphStyle(
-                'n', alignment=TA_CENTER,
-                textColor=COLOR_PRIMARY if nota >= 7 else COLOR_DANGER
-            ))
-        ])
-    t = Table(data, colWidths=[0.5 * inch, 1.2 * inch, 4 * inch, 1 * inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), COLOR_PRIMARY),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('GRID', (0, 0), (-1, -1), 0.5, COLOR_BORDER),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, COLOR_BG_LIGHT]),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-    ]))
-    elements.extend([
-        t,
-        Spacer(1, 80),
-        Table(
-            [["_" * 40, "_" * 40], ["FIRMA DEL DOCENTE", "FECHA RECIBIDO"]],
-            colWidths=[3.5 * inch, 3.5 * inch],
-            style=[
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8)
-            ]
+        tabla.fila(
+            [idx, a.get('cedula', 'N/A'), a.get('nombre_completo', 'N/A'), f"{nota:.1f}"],
+            color_texto=COLOR_PRIMARY if nota >= 7 else COLOR_DANGER
         )
-    ])
-    doc.build(elements, onFirstPage=_draw_branding, onLaterPages=_draw_branding)
+    tabla.cerrar()
+
+    y = tabla.reservar(110) - 80
+    c.setFillColor(COLOR_PRIMARY)
+    c.setFont('Helvetica', 8)
+    for x_centro, etiqueta in ((letter[0] / 2 - 1.75 * inch, "FIRMA DEL DOCENTE"),
+                               (letter[0] / 2 + 1.75 * inch, "FECHA RECIBIDO")):
+        c.drawCentredString(x_centro, y, "_" * 40)
+        c.drawCentredString(x_centro, y - 12, etiqueta)
+
+    c.save()
     buffer.seek(0)
     return buffer
 
@@ -235,10 +408,7 @@ def generar_boletin_notas(estudiante: Dict, notas: List, promedio: float) -> Byt
         data.append([
             Paragraph(n.get('materia', 'N/A'), styles['Normal']),
             f"{nota_val:.1f}",
-            Paragraph("APROBADO" if aprobado else "REPROBADO", ParagraphStyle(
-                'res', fontSize=7, fontName='Helvetica-Bold',
-                textColor=COLOR_SUCCESS if aprobado else COLOR_DANGER
-            ))
+            Paragraph("APROBADO" if aprobado else "REPROBADO", styles['EstadoOk' if aprobado else 'EstadoError'])
         ])
     t = Table(data, colWidths=[4 * inch, 1.2 * inch, 1.3 * inch])
     t.setStyle(TableStyle([
@@ -253,44 +423,141 @@ def generar_boletin_notas(estudiante: Dict, notas: List, promedio: float) -> Byt
 
 def generar_reporte_recaudacion(pagos: List, total_recaudado: Decimal, periodo_texto: str) -> BytesIO:
     buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=1.3 * inch)
-    styles = _get_styles()
-    elements = [
-        Paragraph("REPORTE CRÍTICO DE RECAUDACIÓN", styles['DocTitle']),
-        Paragraph(f"PERÍODO ANALIZADO: {periodo_texto}", styles['TechLabel']),
-        Spacer(1, 20)
-    ]
-    resumen_data = [
-        [Paragraph("TOTAL INGRESOS", styles['TechLabel']), Paragraph(f"${float(total_recaudado):,.2f}", styles['DocTitle'])],
-        [Paragraph("TRANSACCIONES", styles['TechLabel']), str(len(pagos))]
-    ]
-    res_t = Table(resumen_data, colWidths=[2 * inch, 4.5 * inch])
-    res_t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), COLOR_BG_LIGHT),
-        ('BOX', (0, 0), (-1, -1), 1, COLOR_BORDER)
-    ]))
-    elements.extend([res_t, Spacer(1, 30)])
-    data = [["FECHA", "ESTUDIANTE", "MÉTODO", "MONTO"]]
+    c = _nuevo_canvas(buffer)
+    y = _titulo_canvas(c, Y_CONTENIDO_SUPERIOR, "REPORTE CRÍTICO DE RECAUDACIÓN", f"PERÍODO ANALIZADO: {periodo_texto}")
+
+    resumen = TablaCanvas(
+        c, [("CONCEPTO", 2 * inch, 'LEFT'), ("VALOR", 4.5 * inch, 'RIGHT')], y,
+        tamano_fuente=9, alto_fila=16,
+    )
+    resumen.fila(["TOTAL INGRESOS", f"${float(total_recaudado):,.2f}"])
+    resumen.fila(["TRANSACCIONES", str(len(pagos))])
+    y = resumen.cerrar() - 30
+
+    tabla = TablaCanvas(
+        c,
+        [("FECHA", 1.2 * inch, 'LEFT'), ("ESTUDIANTE", 3.3 * inch, 'LEFT'),
+         ("MÉTODO", 1 * inch, 'LEFT'), ("MONTO", 1 * inch, 'RIGHT')],
+        y,
+        en_pagina_nueva=lambda cv: _draw_branding(cv, None),
+    )
     for p in pagos:
-        data.append([
+        tabla.fila([
             p.get('fecha', 'N/A')[:10],
-            Paragraph(p.get('estudiante_nombre', 'N/A'), styles['Normal']),
+            p.get('estudiante_nombre', 'N/A'),
             p.get('metodo', 'N/A').upper(),
             f"${float(p.get('monto', 0)):,.2f}"
         ])
-    t = Table(data, colWidths=[1.2 * inch, 3.3 * inch, 1 * inch, 1 * inch])
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), COLOR_PRIMARY),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('GRID', (0, 0), (-1, -1), 0.5, COLOR_BORDER),
-        ('ALIGN', (-1, 0), (-1, -1), 'RIGHT')
-    ]))
-    elements.append(t)
-    doc.build(elements, onFirstPage=_draw_branding, onLaterPages=_draw_branding)
+    tabla.cerrar()
+
+    c.save()
     buffer.seek(0)
     return buffer
 
 
+class ReporteTesoreriaPDF:
+    """
+    Reporte de tesorería con detalle completo de pagos.
+
+    El detalle se alimenta por tandas con `agregar_pagos` (pensado para leer
+    de un cursor sin materializar todas las filas) y `finalizar` devuelve el
+    PDF. Los totales se reciben ya agregados porque van antes del detalle.
+    """
+
+    COLOR_TITULO = colors.HexColor('#1e40af')
+
+    def __init__(
+        self,
+        dias: int,
+        fecha_inicio: datetime,
+        fecha_fin: datetime,
+        total_pagos: int,
+        total_recaudado: Decimal,
+        metodos: List[Dict],
+        emitido_por: str,
+    ):
+        self.buffer = BytesIO()
+        self.emitido_por = emitido_por
+        c = self.c = _nuevo_canvas(self.buffer)
+
+        y = Y_CONTENIDO_SUPERIOR
+        c.setFillColor(self.COLOR_TITULO)
+        c.setFont('Helvetica-Bold', 20)
+        c.drawCentredString(letter[0] / 2, y - 20, "INFO CAMPUS")
+        c.setFillColor(COLOR_PRIMARY)
+        c.setFont('Helvetica-Bold', 14)
+        c.drawCentredString(letter[0] / 2, y - 42, f"Reporte de Tesorería - {dias} días")
+        c.setFont('Helvetica', 10)
+        c.drawString(
+            (letter[0] - 6.5 * inch) / 2, y - 64,
+            f"Período: {fecha_inicio.strftime('%d/%m/%Y')} - {fecha_fin.strftime('%d/%m/%Y')}"
+        )
+        y -= 84
+
+        y = self._subtitulo(y, "RESUMEN")
+        resumen = TablaCanvas(
+            c, [("Concepto", 3 * inch, 'LEFT'), ("Valor", 3.5 * inch, 'RIGHT')], y,
+            color_encabezado=self.COLOR_TITULO, tamano_fuente=9, alto_fila=16,
+        )
+        resumen.fila(["Total de Pagos", str(total_pagos)])
+        resumen.fila(["Total Recaudado", f"${float(total_recaudado):.2f}"])
+        y = resumen.cerrar() - 20
+
+        if metodos:
+            y = self._subtitulo(y, "DESGLOSE POR MÉTODO DE PAGO")
+            desglose = TablaCanvas(
+                c, [("Método", 3 * inch, 'LEFT'), ("Cantidad", 1.5 * inch, 'CENTER'), ("Total", 2 * inch, 'RIGHT')], y,
+                color_encabezado=self.COLOR_TITULO, tamano_fuente=9, alto_fila=16,
+            )
+            for m in metodos:
+                desglose.fila([
+                    m['metodo_pago'].capitalize() if m['metodo_pago'] else 'N/A',
+                    str(m['cantidad']),
+                    f"${float(m['total'] or 0):.2f}"
+                ])
+            y = desglose.cerrar() - 20
+
+        y = self._subtitulo(y, "DETALLE DE PAGOS")
+        self.detalle = TablaCanvas(
+            c,
+            [("Fecha", 1.2 * inch, 'LEFT'), ("Estudiante", 1.8 * inch, 'LEFT'), ("Materia", 1.8 * inch, 'LEFT'),
+             ("Monto", 1 * inch, 'RIGHT'), ("Método", 1.2 * inch, 'CENTER')],
+            y,
+            en_pagina_nueva=lambda cv: _draw_branding(cv, None),
+            color_encabezado=self.COLOR_TITULO,
+        )
+
+    def _subtitulo(self, y: float, texto: str) -> float:
+        self.c.setFillColor(self.COLOR_TITULO)
+        self.c.setFont('Helvetica-Bold', 12)
+        self.c.drawString((letter[0] - 6.5 * inch) / 2, y - 12, texto)
+        return y - 22
+
+    def agregar_pagos(self, pagos: Iterable[Dict]) -> None:
+        for pago in pagos:
+            self.detalle.fila([
+                pago['fecha'],
+                pago['estudiante'],
+                pago['materia'],
+                f"${pago['monto']:.2f}",
+                pago['metodo']
+            ])
+
+    def finalizar(self) -> BytesIO:
+        self.detalle.cerrar()
+        y = self.detalle.reservar(50) - 30
+        c = self.c
+        c.setFillColor(COLOR_SECONDARY)
+        c.setFont('Helvetica', 8)
+        c.drawCentredString(
+            letter[0] / 2, y,
+            f"Documento generado el {datetime.now().strftime('%d/%m/%Y %H:%M')} por {self.emitido_por}"
+        )
+        c.save()
+        self.buffer.seek(0)
+        return self.buffer
+
+
 def generar_recibo_pago_individual(pago: Dict, estudiante: Dict) -> BytesIO:
     buffer = BytesIO()
     doc = SimpleDocTemplate(
@@ -358,10 +625,7 @@ def generar_historial_academico(estudiante: Dict, historia_completa: List) -> By
             Paragraph(m.get('nombre_materia', 'N/A'), styles['Normal']),
             str(m.get('creditos', '0')),
             f"{nota:.1f}",
-            Paragraph(estado, ParagraphStyle(
-                'es', fontSize=7, fontName='Helvetica-Bold',
-                textColor=COLOR_SUCCESS if nota >= 7 else COLOR_DANGER
-            ))
+            Paragraph(estado, styles['EstadoOk' if nota >= 7 else 'EstadoError'])
         ])
     t = Table(data, colWidths=[0.8 * inch, 3.4 * inch, 0.5 * inch, 0.8 * inch, 1 * inch])
     t.setStyle(TableStyle([
@@ -381,4 +645,121 @@ def generar_historial_academico(estudiante: Dict, historia_completa: List) -> By
     ])
     doc.build(elements, onFirstPage=_draw_branding, onLaterPages=_draw_branding)
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+
+def generar_boletin_calificaciones(estudiante: Dict, materias: List) -> BytesIO:
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    styles = getSampleStyleSheet()
+
+    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=22,
+                                 textColor=colors.HexColor('#1e40af'), spaceAfter=6, alignment=TA_CENTER)
+    subtitle_style = ParagraphStyle('Subtitle', parent=styles['Heading2'], fontSize=13,
+                                    textColor=colors.HexColor('#374151'), spaceAfter=20, alignment=TA_CENTER)
+    header_style = ParagraphStyle('Header', parent=styles['Heading3'], fontSize=11,
+                                  textColor=colors.HexColor('#1e40af'), spaceAfter=6)
+    normal_style = ParagraphStyle('Normal2', parent=styles['Normal'], fontSize=10, spaceAfter=4)
+
+    elements = []
+    elements.append(Paragraph("INFO CAMPUS", title_style))
+    elements.append(Paragraph("Boletín de Notas", subtitle_style))
+
+    nombre_completo = f"{estudiante.get('first_name', '')} {estudiante.get('last_name', '')}".strip()
+
+    info_data = [
+        ['Campo', 'Valor'],
+        ['Estudiante', nombre_completo],
+        ['Cédula', estudiante.get('cedula', 'N/A')],
+        ['Carrera', estudiante.get('carrera_nombre', 'N/A')],
+        ['Semestre Actual', str(estudiante.get('semestre_actual', 'N/A'))],
+        ['Promedio Acumulado', f"{float(estudiante['promedio_acumulado']):.2f}" if estudiante.get('promedio_acumulado') else 'N/A'],
+        ['Fecha de Emisión', datetime.now().strftime('%d/%m/%Y %H:%M')],
+    ]
+
+    info_table = Table(info_data, colWidths=[2.5*inch, 4*inch])
+    info_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f3f4f6')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('TOPPADDING', (0, 1), (-1, -1), 5),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 5),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ]))
+    elements.append(info_table)
+    elements.append(Spacer(1, 20))
+
+    periodos_vistos = []
+    for m in materias:
+        if m['periodo_codigo'] not in periodos_vistos:
+            periodos_vistos.append(m['periodo_codigo'])
+
+    for periodo_codigo in periodos_vistos:
+        materias_periodo = [m for m in materias if m['periodo_codigo'] == periodo_codigo]
+        if not materias_periodo:
+            continue
+
+        periodo_nombre = materias_periodo[0]['periodo_nombre']
+        elements.append(Paragraph(f"<b>{periodo_nombre}</b>", header_style))
+
+        tabla_data = [['Materia', 'Sec.', 'P1\n(25%)', 'P2\n(25%)', 'Tall.\n(20%)', 'Final\n(30%)', 'Nota\nFinal', 'Estado']]
+
+        for m in materias_periodo:
+            eval_map = {ev['tipo']: ev['nota'] for ev in m['evaluaciones'] if ev['nota'] is not None}
+            p1 = f"{eval_map['parcial_1']:.1f}" if eval_map.get('parcial_1') is not None else '-'
+            p2 = f"{eval_map['parcial_2']:.1f}" if eval_map.get('parcial_2') is not None else '-'
+            talleres = f"{eval_map['talleres']:.1f}" if eval_map.get('talleres') is not None else '-'
+            examen = f"{eval_map['examen_final']:.1f}" if eval_map.get('examen_final') is not None else '-'
+            nota_final = f"{m['nota_final']:.2f}" if m['nota_final'] is not None else '-'
+
+            estado_display = {
+                'aprobado': 'Aprobado',
+                'reprobado': 'Reprobado',
+                'activo': 'En Curso',
+                'inscrito': 'Inscrito',
+                'retirado': 'Retirado'
+            }.get(m['estado'], m['estado'])
+
+            tabla_data.append([
+                m['materia_nombre'][:28],
+                m['seccion'],
+                p1, p2, talleres, examen,
+                nota_final,
+                estado_display
+            ])
+
+        notas_table = Table(tabla_data, colWidths=[2.1*inch, 0.4*inch, 0.55*inch, 0.55*inch, 0.55*inch, 0.55*inch, 0.6*inch, 0.7*inch])
+        notas_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 8),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (0, 1), (0, -1), 'LEFT'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('TOPPADDING', (0, 0), (-1, 0), 8),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#f9fafb'), colors.white]),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('TOPPADDING', (0, 1), (-1, -1), 5),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 5),
+        ]))
+        elements.append(notas_table)
+        elements.append(Spacer(1, 16))
+
+    elements.append(Spacer(1, 20))
+    elements.append(Paragraph("_" * 60, normal_style))
+    elements.append(Paragraph(
+        f"<para alignment='center' fontSize='8'>Documento oficial generado el {datetime.now().strftime('%d/%m/%Y %H:%M')} · Info Campus ERP</para>",
+        normal_style
+    ))
+
+    doc.build(elements)
+    buffer.seek(0)
+    return buffer
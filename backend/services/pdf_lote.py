@@ -0,0 +1,344 @@
+"""
+Generación masiva de certificados de inscripción y boletines de notas.
+
+- Los datos se leen por lotes con paginación keyset (`id > $ultimo`), una o
+  dos consultas por lote, nunca una por documento. Cada lote usa su propia
+  conexión del pool y la libera antes de renderizar.
+- Los PDFs se renderizan en un ProcessPoolExecutor (reportlab es CPU puro y
+  bloquearía el event loop).
+- El ZIP se escribe sobre un stream sin seek y se entrega por trozos a
+  medida que cada documento termina.
+- Memoria acotada: como mucho un lote de datos y 4 × PDF_LOTE_WORKERS PDFs a
+  la vez, sin importar cuántos documentos tenga el ZIP.
+"""
+import asyncio
+import logging
+import multiprocessing
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from config import settings
+from database import get_db
+from services.pdf_generator import generar_boletin_calificaciones, generar_certificado_inscripcion
+
+logger = logging.getLogger(__name__)
+
+TIPOS_LOTE = ('certificados', 'boletines')
+
+TAMANO_LOTE = 200
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: los workers no heredan el pool asyncpg ni el event loop del proceso padre
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_LOTE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        logger.info(f"✅ Pool de renderizado PDF iniciado ({settings.PDF_LOTE_WORKERS} procesos)")
+    return _pool
+
+
+def cerrar_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _renderizar(tipo: str, args: Tuple) -> bytes:
+    """Se ejecuta en el proceso worker; devuelve el PDF ya serializado."""
+    if tipo == 'certificados':
+        return generar_certificado_inscripcion(*args).getvalue()
+    return generar_boletin_calificaciones(*args).getvalue()
+
+
+def agrupar_materias_boletin(rows) -> Dict[int, Dict[str, Any]]:
+    """
+    Agrupa filas inscripción × evaluación en materias con sus evaluaciones.
+
+    Returns:
+        Dict[int, Dict]: materias por inscripcion_id, en el orden de las filas
+    """
+    materias_dict = {}
+    for row in rows:
+        r = dict(row)
+        iid = r['inscripcion_id']
+        if iid not in materias_dict:
+            materias_dict[iid] = {
+                'materia_nombre': r['materia_nombre'],
+                'materia_codigo': r['materia_codigo'],
+                'creditos': r['creditos'],
+                'semestre': r['semestre'],
+                'seccion': r['seccion_codigo'],
+                'periodo_nombre': r['periodo_nombre'],
+                'periodo_codigo': r['periodo_codigo'],
+                'nota_final': float(r['nota_final']) if r['nota_final'] else None,
+                'estado': r['estado'],
+                'evaluaciones': []
+            }
+        if r['tipo_evaluacion']:
+            materias_dict[iid]['evaluaciones'].append({
+                'tipo': r['tipo_evaluacion'],
+                'nota': float(r['nota_parcial']) if r['nota_parcial'] else None,
+                'peso': float(r['peso_porcentual']) if r['peso_porcentual'] else None
+            })
+    return materias_dict
+
+
+async def _lotes_certificados(
+    seccion_id: Optional[int],
+    carrera_id: Optional[int],
+    periodo_id: Optional[int],
+) -> AsyncIterator[List[Tuple[str, Tuple]]]:
+    ultimo_id = 0
+    while True:
+        async with get_db() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT
+                    i.id,
+                    u.id as estudiante_id,
+                    u.cedula as estudiante_cedula,
+                    u.first_name as estudiante_first_name,
+                    u.last_name as estudiante_last_name,
+                    m.nombre as materia_nombre,
+                    m.codigo as materia_codigo,
+                    m.creditos,
+                    s.codigo as codigo_seccion,
+                    s.aula,
+                    p.nombre as periodo_nombre,
+                    p.codigo as periodo_codigo,
+                    c.nombre as carrera_nombre,
+                    c.codigo as carrera_codigo
+                FROM public.inscripciones i
+                JOIN public.usuarios u ON i.estudiante_id = u.id
+                JOIN public.secciones s ON i.seccion_id = s.id
+                JOIN public.materias m ON s.materia_id = m.id
+                JOIN public.periodos_lectivos p ON s.periodo_id = p.id
+                LEFT JOIN public.carreras c ON u.carrera_id = c.id
+                WHERE i.id > $1
+                  AND ($2::int IS NULL OR s.id = $2)
+                  AND ($3::int IS NULL OR u.carrera_id = $3)
+                  AND ($4::int IS NULL OR s.periodo_id = $4)
+                ORDER BY i.id
+                LIMIT $5
+                """,
+                ultimo_id, seccion_id, carrera_id, periodo_id, TAMANO_LOTE,
+            )
+        if not rows:
+            return
+
+        documentos = []
+        for row in rows:
+            r = dict(row)
+            estudiante = {
+                'id': r['estudiante_id'],
+                'cedula': r['estudiante_cedula'],
+                'first_name': r['estudiante_first_name'],
+                'last_name': r['estudiante_last_name']
+            }
+            inscripcion = {
+                'id': r['id'],
+                'materia_nombre': r['materia_nombre'],
+                'materia_codigo': r['materia_codigo'],
+                'seccion_codigo': r['codigo_seccion'],
+                'periodo_nombre': r['periodo_nombre'],
+                'periodo_codigo': r['periodo_codigo'],
+                'creditos': r['creditos'],
+                'aula': r['aula']
+            }
+            carrera = {
+                'nombre': r['carrera_nombre'] or 'N/A',
+                'codigo': r['carrera_codigo'] or 'N/A'
+            } if r.get('carrera_nombre') else None
+            nombre = f"certificados/{r['estudiante_cedula']}_{r['materia_codigo']}_{r['id']}.pdf"
+            documentos.append((nombre, (estudiante, inscripcion, carrera)))
+
+        yield documentos
+        ultimo_id = rows[-1]['id']
+
+
+async def _lotes_boletines(
+    seccion_id: Optional[int],
+    carrera_id: Optional[int],
+    periodo_id: Optional[int],
+) -> AsyncIterator[List[Tuple[str, Tuple]]]:
+    ultimo_id = 0
+    while True:
+        async with get_db() as conn:
+            estudiantes = await conn.fetch(
+                """
+                SELECT
+                    u.id, u.cedula, u.first_name, u.last_name, u.email,
+                    u.semestre_actual, u.promedio_acumulado,
+                    c.nombre as carrera_nombre, c.codigo as carrera_codigo
+                FROM public.usuarios u
+                LEFT JOIN public.carreras c ON u.carrera_id = c.id
+                WHERE u.rol = 'estudiante'
+                  AND u.id > $1
+                  AND ($2::int IS NULL OR EXISTS (
+                      SELECT 1 FROM public.inscripciones i
+                      WHERE i.estudiante_id = u.id AND i.seccion_id = $2))
+                  AND ($3::int IS NULL OR u.carrera_id = $3)
+                  AND ($4::int IS NULL OR EXISTS (
+                      SELECT 1 FROM public.inscripciones i
+                      JOIN public.secciones s ON i.seccion_id = s.id
+                      WHERE i.estudiante_id = u.id AND s.periodo_id = $4))
+                ORDER BY u.id
+                LIMIT $5
+                """,
+                ultimo_id, seccion_id, carrera_id, periodo_id, TAMANO_LOTE,
+            )
+            if not estudiantes:
+                return
+
+            rows = await conn.fetch(
+                """
+                SELECT
+                    i.estudiante_id,
+                    i.id as inscripcion_id,
+                    i.nota_final,
+                    i.estado,
+                    m.nombre as materia_nombre,
+                    m.codigo as materia_codigo,
+                    m.creditos,
+                    m.semestre,
+                    s.codigo as seccion_codigo,
+                    p.nombre as periodo_nombre,
+                    p.codigo as periodo_codigo,
+                    ev.tipo_evaluacion,
+                    ev.nota as nota_parcial,
+                    ev.peso_porcentual
+                FROM public.inscripciones i
+                JOIN public.secciones s ON i.seccion_id = s.id
+                JOIN public.materias m ON s.materia_id = m.id
+                JOIN public.periodos_lectivos p ON s.periodo_id = p.id
+                LEFT JOIN public.evaluaciones_parciales ev ON ev.inscripcion_id = i.id
+                WHERE i.estudiante_id = ANY($1::int[])
+                ORDER BY i.estudiante_id, p.codigo DESC, m.semestre, m.nombre, ev.tipo_evaluacion
+                """,
+                [e['id'] for e in estudiantes],
+            )
+
+        filas_por_estudiante: Dict[int, list] = {}
+        for row in rows:
+            filas_por_estudiante.setdefault(row['estudiante_id'], []).append(row)
+
+        documentos = []
+        for est in estudiantes:
+            est_dict = dict(est)
+            materias = list(agrupar_materias_boletin(filas_por_estudiante.get(est_dict['id'], [])).values())
+            documentos.append((f"boletines/{est_dict['cedula']}.pdf", (est_dict, materias)))
+
+        yield documentos
+        ultimo_id = estudiantes[-1]['id']
+
+
+class _SalidaZip:
+    """Destino de solo escritura (sin seek) que acumula lo que escribe zipfile."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._partes.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def vaciar(self) -> bytes:
+        contenido = b"".join(self._partes)
+        self._partes.clear()
+        return contenido
+
+
+async def contar_documentos(
+    conn,
+    tipo: str,
+    seccion_id: Optional[int] = None,
+    carrera_id: Optional[int] = None,
+    periodo_id: Optional[int] = None,
+) -> int:
+    """Cuenta los documentos que generaría el lote (para validar antes de hacer streaming)."""
+    if tipo == 'certificados':
+        sql = """
+            SELECT COUNT(*)
+            FROM public.inscripciones i
+            JOIN public.usuarios u ON i.estudiante_id = u.id
+            JOIN public.secciones s ON i.seccion_id = s.id
+            WHERE ($1::int IS NULL OR s.id = $1)
+              AND ($2::int IS NULL OR u.carrera_id = $2)
+              AND ($3::int IS NULL OR s.periodo_id = $3)
+        """
+    else:
+        sql = """
+            SELECT COUNT(*)
+            FROM public.usuarios u
+            WHERE u.rol = 'estudiante'
+              AND ($1::int IS NULL OR EXISTS (
+                  SELECT 1 FROM public.inscripciones i
+                  WHERE i.estudiante_id = u.id AND i.seccion_id = $1))
+              AND ($2::int IS NULL OR u.carrera_id = $2)
+              AND ($3::int IS NULL OR EXISTS (
+                  SELECT 1 FROM public.inscripciones i
+                  JOIN public.secciones s ON i.seccion_id = s.id
+                  WHERE i.estudiante_id = u.id AND s.periodo_id = $3))
+        """
+    return await conn.fetchval(sql, seccion_id, carrera_id, periodo_id)
+
+
+async def generar_zip(
+    tipo: str,
+    seccion_id: Optional[int] = None,
+    carrera_id: Optional[int] = None,
+    periodo_id: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Genera el ZIP del lote como iterador asíncrono de trozos de bytes.
+
+    Los PDFs se escriben en el ZIP en el mismo orden en que se leyeron,
+    manteniendo como máximo 4 × PDF_LOTE_WORKERS renderizados pendientes.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _obtener_pool()
+    en_vuelo = max(1, settings.PDF_LOTE_WORKERS * 4)
+    lotes = _lotes_certificados if tipo == 'certificados' else _lotes_boletines
+
+    salida = _SalidaZip()
+    # Los PDFs de reportlab ya van comprimidos: ZIP_STORED evita gastar CPU del event loop
+    zf = zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_STORED)
+    pendientes: deque = deque()
+    total = 0
+    inicio = datetime.now()
+
+    async def _escribir_siguiente() -> bytes:
+        nombre, futuro = pendientes.popleft()
+        zf.writestr(nombre, await futuro)
+        return salida.vaciar()
+
+    try:
+        async for documentos in lotes(seccion_id, carrera_id, periodo_id):
+            for nombre, args in documentos:
+                pendientes.append((nombre, loop.run_in_executor(pool, _renderizar, tipo, args)))
+                total += 1
+                if len(pendientes) >= en_vuelo:
+                    yield await _escribir_siguiente()
+
+        while pendientes:
+            yield await _escribir_siguiente()
+
+        zf.close()
+        yield salida.vaciar()
+        logger.info(f"📦 Lote {tipo}: {total} PDFs en {(datetime.now() - inicio).total_seconds():.1f}s")
+    finally:
+        # Cliente desconectado o error: no seguir renderizando documentos que nadie recibirá
+        for _, futuro in pendientes:
+            futuro.cancel()
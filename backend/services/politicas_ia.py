@@ -0,0 +1,336 @@
+"""
+Respuestas locales a preguntas sobre políticas institucionales.
+
+Muchas preguntas del chat ("¿con qué nota se aprueba?", "¿cuánto es el
+interés por mora?") se responden con un valor de public.configuracion_ia.
+Aquí se arma un índice TF-IDF sobre plantillas de preguntas frecuentes y
+sobre cada entrada de configuracion_ia; si la pregunta coincide con alta
+confianza se responde directo, sin llamar al modelo.
+
+Todo es local (sin red ni dependencias): tokens sin tildes, sin palabras
+vacías y con un recorte simple de plurales. Las preguntas en primera
+persona ("¿cuáles son mis notas?", "¿cuánto debo?") van siempre al modelo:
+piden datos del estudiante, que el modelo tiene en su contexto. Cada variante de pregunta es
+un documento; una entrada puntúa con su mejor variante. Se responde solo
+si el mejor puntaje supera IA_POLITICAS_UMBRAL y le saca
+IA_POLITICAS_MARGEN a la mejor entrada distinta.
+
+El índice se construye la primera vez que se usa y se descarta con cada
+evento 'configuracion' (director_router.actualizar_configuracion), así
+todos los workers lo reconstruyen con los valores nuevos.
+
+Precisión y latencia: python -m benchmarks.politicas_benchmark
+"""
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import settings
+from database import get_db_readonly
+
+logger = logging.getLogger(__name__)
+
+PALABRAS_VACIAS = frozenset("""
+a al algo ante cada como con cual cuales cuando de del donde el ella en es esa
+ese eso esta este esto estos ha hay la las le les lo los muy no nos
+o para pero por que quien se si sin sobre son su sus te un una unas uno
+unos y ya cuanto cuanta cuantos cuantas puedo puede saber quiero dime decir
+favor hola necesito tiene tienen
+""".split())
+
+# Marcas de primera persona: la pregunta es sobre los datos de quien pregunta
+PALABRAS_PERSONALES = frozenset("mi mis me yo tengo debo".split())
+
+METODOS_PAGO_POR_DEFECTO = "efectivo, transferencia, tarjeta de débito y tarjeta de crédito"
+
+
+@dataclass(frozen=True)
+class Plantilla:
+    nombre: str
+    preguntas: Tuple[str, ...]
+    respuesta: str
+    # Claves de configuracion_ia que usa la respuesta
+    requiere: Tuple[str, ...] = ()
+
+
+FAQ: Tuple[Plantilla, ...] = (
+    Plantilla(
+        "nota_minima",
+        (
+            "cuál es la nota mínima para aprobar",
+            "con qué nota se aprueba una materia",
+            "nota de aprobación",
+            "cuánto necesito sacar para pasar la materia",
+        ),
+        "La nota mínima de aprobación es {reglas_nota_minima} sobre 10. "
+        "Con una nota final menor la materia queda reprobada al cerrar el ciclo.",
+        ("reglas_nota_minima",),
+    ),
+    Plantilla(
+        "asistencia_minima",
+        (
+            "cuál es el porcentaje mínimo de asistencia",
+            "cuántas faltas se permiten",
+            "asistencia requerida para no perder la materia",
+            "qué pasa si falto mucho a clases",
+        ),
+        "Se exige al menos un {reglas_asistencia_minima}% de asistencia en cada materia; "
+        "por debajo de ese porcentaje se corre riesgo de perderla.",
+        ("reglas_asistencia_minima",),
+    ),
+    Plantilla(
+        "interes_mora",
+        (
+            "cuál es el interés por mora",
+            "recargo por pagar tarde",
+            "cuánto cobran de interés si me atraso en el pago",
+        ),
+        "El interés por mora es del {financiero_interes_mora}% mensual sobre la deuda vencida.",
+        ("financiero_interes_mora",),
+    ),
+    Plantilla(
+        "dias_gracia",
+        (
+            "cuántos días de gracia hay para pagar",
+            "plazo para pagar la matrícula",
+            "cuánto tiempo hay para pagar después de inscribirse",
+            "cuándo entro en mora",
+        ),
+        "Después de inscribirte tienes un plazo de gracia para pagar que depende de la carrera"
+        "{dias_gracia_por_carrera}. Pasado ese plazo, o si debes materias de un período anterior, "
+        "la cuenta entra en mora salvo que tengas un convenio de pago vigente.",
+    ),
+    Plantilla(
+        "metodos_pago",
+        (
+            "qué métodos de pago aceptan",
+            "cómo puedo pagar",
+            "formas de pago",
+            "se puede pagar con tarjeta o transferencia",
+            "pago por transferencia bancaria o en efectivo",
+        ),
+        "Se aceptan pagos en {financiero_metodos_pago}.",
+    ),
+    Plantilla(
+        "becas",
+        (
+            "cómo funcionan las becas",
+            "cuánto descuenta la beca",
+            "descuento por beca en la matrícula",
+        ),
+        "La beca descuenta su porcentaje del costo de cada materia inscrita "
+        "(créditos × precio del crédito de la carrera). Por ejemplo, con beca del 50% "
+        "cada materia cuesta la mitad.",
+    ),
+    Plantilla(
+        "contacto",
+        (
+            "cuál es el teléfono de la institución",
+            "correo de contacto",
+            "cómo me comunico con la universidad",
+            "dónde queda la universidad dirección",
+        ),
+        "Puedes contactar a {institucion_nombre} al teléfono {info_telefono}, "
+        "por correo a {info_email_contacto} o en {info_direccion}.",
+        ("institucion_nombre", "info_telefono", "info_email_contacto", "info_direccion"),
+    ),
+    Plantilla(
+        "rector",
+        ("quién es el rector", "nombre del rector de la universidad"),
+        "El rector de {institucion_nombre} es {institucion_rector}.",
+        ("institucion_nombre", "institucion_rector"),
+    ),
+    Plantilla(
+        "mision",
+        ("cuál es la misión de la institución", "misión institucional"),
+        "La misión de {institucion_nombre} es: {institucion_mision}",
+        ("institucion_nombre", "institucion_mision"),
+    ),
+    Plantilla(
+        "fundacion",
+        ("cuándo se fundó la universidad", "fecha de fundación", "en qué año se fundó"),
+        "{institucion_nombre} fue fundada el {info_fundacion}.",
+        ("institucion_nombre", "info_fundacion"),
+    ),
+)
+
+
+def _raiz(palabra: str) -> str:
+    if len(palabra) > 4 and palabra.endswith("es"):
+        return palabra[:-2]
+    if len(palabra) > 3 and palabra.endswith("s"):
+        return palabra[:-1]
+    return palabra
+
+
+def _palabras(texto: str) -> List[str]:
+    sin_tildes = unicodedata.normalize("NFKD", texto.lower()).encode("ascii", "ignore").decode()
+    return re.findall(r"[a-z0-9]+", sin_tildes)
+
+
+def tokenizar(texto: str) -> List[str]:
+    return [_raiz(p) for p in _palabras(texto) if p not in PALABRAS_VACIAS]
+
+
+def es_personal(pregunta: str) -> bool:
+    """True si la pregunta está en primera persona (mi, mis, me, tengo, debo...)."""
+    return any(p in PALABRAS_PERSONALES for p in _palabras(pregunta))
+
+
+@dataclass(frozen=True)
+class Resultado:
+    nombre: str
+    respuesta: str
+    puntaje: float
+    margen: float
+
+
+class Indice:
+    """Índice TF-IDF en memoria: variantes de pregunta → entrada."""
+
+    def __init__(self, entradas: Sequence[Tuple[str, Iterable[str], str]]):
+        # entradas: (nombre, variantes de pregunta, respuesta ya resuelta)
+        self._respuestas: Dict[str, str] = {}
+        documentos: List[Tuple[str, Counter]] = []
+        for nombre, variantes, respuesta in entradas:
+            self._respuestas[nombre] = respuesta
+            for variante in variantes:
+                tokens = tokenizar(variante)
+                if tokens:
+                    documentos.append((nombre, Counter(tokens)))
+
+        frecuencia = Counter(t for _, tf in documentos for t in tf)
+        total = len(documentos)
+        self._idf = {t: math.log((1 + total) / (1 + df)) + 1 for t, df in frecuencia.items()}
+        # Las palabras de la pregunta que no están en el índice pesan como
+        # las más raras: "¿cuántas faltas tengo en física?" no es la política
+        # de asistencia aunque comparta "faltas"
+        self._idf_desconocida = math.log(1 + total) + 1
+        self._documentos = [(nombre, self._vector(tf)) for nombre, tf in documentos]
+
+    def _vector(self, tf: Counter) -> Dict[str, float]:
+        pesos = {
+            t: (1 + math.log(n)) * self._idf.get(t, self._idf_desconocida)
+            for t, n in tf.items()
+        }
+        norma = math.sqrt(sum(p * p for p in pesos.values())) or 1.0
+        return {t: p / norma for t, p in pesos.items()}
+
+    def __len__(self) -> int:
+        return len(self._respuestas)
+
+    def buscar(self, pregunta: str) -> Optional[Resultado]:
+        consulta = self._vector(Counter(tokenizar(pregunta)))
+        if not consulta:
+            return None
+        mejores: Dict[str, float] = {}
+        for nombre, doc in self._documentos:
+            puntaje = sum(p * doc.get(t, 0.0) for t, p in consulta.items())
+            if puntaje > mejores.get(nombre, 0.0):
+                mejores[nombre] = puntaje
+        if not mejores:
+            return None
+        orden = sorted(mejores.items(), key=lambda kv: kv[1], reverse=True)
+        nombre, puntaje = orden[0]
+        segundo = orden[1][1] if len(orden) > 1 else 0.0
+        return Resultado(nombre, self._respuestas[nombre], puntaje, puntaje - segundo)
+
+    def responder(self, pregunta: str, umbral: float, margen: float) -> Optional[Resultado]:
+        """Entrada con confianza suficiente, o None (siempre None en primera persona)."""
+        if es_personal(pregunta):
+            return None
+        resultado = self.buscar(pregunta)
+        if resultado and resultado.puntaje >= umbral and resultado.margen >= margen:
+            return resultado
+        return None
+
+
+def construir_indice(
+    politicas: Dict[str, str],
+    descripciones: Optional[Dict[str, str]] = None,
+    dias_gracia: Sequence[Tuple[str, Optional[int]]] = (),
+) -> Indice:
+    """
+    Args:
+        politicas: clave → valor de configuracion_ia
+        descripciones: clave → descripción de configuracion_ia
+        dias_gracia: (carrera, dias_gracia_pago) de cada carrera
+    """
+    descripciones = descripciones or {}
+    valores = dict(politicas)
+    valores.setdefault("financiero_metodos_pago", METODOS_PAGO_POR_DEFECTO)
+    # Mismo valor por defecto que el contexto de IA
+    detalle = ", ".join(f"{c}: {d or 10} días" for c, d in dias_gracia)
+    valores["dias_gracia_por_carrera"] = f" ({detalle})" if detalle else " (10 días por defecto)"
+
+    entradas: List[Tuple[str, Iterable[str], str]] = []
+    usadas = set()
+    for p in FAQ:
+        if all(valores.get(c) for c in p.requiere):
+            entradas.append((p.nombre, p.preguntas, p.respuesta.format(**valores)))
+            usadas.update(p.requiere)
+
+    # Claves sin plantilla: se indexan por su descripción y nombre
+    for clave, valor in politicas.items():
+        if clave in usadas or not valor:
+            continue
+        descripcion = descripciones.get(clave) or clave.replace("_", " ")
+        entradas.append((
+            f"config:{clave}",
+            (descripcion, clave.replace("_", " ")),
+            f"{descripcion}: {valor}.",
+        ))
+    return Indice(entradas)
+
+
+_version = 0
+_indice: Optional[Indice] = None
+
+
+def invalidar() -> None:
+    global _indice, _version
+    _version += 1
+    _indice = None
+
+
+async def _obtener_indice() -> Indice:
+    global _indice
+    indice = _indice
+    if indice is None:
+        version = _version
+        async with get_db_readonly() as conn:
+            config_rows = await conn.fetch(
+                "SELECT clave, valor, descripcion FROM public.configuracion_ia ORDER BY clave"
+            )
+            carreras_rows = await conn.fetch(
+                "SELECT nombre, dias_gracia_pago FROM public.carreras ORDER BY nombre"
+            )
+        indice = construir_indice(
+            {r["clave"]: r["valor"] for r in config_rows},
+            {r["clave"]: r["descripcion"] for r in config_rows},
+            [(r["nombre"], r["dias_gracia_pago"]) for r in carreras_rows],
+        )
+        # Si se invalidó durante la carga, el índice puede estar desfasado:
+        # se usa para esta consulta pero no se guarda
+        if version == _version:
+            _indice = indice
+        logger.info(f"📚 Índice de políticas IA construido: {len(indice)} entradas")
+    return indice
+
+
+async def responder(pregunta: str) -> Optional[str]:
+    """Respuesta directa si la pregunta es de políticas con alta confianza."""
+    try:
+        indice = await _obtener_indice()
+    except Exception as e:
+        logger.warning(f"⚠️ Índice de políticas no disponible: {e}")
+        return None
+    resultado = indice.responder(pregunta, settings.IA_POLITICAS_UMBRAL, settings.IA_POLITICAS_MARGEN)
+    if resultado is None:
+        return None
+    logger.info(f"📚 Respuesta local de políticas: {resultado.nombre} ({resultado.puntaje:.2f})")
+    return resultado.respuesta
@@ -0,0 +1,104 @@
+"""
+Scheduler de tareas periódicas en proceso.
+
+Cada worker de gunicorn arranca su propio scheduler. Cada vuelta toma un
+advisory lock de transacción con el nombre de la tarea (si otro worker la
+está corriendo, se salta) y, con el lock tomado, mira la última ejecución
+en public.tareas_programadas (migrations/008_tareas_programadas.sql): si
+otro worker ya la corrió dentro del intervalo, también se salta. Así una
+tarea corre una sola vez por intervalo aunque haya N workers, sin
+infraestructura extra.
+
+Uso:
+    tareas.registrar("kpi_institucional", 300, refrescar_vistas_kpi)
+    tareas.iniciar()      # en el lifespan, después de init_connection_pool
+    await tareas.detener()
+"""
+import asyncio
+import logging
+import random
+import zlib
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+# La función recibe la conexión (ya dentro de la transacción con el lock tomado)
+FuncionTarea = Callable[..., Awaitable[None]]
+
+# Tolerancia sobre el intervalo: las vueltas de un mismo worker no se saltan
+# por diferencias de reloj o por lo que tardó la ejecución anterior
+MARGEN_INTERVALO = 0.9
+
+_tareas: Dict[str, Tuple[float, FuncionTarea]] = {}
+_en_ejecucion: List[asyncio.Task] = []
+
+
+def _clave_lock(nombre: str) -> int:
+    # Estable entre procesos (hash() de Python cambia con PYTHONHASHSEED)
+    return zlib.crc32(f"tarea:{nombre}".encode())
+
+
+def registrar(nombre: str, intervalo_segundos: float, funcion: FuncionTarea) -> None:
+    """Registra una tarea periódica. Debe llamarse antes de iniciar()."""
+    _tareas[nombre] = (intervalo_segundos, funcion)
+
+
+async def ejecutar_exclusivo(nombre: str, funcion: FuncionTarea, intervalo: float = 0) -> bool:
+    """
+    Ejecuta la tarea si ningún otro worker la tiene en curso ni la ejecutó
+    en los últimos `intervalo` segundos.
+
+    Returns:
+        bool: True si se ejecutó, False si otro worker tenía el lock o ya la corrió
+    """
+    async with get_db() as conn:
+        obtenido = await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", _clave_lock(nombre))
+        if not obtenido:
+            return False
+        reciente = await conn.fetchval("""
+            SELECT now() - ultima_ejecucion < make_interval(secs => $2)
+            FROM public.tareas_programadas
+            WHERE nombre = $1
+        """, nombre, intervalo * MARGEN_INTERVALO)
+        if reciente:
+            return False
+        await funcion(conn)
+        # En la misma transacción: si la tarea falla, no queda registrada
+        await conn.execute("""
+            INSERT INTO public.tareas_programadas (nombre, ultima_ejecucion)
+            VALUES ($1, now())
+            ON CONFLICT (nombre) DO UPDATE SET ultima_ejecucion = EXCLUDED.ultima_ejecucion
+        """, nombre)
+        return True
+
+
+async def _bucle(nombre: str, intervalo: float, funcion: FuncionTarea) -> None:
+    # Desfase aleatorio inicial para que los workers no compitan en el mismo instante
+    await asyncio.sleep(random.uniform(0, min(5.0, intervalo)))
+    while True:
+        try:
+            if await ejecutar_exclusivo(nombre, funcion, intervalo):
+                logger.info(f"⏱️ Tarea '{nombre}' ejecutada")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error en tarea '{nombre}': {e}")
+        await asyncio.sleep(intervalo)
+
+
+def iniciar() -> None:
+    if _en_ejecucion:
+        return
+    for nombre, (intervalo, funcion) in _tareas.items():
+        _en_ejecucion.append(asyncio.create_task(_bucle(nombre, intervalo, funcion), name=f"tarea:{nombre}"))
+    if _tareas:
+        logger.info(f"✅ Scheduler iniciado ({', '.join(_tareas)})")
+
+
+async def detener() -> None:
+    for tarea in _en_ejecucion:
+        tarea.cancel()
+    await asyncio.gather(*_en_ejecucion, return_exceptions=True)
+    _en_ejecucion.clear()
@@ -540,7 +540,7 @@ class DatabaseSeeder:
             nota_nueva          DECIMAL(5,2),
             modificado_por      VARCHAR(100),
             motivo              TEXT,
-            fecha_modificacion  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            fecha_modificacion  TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
         )""")
 
         self._exec("""